@@ -0,0 +1,273 @@
+# app/agents/batch_drafting.py
+"""
+Offline batch drafting via the OpenAI Batch API.
+
+For overnight content runs latency doesn't matter, but cost and throughput
+do: the Batch API is half price and has its own (much higher) rate limits.
+
+Flow:
+  1) build one drafting request per topic and write them to a JSONL file
+     in Batch API format (plus a manifest with the inspiration we used)
+  2) upload the file and create the batch
+  3) poll until the batch reaches a terminal state
+  4) download the output file, parse each package and save them to
+     `drafts` in one go
+
+Point OPENAI_BASE_URL at the local stub (app/stubs/openai_server.py) to
+exercise the whole flow offline.
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+import os
+import time
+
+from openai import OpenAI
+
+from app.agents.drafting_agent import (
+    DRAFTING_MODEL,
+    _get_openai_client,
+    build_drafting_request,
+    parse_post_package,
+)
+from app.services.drafts_service import save_drafts
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def _manifest_path(batch_path: str) -> str:
+    return batch_path + ".manifest.json"
+
+
+def write_batch_file(
+    topics: List[str],
+    batch_path: str,
+    idea_ids: Optional[List[Optional[str]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Write one Batch API request line per topic to `batch_path`.
+
+    Each line looks like:
+      {"custom_id": "draft-0", "method": "POST", "url": "/v1/chat/completions",
+       "body": {"model": ..., "response_format": ..., "messages": [...]}}
+
+    Also writes `<batch_path>.manifest.json` mapping custom_id -> topic,
+    the content idea it drafts (idea_ids[i], if given) and the inspiration
+    used, so results can be collected (and ideas marked) by a later process.
+
+    Returns the manifest dict.
+    """
+    manifest: Dict[str, Dict[str, Any]] = {}
+
+    with open(batch_path, "w", encoding="utf-8") as f:
+        for i, topic in enumerate(topics):
+            custom_id = f"draft-{i}"
+            messages, insp_summaries = build_drafting_request(topic)
+
+            line = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": DRAFTING_MODEL,
+                    "response_format": {"type": "json_object"},
+                    "messages": messages,
+                },
+            }
+            f.write(json.dumps(line) + "\n")
+            manifest[custom_id] = {
+                "topic": topic,
+                "idea_id": idea_ids[i] if idea_ids else None,
+                "inspiration_used": insp_summaries,
+            }
+
+    with open(_manifest_path(batch_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    print(f"[batch_drafting] Wrote {len(manifest)} requests to {batch_path}")
+    return manifest
+
+
+def load_manifest(batch_path: str) -> Dict[str, Dict[str, Any]]:
+    """Read the manifest written next to a batch file."""
+    path = _manifest_path(batch_path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No manifest found at {path}")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def submit_batch(client: OpenAI, batch_path: str) -> str:
+    """
+    Upload the JSONL file and create the batch. Returns the batch id.
+    """
+    with open(batch_path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+        metadata={"source": "fuelai-nightly-drafting"},
+    )
+    print(f"[batch_drafting] Submitted batch {batch.id} (input file {input_file.id})")
+    return batch.id
+
+
+def wait_for_batch(
+    client: OpenAI,
+    batch_id: str,
+    poll_interval: float = 60.0,
+    max_poll_interval: float = 600.0,
+    timeout: Optional[float] = None,
+):
+    """
+    Poll the batch until it reaches a terminal state, backing off between
+    polls up to `max_poll_interval`. Returns the final batch object.
+
+    Raises:
+        TimeoutError: if `timeout` seconds pass first
+    """
+    started = time.monotonic()
+    interval = poll_interval
+
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        done = f"{counts.completed}/{counts.total}" if counts else "?"
+        print(f"[batch_drafting] Batch {batch_id}: {batch.status} ({done} done)")
+
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout}s")
+
+        time.sleep(interval)
+        interval = min(interval * 1.5, max_poll_interval)
+
+
+def _read_jsonl_file(client: OpenAI, file_id: Optional[str]) -> List[Dict[str, Any]]:
+    if not file_id:
+        return []
+    text = client.files.content(file_id).text
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def collect_batch_results(
+    client: OpenAI,
+    batch,
+    manifest: Dict[str, Dict[str, Any]],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Download the batch output and turn every successful line into a post
+    package. Returns {custom_id: package}; failed requests are logged and
+    left out. So are answers without usable JSON: unlike the interactive
+    path, a batch run must not save parse_post_package's placeholder.
+    """
+    packages: Dict[str, Dict[str, Any]] = {}
+
+    for line in _read_jsonl_file(client, batch.output_file_id):
+        custom_id = line.get("custom_id")
+        entry = manifest.get(custom_id)
+        if entry is None:
+            print(f"[batch_drafting] Unknown custom_id in output: {custom_id}")
+            continue
+
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            print(f"[batch_drafting] Request {custom_id} failed: {line.get('error') or response}")
+            continue
+
+        choices = (response.get("body") or {}).get("choices") or []
+        content = choices[0]["message"]["content"] if choices else None
+        if not content:
+            print(f"[batch_drafting] Request {custom_id} failed: no choices in response")
+            continue
+        try:
+            json.loads(content)
+        except json.JSONDecodeError as e:
+            print(f"[batch_drafting] Request {custom_id} failed: unparseable JSON ({e})")
+            continue
+        packages[custom_id] = parse_post_package(
+            content, entry["topic"], entry["inspiration_used"]
+        )
+
+    for line in _read_jsonl_file(client, getattr(batch, "error_file_id", None)):
+        print(f"[batch_drafting] Request {line.get('custom_id')} errored: {line.get('error')}")
+
+    return packages
+
+
+def run_batch_drafting(
+    brand_id: str,
+    topics: List[str],
+    batch_path: str,
+    poll_interval: float = 60.0,
+    timeout: Optional[float] = None,
+    idea_ids: Optional[List[Optional[str]]] = None,
+) -> Dict[str, Any]:
+    """
+    End-to-end batch run: write, submit, wait, collect, save.
+    `idea_ids` (parallel to `topics`) are recorded in the manifest.
+
+    Returns a summary dict:
+      {"batch_id": str, "status": str, "requested": int, "saved": int,
+       "failed": int, "draft_ids": [[...], ...], "saved_ids": [custom_id, ...],
+       "saved_idea_ids": [idea_id, ...]}
+    """
+    if not topics:
+        return {
+            "batch_id": None, "status": "empty", "requested": 0, "saved": 0, "failed": 0,
+            "draft_ids": [], "saved_ids": [], "saved_idea_ids": [],
+        }
+
+    manifest = write_batch_file(topics, batch_path, idea_ids)
+
+    client = _get_openai_client()
+    batch_id = submit_batch(client, batch_path)
+    return collect_and_save(client, brand_id, batch_id, manifest, poll_interval, timeout)
+
+
+def collect_and_save(
+    client: OpenAI,
+    brand_id: str,
+    batch_id: str,
+    manifest: Dict[str, Dict[str, Any]],
+    poll_interval: float = 60.0,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Wait for an already-submitted batch and save its results.
+    Split out so a crashed run can be resumed with just the batch id
+    and manifest file.
+    """
+    batch = wait_for_batch(client, batch_id, poll_interval=poll_interval, timeout=timeout)
+
+    packages: Dict[str, Dict[str, Any]] = {}
+    if batch.status == "completed":
+        packages = collect_batch_results(client, batch, manifest)
+
+    # Keep the manifest order so draft ids line up with the topics
+    saved_ids = [cid for cid in manifest if cid in packages]
+    ordered = [packages[cid] for cid in saved_ids]
+    draft_ids = save_drafts(brand_id, ordered) if ordered else []
+
+    summary = {
+        "batch_id": batch_id,
+        "status": batch.status,
+        "requested": len(manifest),
+        "saved": len(ordered),
+        "failed": len(manifest) - len(ordered),
+        "draft_ids": draft_ids,
+        "saved_ids": saved_ids,
+        # only ideas whose package was saved; the rest stay 'new' for the next run
+        "saved_idea_ids": [manifest[cid]["idea_id"] for cid in saved_ids if manifest[cid].get("idea_id")],
+    }
+    print(
+        f"[batch_drafting] Batch {batch_id} {batch.status}: "
+        f"saved {summary['saved']}/{summary['requested']} packages"
+    )
+    return summary
@@ -1,54 +1,32 @@
 # app/agents/discovery_agent.py
 
-from typing import List, Dict, Any
-import os
+from typing import List, Dict, Any, Optional
+import asyncio
 import json
 import textwrap
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from app.agents.llm_client import LLM_TIMEOUT_SECONDS, get_async_openai_client, get_openai_client
+from app.config import get_discovery_accounts_per_slice, get_discovery_deadline_seconds
+from app.services.handle_index import normalize_handle
+from app.utils import deadline
+from app.utils.cassette import cassette
 
 
 def _get_openai_client() -> OpenAI:
     """
-    Build an OpenAI client, honoring OPENAI_API_KEY and optional OPENAI_PROJECT_ID.
+    Build an OpenAI client, honoring OPENAI_API_KEY, optional OPENAI_PROJECT_ID
+    and optional OPENAI_BASE_URL.
     """
-    kwargs = {"api_key": os.environ["OPENAI_API_KEY"]}
-    project = os.environ.get("OPENAI_PROJECT_ID")
-    if project:
-        kwargs["project"] = project
-    return OpenAI(**kwargs)
+    return get_openai_client()
 
 
-def suggest_accounts_for_brand(
-    brand_name: str,
-    brand_description: str,
-    target_audience: str,
-    existing_handles: Dict[str, List[str]],
-    max_suggestions: int = 15,
-) -> List[Dict[str, Any]]:
-    """
-    Use the LLM to propose social accounts (instagram, facebook, linkedin)
-    that our target audience is likely to follow.
+DISCOVERY_MODEL = "gpt-4o-mini"
 
-    existing_handles = {
-      "instagram": ["getfuelai", ...],
-      "facebook": ["Fuel AI", ...],
-      "linkedin": ["fuelAI", ...]
-    }
+PLATFORMS = ("instagram", "facebook", "linkedin")
+ACCOUNT_TYPES = ("competitor", "inspiration", "adjacent", "meme", "viral")
 
-    Returns a list of dicts:
-      {
-        "platform": "instagram|facebook|linkedin",
-        "handle": "...",
-        "display_name": "...",
-        "type": "competitor|inspiration|adjacent|meme|viral",
-        "reason": "... (why relevant to our audience)",
-        "voice_notes": "... (what parts of their tone/format we want to borrow)",
-        "fit_score": 0–100 (float)
-      }
-    """
-    client = _get_openai_client()
-
-    system_prompt = textwrap.dedent("""
+DISCOVERY_SYSTEM_PROMPT = textwrap.dedent("""
     You are a research assistant helping a B2B SaaS team find relevant social accounts
     their target audience follows.
 
@@ -107,31 +85,20 @@ def suggest_accounts_for_brand(
     - Return JSON only (no commentary).
     """)
 
-    user_payload = {
-        "brand_name": brand_name,
-        "brand_description": brand_description,
-        "target_audience": target_audience,
-        "existing_handles": existing_handles,
-        "max_suggestions": max_suggestions,
-    }
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": json.dumps(user_payload)},
-        ],
-    )
-
-    content = response.choices[0].message.content
-
-    try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
-        return []
-
-    accounts = data.get("accounts") or data.get("suggestions") or []
+def _normalize_accounts(
+    accounts: List[Dict[str, Any]],
+    existing_handles: Dict[str, List[str]],
+) -> List[Dict[str, Any]]:
+    """
+    Validate raw LLM accounts, drop the ones we already track and apply the
+    per-type fit-score bars. Order is preserved; callers sort.
+    """
+    # Case-normalized sets: O(1) membership instead of scanning lists
+    existing_sets = {
+        platform: {normalize_handle(h) for h in handles}
+        for platform, handles in existing_handles.items()
+    }
 
     normalized: List[Dict[str, Any]] = []
     for acc in accounts:
@@ -144,8 +111,7 @@ def suggest_accounts_for_brand(
             continue
 
         # Skip existing handles for that platform
-        existing_for_platform = existing_handles.get(platform, [])
-        if handle in existing_for_platform:
+        if normalize_handle(handle) in existing_sets.get(platform, ()):
             continue
 
         # Fit score as 0–100
@@ -191,6 +157,214 @@ def suggest_accounts_for_brand(
             }
         )
 
+    return normalized
+
+
+def _build_user_payload(
+    brand_name: str,
+    brand_description: str,
+    target_audience: str,
+    existing_handles: Dict[str, List[str]],
+    max_suggestions: int,
+) -> Dict[str, Any]:
+    return {
+        "brand_name": brand_name,
+        "brand_description": brand_description,
+        "target_audience": target_audience,
+        "existing_handles": existing_handles,
+        "max_suggestions": max_suggestions,
+    }
+
+
+def _parse_accounts(content: Optional[str]) -> List[Dict[str, Any]]:
+    try:
+        data = json.loads(content or "")
+    except json.JSONDecodeError:
+        return []
+    if not isinstance(data, dict):
+        return []
+    return data.get("accounts") or data.get("suggestions") or []
+
+
+@cassette("suggest_accounts_for_brand")
+def suggest_accounts_for_brand(
+    brand_name: str,
+    brand_description: str,
+    target_audience: str,
+    existing_handles: Dict[str, List[str]],
+    max_suggestions: int = 15,
+    parallel: bool = False,
+    deadline_s: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Use the LLM to propose social accounts (instagram, facebook, linkedin)
+    that our target audience is likely to follow.
+
+    existing_handles = {
+      "instagram": ["getfuelai", ...],
+      "facebook": ["Fuel AI", ...],
+      "linkedin": ["fuelAI", ...]
+    }
+
+    Returns a list of dicts:
+      {
+        "platform": "instagram|facebook|linkedin",
+        "handle": "...",
+        "display_name": "...",
+        "type": "competitor|inspiration|adjacent|meme|viral",
+        "reason": "... (why relevant to our audience)",
+        "voice_notes": "... (what parts of their tone/format we want to borrow)",
+        "fit_score": 0–100 (float)
+      }
+
+    With parallel=True the work is fanned out into one smaller request per
+    (platform, account type), see suggest_accounts_for_brand_parallel.
+    This is the sync entry point (it runs its own event loop); async code
+    should await suggest_accounts_for_brand_parallel directly.
+    """
+    if parallel:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                "suggest_accounts_for_brand(parallel=True) called from a running event loop; "
+                "await suggest_accounts_for_brand_parallel(...) instead"
+            )
+        return asyncio.run(
+            suggest_accounts_for_brand_parallel(
+                brand_name=brand_name,
+                brand_description=brand_description,
+                target_audience=target_audience,
+                existing_handles=existing_handles,
+                max_suggestions=max_suggestions,
+                deadline_s=deadline_s,
+            )
+        )
+
+    client = _get_openai_client()
+
+    user_payload = _build_user_payload(
+        brand_name, brand_description, target_audience, existing_handles, max_suggestions
+    )
+
+    response = client.chat.completions.create(
+        model=DISCOVERY_MODEL,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": DISCOVERY_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(user_payload)},
+        ],
+        timeout=deadline.timeout(LLM_TIMEOUT_SECONDS),
+    )
+
+    content = response.choices[0].message.content
+    accounts = _parse_accounts(content)
+
+    normalized = _normalize_accounts(accounts, existing_handles)
+
     # Sort by fit_score descending
     normalized.sort(key=lambda x: x["fit_score"], reverse=True)
-    return normalized[:max_suggestions]
\ No newline at end of file
+    return normalized[:max_suggestions]
+
+
+async def _suggest_slice(
+    client: AsyncOpenAI,
+    base_payload: Dict[str, Any],
+    platform: str,
+    account_type: str,
+    per_slice: int,
+) -> List[Dict[str, Any]]:
+    """
+    One small sub-request: only `account_type` accounts on `platform`.
+    The system prompt is shared verbatim across slices so it can be
+    prompt-cached; the narrowing lives in the user payload.
+    """
+    payload = {
+        **base_payload,
+        "platform": platform,
+        "account_type": account_type,
+        "max_suggestions": per_slice,
+        "instructions": (
+            f"Only return accounts on {platform} whose type is '{account_type}'. "
+            f"Return at most {per_slice} accounts. Return an empty list if none fit."
+        ),
+    }
+
+    response = await client.chat.completions.create(
+        model=DISCOVERY_MODEL,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": DISCOVERY_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(payload)},
+        ],
+        timeout=deadline.timeout(LLM_TIMEOUT_SECONDS),
+    )
+    return _parse_accounts(response.choices[0].message.content)
+
+
+async def suggest_accounts_for_brand_parallel(
+    brand_name: str,
+    brand_description: str,
+    target_audience: str,
+    existing_handles: Dict[str, List[str]],
+    max_suggestions: int = 15,
+    deadline_s: Optional[float] = None,
+    per_slice: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fan-out version of suggest_accounts_for_brand.
+
+    Output tokens dominate the single big call, so instead we fire one small
+    request per (platform, account type) concurrently through one async
+    client. Wall time drops to roughly the slowest sub-request.
+
+    Returns whatever has finished when all slices are done or `deadline_s`
+    expires (slower slices are cancelled), merged, de-duplicated by
+    (platform, handle) keeping the best fit score, and run through the same
+    fit-score filtering as the single-call path.
+    """
+    if deadline_s is None:
+        deadline_s = get_discovery_deadline_seconds()
+    # Never wait past the deadline of the request we're serving
+    deadline_s = min(deadline_s, deadline.remaining(deadline_s))
+    if per_slice is None:
+        per_slice = get_discovery_accounts_per_slice()
+
+    base_payload = _build_user_payload(
+        brand_name, brand_description, target_audience, existing_handles, max_suggestions
+    )
+
+    client = get_async_openai_client()
+    try:
+        tasks = [
+            asyncio.create_task(_suggest_slice(client, base_payload, platform, acc_type, per_slice))
+            for platform in PLATFORMS
+            for acc_type in ACCOUNT_TYPES
+        ]
+        done, pending = await asyncio.wait(tasks, timeout=deadline_s)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"[discovery_agent] Deadline hit: {len(pending)}/{len(tasks)} slices cancelled")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        accounts: List[Dict[str, Any]] = []
+        for task in done:
+            if task.exception() is not None:
+                print(f"[discovery_agent] Slice failed: {task.exception()}")
+                continue
+            accounts.extend(task.result())
+    finally:
+        await client.close()
+
+    best: Dict[tuple, Dict[str, Any]] = {}
+    for acc in _normalize_accounts(accounts, existing_handles):
+        key = (acc["platform"], normalize_handle(acc["handle"]))
+        if key not in best or acc["fit_score"] > best[key]["fit_score"]:
+            best[key] = acc
+
+    merged = sorted(best.values(), key=lambda x: x["fit_score"], reverse=True)
+    return merged[:max_suggestions]
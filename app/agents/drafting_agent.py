@@ -1,44 +1,29 @@
 # app/agents/drafting_agent.py
 
-from typing import Dict, Any, List
-import os
+from typing import Dict, Any, List, Optional, Tuple
 import json
 import textwrap
 
 from openai import OpenAI
 from app.agents.semantic_agent import semantic_search
+from app.agents.prompt_builder import build_inspiration_block
+from app.agents.llm_client import LLM_TIMEOUT_SECONDS, get_openai_client
+from app.utils import deadline
+from app.utils.cassette import cassette
+from app.utils.singleflight import coalesce
 
 
 def _get_openai_client() -> OpenAI:
     """
-    Reuse the same pattern as semantic_agent: project-based key is supported.
+    Same shared client as semantic_agent: project-based key and
+    OPENAI_BASE_URL are supported.
     """
-    kwargs = {"api_key": os.environ["OPENAI_API_KEY"]}
-    project = os.environ.get("OPENAI_PROJECT_ID")
-    if project:
-        kwargs["project"] = project
-    return OpenAI(**kwargs)
+    return get_openai_client()
 
 
-def generate_post_package(topic: str) -> Dict[str, Any]:
-    """
-    Full post drafting agent.
-
-    - Uses semantic_search() to pull inspiration posts
-    - Calls OpenAI to generate:
-        * core idea
-        * Instagram variant
-        * Facebook variant
-        * LinkedIn variant
-    - Returns a structured dict.
-    """
-
-    # 1) Get inspiration posts from semantic search
-    inspiration_posts: List[Dict[str, Any]] = semantic_search(topic, limit=5)
+DRAFTING_MODEL = "gpt-4o-mini"  # you can later swap this to a bigger model if you want
 
-    client = _get_openai_client()
-
-    system_prompt = textwrap.dedent("""
+DRAFTING_SYSTEM_PROMPT = textwrap.dedent("""
     You are the autonomous social media strategist for a B2B SaaS startup called FuelAI.
 
     Brand:
@@ -98,34 +83,55 @@ def generate_post_package(topic: str) -> Dict[str, Any]:
     - Do NOT include backticks or markdown in your answer. Raw JSON only.
     """)
 
-    # Prepare a compact version of inspiration to avoid overloading the model
-    insp_summaries = []
-    for p in inspiration_posts:
-        insp_summaries.append({
-            "post_id": p.get("post_id"),
-            "caption": p.get("caption"),
-            "style_tags": p.get("style_tags", []),
-            "score": p.get("score")
-        })
+
+def build_drafting_request(topic: str) -> Tuple[List[Dict[str, str]], List[Dict[str, Any]]]:
+    """
+    Build the chat messages for one drafting call.
+
+    - Uses semantic_search() to pull inspiration posts
+    - Packs them into the inspiration token budget
+
+    Returns (messages, insp_summaries). Shared by the interactive path
+    (generate_post_package) and the nightly batch path (batch_drafting).
+    """
+
+    # 1) Get inspiration posts from semantic search
+    inspiration_posts: List[Dict[str, Any]] = semantic_search(topic, limit=5)
+
+    # Prepare a compact version of inspiration to avoid overloading the model:
+    # captions are packed into a fixed token budget, best matches first
+    insp_summaries, pack_stats = build_inspiration_block(inspiration_posts)
+    print(
+        "[drafting_agent] Inspiration tokens: "
+        f"{pack_stats['tokens_before']} -> {pack_stats['tokens_after']} "
+        f"(saved {pack_stats['tokens_saved']}, "
+        f"truncated {pack_stats['captions_truncated']}, "
+        f"dropped {pack_stats['posts_dropped']})"
+    )
 
     user_prompt = {
         "topic": topic,
         "inspiration_posts": insp_summaries
     }
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # you can later swap this to a bigger model if you want
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": json.dumps(user_prompt)},
-        ],
-    )
+    messages = [
+        {"role": "system", "content": DRAFTING_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(user_prompt)},
+    ]
+    return messages, insp_summaries
 
-    content = response.choices[0].message.content
 
+def parse_post_package(
+    content: Optional[str],
+    topic: str,
+    insp_summaries: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Turn the model's raw JSON answer into a post package.
+    Falls back to a placeholder package if the JSON can't be parsed.
+    """
     try:
-        data = json.loads(content)
+        data = json.loads(content or "")
     except json.JSONDecodeError:
         # Fallback: return a simple structure if parsing fails
         return {
@@ -163,4 +169,36 @@ def generate_post_package(topic: str) -> Dict[str, Any]:
     # Add the raw inspiration we used, for inspection/debug later if you want
     data["core_theme"] = data.get("core_theme", topic)
     data["inspiration_used"] = insp_summaries
-    return data
\ No newline at end of file
+    return data
+
+
+@coalesce()
+@cassette("generate_post_package")
+def generate_post_package(topic: str) -> Dict[str, Any]:
+    """
+    Full post drafting agent.
+
+    - Uses semantic_search() to pull inspiration posts
+    - Calls OpenAI to generate:
+        * core idea
+        * Instagram variant
+        * Facebook variant
+        * LinkedIn variant
+    - Returns a structured dict.
+    """
+    messages, insp_summaries = build_drafting_request(topic)
+
+    # Don't start the expensive call if whoever asked has given up
+    deadline.check()
+
+    client = _get_openai_client()
+
+    response = client.chat.completions.create(
+        model=DRAFTING_MODEL,
+        response_format={"type": "json_object"},
+        messages=messages,
+        timeout=deadline.timeout(LLM_TIMEOUT_SECONDS),
+    )
+
+    content = response.choices[0].message.content
+    return parse_post_package(content, topic, insp_summaries)
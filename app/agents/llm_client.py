@@ -0,0 +1,59 @@
+# app/agents/llm_client.py
+"""
+Shared OpenAI client construction for all agents.
+
+Honors OPENAI_API_KEY, optional OPENAI_PROJECT_ID and optional
+OPENAI_BASE_URL (e.g. the local stub server for load tests).
+
+Clients are cached per settings: each OpenAI client owns an HTTP connection
+pool, so building a fresh one per call throws away keep-alive connections
+and becomes the bottleneck under concurrency.
+"""
+
+from functools import lru_cache
+from typing import Optional
+import os
+
+from openai import AsyncOpenAI, OpenAI
+
+from app.config import get_openai_base_url
+
+# Per-call HTTP timeout caps; callers pass deadline.timeout(cap) so a
+# request's own deadline can shorten them.
+LLM_TIMEOUT_SECONDS = 60.0
+EMBEDDING_TIMEOUT_SECONDS = 20.0
+
+
+def _client_kwargs() -> dict:
+    kwargs = {"api_key": os.environ["OPENAI_API_KEY"]}
+    project = os.environ.get("OPENAI_PROJECT_ID")
+    if project:
+        kwargs["project"] = project
+    base_url = get_openai_base_url()
+    if base_url:
+        kwargs["base_url"] = base_url
+    return kwargs
+
+
+@lru_cache(maxsize=8)
+def _cached_client(api_key: str, project: Optional[str], base_url: Optional[str]) -> OpenAI:
+    return OpenAI(api_key=api_key, project=project, base_url=base_url)
+
+
+def get_openai_client() -> OpenAI:
+    """
+    Return an OpenAI client for the current environment settings.
+    """
+    kwargs = _client_kwargs()
+    return _cached_client(kwargs["api_key"], kwargs.get("project"), kwargs.get("base_url"))
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Return a NEW AsyncOpenAI client for the current settings.
+
+    Not cached: its connection pool is bound to the event loop it first runs
+    on. Share one client across the concurrent calls of a single operation
+    and close it when done.
+    """
+    return AsyncOpenAI(**_client_kwargs())
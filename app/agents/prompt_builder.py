@@ -0,0 +1,195 @@
+# app/agents/prompt_builder.py
+"""
+Token-budgeted packing of inspiration posts for the drafting prompt.
+
+Long captions (LinkedIn essays, IG carousels with walls of text) can blow up
+the prompt and slow the completion. We count tokens locally and fit the
+inspiration block into a fixed budget, giving higher-scoring posts first
+claim on any room left over.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+import json
+
+from app.config import get_inspiration_token_budget
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# Model the drafting agent talks to; used to pick the right tokenizer.
+TOKENIZER_MODEL = "gpt-4o-mini"
+
+# Below this many tokens a truncated caption isn't worth sending.
+MIN_CAPTION_TOKENS = 12
+
+TRUNCATION_MARK = " …"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """
+    Return a tiktoken encoding, or None if tiktoken is missing or can't load
+    its BPE files (e.g. no network on first use).
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in `text` the way the model will.
+    Falls back to a ~4 chars/token estimate if tiktoken isn't available.
+    """
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut `text` down to at most `max_tokens` tokens, keeping the opening
+    (the hook is what we want the model to learn from) and ending on a
+    word boundary where possible.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    budget = max(1, max_tokens - count_tokens(TRUNCATION_MARK))
+    enc = _get_encoding()
+    if enc is None:
+        cut = text[: budget * 4]
+    else:
+        cut = enc.decode(enc.encode(text)[:budget])
+
+    # Don't end mid-word if we can avoid it
+    space = cut.rfind(" ")
+    if space > len(cut) // 2:
+        cut = cut[:space]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+def _summarize_post(p: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "post_id": p.get("post_id"),
+        "caption": p.get("caption") or "",
+        "style_tags": p.get("style_tags", []),
+        "score": p.get("score"),
+    }
+
+
+def _allocate(needs: List[int], available: int) -> List[int]:
+    """
+    Split `available` tokens across captions that need `needs` tokens each.
+
+    Everyone first gets an equal share (capped at what they need); whatever
+    is left over goes to posts in rank order, so the best matches keep the
+    most of their caption.
+    """
+    n = len(needs)
+    alloc = [0] * n
+    if n == 0 or available <= 0:
+        return alloc
+
+    fair = available // n
+    for i, need in enumerate(needs):
+        alloc[i] = min(need, fair)
+
+    leftover = available - sum(alloc)
+    for i, need in enumerate(needs):
+        if leftover <= 0:
+            break
+        extra = min(need - alloc[i], leftover)
+        alloc[i] += extra
+        leftover -= extra
+
+    return alloc
+
+
+def pack_inspiration(
+    posts: List[Dict[str, Any]],
+    budget: int,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Turn semantic_search() results into compact summaries that fit in
+    `budget` tokens.
+
+    - posts are ranked by score (best first)
+    - each post's metadata (post_id, style_tags, score) is always kept if
+      the post makes the cut; lowest-ranked posts are dropped if even their
+      metadata doesn't fit
+    - captions share the remaining budget and are truncated as needed
+
+    Returns (summaries, stats) where stats is:
+      {
+        "tokens_before": int,   # full, unpacked inspiration block
+        "tokens_after": int,    # what we actually send
+        "tokens_saved": int,
+        "posts_dropped": int,
+        "captions_truncated": int,
+      }
+    """
+    summaries = [_summarize_post(p) for p in posts]
+    summaries.sort(key=lambda s: s.get("score") or 0.0, reverse=True)
+
+    tokens_before = count_tokens(json.dumps(summaries))
+
+    # Metadata cost of each entry, i.e. everything but the caption
+    overheads = [count_tokens(json.dumps({**s, "caption": ""})) for s in summaries]
+
+    kept: List[Dict[str, Any]] = []
+    used = 0
+    for s, overhead in zip(summaries, overheads):
+        if used + overhead > budget:
+            break
+        kept.append(s)
+        used += overhead
+
+    needs = [count_tokens(s["caption"]) for s in kept]
+    alloc = _allocate(needs, budget - used)
+
+    packed: List[Dict[str, Any]] = []
+    truncated = 0
+    for s, need, allowed in zip(kept, needs, alloc):
+        caption = s["caption"]
+        if allowed < need:
+            truncated += 1
+            caption = truncate_to_tokens(caption, allowed) if allowed >= MIN_CAPTION_TOKENS else ""
+        packed.append({**s, "caption": caption})
+
+    tokens_after = count_tokens(json.dumps(packed))
+    stats = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(0, tokens_before - tokens_after),
+        "posts_dropped": len(summaries) - len(kept),
+        "captions_truncated": truncated,
+    }
+    return packed, stats
+
+
+def build_inspiration_block(
+    posts: List[Dict[str, Any]],
+    budget: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Convenience wrapper that reads the budget from settings when not given.
+    """
+    if budget is None:
+        budget = get_inspiration_token_budget()
+    return pack_inspiration(posts, budget)
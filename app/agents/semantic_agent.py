@@ -1,11 +1,15 @@
 # app/agents/semantic_agent.py
 
 from typing import List, Dict, Any
-import os
 import math
 import psycopg2
 from openai import OpenAI
 
+from app.agents.llm_client import EMBEDDING_TIMEOUT_SECONDS, get_openai_client
+from app.utils import deadline
+from app.utils.cassette import cassette
+from app.utils.singleflight import coalesce
+
 
 def _get_db_conn():
     return psycopg2.connect(
@@ -18,19 +22,17 @@ def _get_db_conn():
 
 
 def _get_openai_client() -> OpenAI:
-    # Works with your project-based key
-    kwargs = {"api_key": os.environ["OPENAI_API_KEY"]}
-    project = os.environ.get("OPENAI_PROJECT_ID")
-    if project:
-        kwargs["project"] = project
-    return OpenAI(**kwargs)
+    # Works with your project-based key (and OPENAI_BASE_URL, if set)
+    return get_openai_client()
 
 
+@cassette("embed_query")
 def _embed_query(text: str) -> List[float]:
     client = _get_openai_client()
     resp = client.embeddings.create(
         model="text-embedding-3-small",
         input=text,
+        timeout=deadline.timeout(EMBEDDING_TIMEOUT_SECONDS),
     )
     return resp.data[0].embedding
 
@@ -87,6 +89,8 @@ def _default_style_mix() -> List[str]:
     return ["educational", "story", "meme", "sales"]
 
 
+# hot path: in-process coalescing only, no Redis round trips per call
+@coalesce(local=True)
 def semantic_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     """
     Real semantic search:
@@ -0,0 +1,128 @@
+# app/cli/batch_draft.py
+"""
+Nightly batch drafting run.
+
+Usage:
+  # Draft every 'new' content idea for the brand through the Batch API
+  python -m app.cli.batch_draft
+
+  # Draft topics from a file (one per line) instead
+  python -m app.cli.batch_draft --topics-file topics.txt
+
+  # Resume collecting a batch that was already submitted
+  python -m app.cli.batch_draft --resume batch_abc123
+
+  # Run the whole flow offline against the local stub server
+  uvicorn app.stubs.openai_server:app --port 8100 &
+  OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=stub \\
+    python -m app.cli.batch_draft --topics-file topics.txt --poll-interval 1
+"""
+
+from typing import List, Optional, Tuple
+import argparse
+
+from app.agents.batch_drafting import (
+    collect_and_save,
+    load_manifest,
+    run_batch_drafting,
+)
+from app.agents.drafting_agent import _get_openai_client
+from app.db.connection import get_db_cursor
+
+FUELAI_BRAND_ID = "4c91c352-66f0-4c50-8466-dbaf4dfbff04"
+
+
+def get_new_content_ideas(brand_id: str) -> List[Tuple[str, str]]:
+    """
+    Return (idea_id, topic) for every content idea still in status 'new',
+    highest priority first.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select id, topic
+            from content_ideas
+            where brand_id = %s
+              and status = 'new'
+              and coalesce(topic, '') <> ''
+            order by priority desc
+            """,
+            (brand_id,),
+        )
+        return [(str(r[0]), r[1]) for r in cur.fetchall()]
+
+
+def mark_ideas_drafted(idea_ids: List[str]) -> None:
+    if not idea_ids:
+        return
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            update content_ideas
+            set status = 'drafted'
+            where id = any(%s::uuid[])
+            """,
+            (idea_ids,),
+        )
+
+
+def _read_topics_file(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main(
+    brand_id: str = FUELAI_BRAND_ID,
+    topics_file: Optional[str] = None,
+    batch_path: str = "drafts_batch.jsonl",
+    poll_interval: float = 60.0,
+    resume: Optional[str] = None,
+):
+    if resume:
+        manifest = load_manifest(batch_path)
+        summary = collect_and_save(
+            _get_openai_client(), brand_id, resume, manifest, poll_interval=poll_interval
+        )
+    else:
+        idea_ids: Optional[List[str]] = None
+        if topics_file:
+            topics = _read_topics_file(topics_file)
+        else:
+            ideas = get_new_content_ideas(brand_id)
+            idea_ids = [idea_id for idea_id, _ in ideas]
+            topics = [topic for _, topic in ideas]
+
+        if not topics:
+            print("No topics to draft.")
+            return
+
+        print(f"Drafting {len(topics)} topics in batch mode...")
+        summary = run_batch_drafting(
+            brand_id, topics, batch_path, poll_interval=poll_interval, idea_ids=idea_ids
+        )
+
+    # Only ideas that actually got a saved package; failed ones stay 'new'
+    mark_ideas_drafted(summary["saved_idea_ids"])
+
+    print(f"\n=== Batch {summary['batch_id']} ({summary['status']}) ===")
+    print(f"Requested: {summary['requested']}")
+    print(f"Saved:     {summary['saved']} packages ({3 * summary['saved']} draft rows)")
+    print(f"Failed:    {summary['failed']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nightly batch drafting via the OpenAI Batch API")
+    parser.add_argument("--brand-id", default=FUELAI_BRAND_ID)
+    parser.add_argument("--topics-file", help="one topic per line (default: 'new' content_ideas)")
+    parser.add_argument("--batch-path", default="drafts_batch.jsonl")
+    parser.add_argument("--poll-interval", type=float, default=60.0)
+    parser.add_argument("--resume", metavar="BATCH_ID", help="collect an already-submitted batch")
+    args = parser.parse_args()
+
+    main(
+        brand_id=args.brand_id,
+        topics_file=args.topics_file,
+        batch_path=args.batch_path,
+        poll_interval=args.poll_interval,
+        resume=args.resume,
+    )
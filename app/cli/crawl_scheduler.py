@@ -0,0 +1,198 @@
+# app/cli/crawl_scheduler.py
+"""
+Long-running crawl scheduler for Instagram sources.
+
+Keeps a heap of sources ordered by next-due time (see crawl_schedule:
+fetch_schedule, last_crawl_at, posting rate and a stable per-source slot)
+and hands due sources, in batches, to a small pool of crawl workers. The
+source list is re-read every SCHEDULER_REFRESH_SECONDS so new sources and
+schedule changes are picked up without a restart.
+
+Usage:
+  python -m app.cli.crawl_scheduler
+  python -m app.cli.crawl_scheduler --workers 4 --batch-size 20 --run-mode async
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+import argparse
+import asyncio
+import heapq
+import time
+
+from app.config import (
+    get_scheduler_batch_size,
+    get_scheduler_refresh_seconds,
+    get_scheduler_retry_seconds,
+    get_scheduler_spread_seconds,
+    get_scheduler_target_posts,
+    get_scheduler_workers,
+)
+from app.services.crawl_schedule import load_schedule, next_due, plan_schedule
+from app.services.crawl_service import refresh_posting_rates
+from app.services.instagram_crawler import crawl_instagram_sources
+
+MAX_IDLE_SLEEP_SECONDS = 60.0
+
+
+class CrawlScheduler:
+    """
+    Heap of (due_at, source_id) plus the rows behind it. Only touched from
+    the event loop, so the dispatcher and workers need no locking.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        batch_size: int,
+        limit: Optional[int] = None,
+        run_mode: Optional[str] = None,
+    ):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.limit = limit
+        self.run_mode = run_mode
+        self.spread = get_scheduler_spread_seconds()
+
+        self.heap: List[Tuple[float, str]] = []
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.in_flight: Set[str] = set()
+        self.wakeup = asyncio.Event()
+        self.work: asyncio.Queue = asyncio.Queue(maxsize=self.workers)
+
+    async def refresh(self) -> None:
+        """Rebuild the heap from the database (everything not being crawled right now)."""
+        rows = await asyncio.to_thread(load_schedule, "instagram")
+        planned = plan_schedule(rows, time.time(), get_scheduler_target_posts(), self.spread)
+
+        self.sources = {row["id"]: row for row in planned}
+        self.heap = [(row["due_at"], row["id"]) for row in planned if row["id"] not in self.in_flight]
+        heapq.heapify(self.heap)
+
+        if self.heap:
+            wait = max(0.0, self.heap[0][0] - time.time())
+            print(f"[crawl_scheduler] {len(planned)} scheduled sources, next due in {wait:.0f}s")
+        else:
+            print(f"[crawl_scheduler] {len(planned)} scheduled sources")
+
+    def _take_due(self, now: float) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        while self.heap and self.heap[0][0] <= now and len(batch) < self.batch_size:
+            _, source_id = heapq.heappop(self.heap)
+            row = self.sources.get(source_id)
+            if row is None or source_id in self.in_flight:
+                continue  # deleted or switched to manual since it was queued
+            batch.append(row)
+        return batch
+
+    def _reschedule(self, batch: List[Dict[str, Any]], failed: Set[str]) -> None:
+        now = time.time()
+        for row in batch:
+            self.in_flight.discard(row["id"])
+            if row["id"] not in self.sources:
+                continue
+            if row["handle"] in failed:
+                due = now + min(row["interval_s"], get_scheduler_retry_seconds())
+            else:
+                due = next_due(row["id"], now, row["interval_s"], now, self.spread)
+            heapq.heappush(self.heap, (due, row["id"]))
+        self.wakeup.set()
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            batch = await self.work.get()
+            handles = ", ".join(f"@{row['handle']}" for row in batch)
+            print(f"[crawl_scheduler] worker {n}: crawling {handles}")
+            try:
+                stats = await crawl_instagram_sources(
+                    [(row["id"], row["handle"]) for row in batch],
+                    limit=self.limit,
+                    run_mode=self.run_mode,
+                )
+                failed = {handle for handle, _ in stats["failures"]}
+                print(
+                    f"[crawl_scheduler] worker {n}: {stats['succeeded']}/{len(batch)} ok, "
+                    f"{stats['busy']} already being crawled, "
+                    f"{stats['posts_new']} new posts in {stats['elapsed_s']:.1f}s"
+                )
+            except Exception as e:
+                failed = {row["handle"] for row in batch}
+                print(f"[crawl_scheduler] worker {n}: crawl failed: {e}")
+            self._reschedule(batch, failed)
+
+    async def run(self) -> None:
+        try:
+            updated = await asyncio.to_thread(refresh_posting_rates, "instagram")
+            print(f"[crawl_scheduler] Re-estimated posting rates for {updated} sources")
+        except Exception as e:
+            print(f"[crawl_scheduler] Could not refresh posting rates: {e}")
+
+        workers = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        refresh_seconds = get_scheduler_refresh_seconds()
+        next_refresh = 0.0
+        try:
+            while True:
+                now = time.time()
+                if now >= next_refresh:
+                    try:
+                        await self.refresh()
+                    except Exception as e:
+                        print(f"[crawl_scheduler] Could not load sources: {e}")
+                    next_refresh = now + refresh_seconds
+
+                batch = self._take_due(time.time())
+                if batch:
+                    self.in_flight.update(row["id"] for row in batch)
+                    await self.work.put(batch)  # blocks while every worker is busy
+                    continue
+
+                until = next_refresh if not self.heap else min(self.heap[0][0], next_refresh)
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self.wakeup.wait(),
+                        timeout=min(max(until - time.time(), 0.0), MAX_IDLE_SLEEP_SECONDS),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+def main(
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    limit: Optional[int] = None,
+    run_mode: Optional[str] = None,
+):
+    scheduler = CrawlScheduler(
+        workers=workers or get_scheduler_workers(),
+        batch_size=batch_size or get_scheduler_batch_size(),
+        limit=limit,
+        run_mode=run_mode,
+    )
+    print(f"[crawl_scheduler] Starting with {scheduler.workers} worker(s), batches of {scheduler.batch_size}")
+    try:
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        print("[crawl_scheduler] Stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl Instagram sources as they come due")
+    parser.add_argument("--workers", type=int, help="crawl batches run at once (default: SCHEDULER_WORKERS or 2)")
+    parser.add_argument("--batch-size", type=int, help="due sources per crawl (default: SCHEDULER_BATCH_SIZE or 10)")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help="posts to request per source (default: sized from each source's posting rate)",
+    )
+    parser.add_argument(
+        "--run-mode",
+        choices=("sync", "async"),
+        help="'async' pages each run's dataset into ingestion as it fills (default: APIFY_RUN_MODE or sync)",
+    )
+    args = parser.parse_args()
+
+    main(workers=args.workers, batch_size=args.batch_size, limit=args.limit, run_mode=args.run_mode)
@@ -0,0 +1,75 @@
+# app/cli/download_media.py
+"""
+Download post media into the media bucket (see app/services/media_service.py).
+
+Usage:
+  # Everything pending, then exit
+  python -m app.cli.download_media
+
+  # Keep running, picking up newly crawled posts
+  python -m app.cli.download_media --loop --interval 60
+
+  # Tune the pass
+  python -m app.cli.download_media --concurrency 32 --batch 500
+"""
+
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import time
+
+from app.config import get_media_batch_posts, get_media_concurrency
+from app.services.media_service import download_pending_media, format_summary, new_stats
+
+
+def _add(total: Dict[str, Any], stats: Dict[str, Any]) -> None:
+    for k, v in stats.items():
+        total[k] += v
+
+
+async def drain(batch: int, concurrency: int) -> Dict[str, Any]:
+    """Run passes until nothing pending can be settled. Returns the summed stats."""
+    total = new_stats()
+    while True:
+        stats = await download_pending_media(max_posts=batch, concurrency=concurrency)
+        _add(total, stats)
+        if stats["posts"]:
+            elapsed = max(stats["elapsed_s"], 1e-9)
+            print(
+                f"[download_media] {stats['posts_completed']}/{stats['posts']} posts settled, "
+                f"{stats['downloaded'] + stats['deduped']} files, "
+                f"{stats['bytes'] / elapsed / 1024 / 1024:.2f} MB/s"
+            )
+        # nothing left, or only posts waiting on retries: stop this drain
+        if stats["posts"] < batch or not stats["posts_completed"]:
+            return total
+
+
+def main(
+    loop: bool = False,
+    interval: float = 60.0,
+    batch: Optional[int] = None,
+    concurrency: Optional[int] = None,
+):
+    batch = batch or get_media_batch_posts()
+    concurrency = concurrency or get_media_concurrency()
+
+    while True:
+        total = asyncio.run(drain(batch, concurrency))
+        if not loop:
+            print("\n=== Media summary ===")
+            print(format_summary(total))
+            return
+        if total["posts"]:
+            print(format_summary(total))
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download post media into object storage")
+    parser.add_argument("--loop", action="store_true", help="keep polling for new posts")
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between polls with --loop (default: 60)")
+    parser.add_argument("--batch", type=int, help="posts per pass (default: MEDIA_BATCH_POSTS or 200)")
+    parser.add_argument("--concurrency", type=int, help="files downloaded at once (default: MEDIA_CONCURRENCY or 16)")
+    args = parser.parse_args()
+    main(loop=args.loop, interval=args.interval, batch=args.batch, concurrency=args.concurrency)
@@ -1,11 +1,15 @@
 # app/cli/ingest_instagram_sources.py
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+import argparse
+import asyncio
+import time
 
 import psycopg2
 
-from app.services.ingestion_service import upsert_posts
-from app.services.instagram_scraper import fetch_instagram_posts
+from app.config import get_scheduler_target_posts
+from app.services.crawl_schedule import load_schedule, plan_schedule
+from app.services.instagram_crawler import crawl_instagram_sources, format_summary
 
 
 def _get_db_conn():
@@ -21,7 +25,8 @@ def _get_db_conn():
 def get_instagram_sources() -> List[Tuple[str, str]]:
     """
     Return a list of (source_id, handle) for all instagram sources
-    that we should fetch for. (You can filter on fetch_schedule later.)
+    that we should fetch for. (See get_due_instagram_sources for the ones
+    whose fetch_schedule says they're due.)
     """
     conn = _get_db_conn()
     cur = conn.cursor()
@@ -38,28 +43,76 @@ def get_instagram_sources() -> List[Tuple[str, str]]:
     return [(str(r[0]), r[1]) for r in rows]
 
 
-def main(limit: int = 20):
-    sources = get_instagram_sources()
-    if not sources:
-        print("No instagram sources found in the database.")
-        return
+def get_due_instagram_sources() -> List[Tuple[str, str]]:
+    """
+    (source_id, handle) for instagram sources due now by their
+    fetch_schedule, for cron-driven runs without the scheduler daemon.
+    """
+    now = time.time()
+    planned = plan_schedule(load_schedule("instagram"), now, get_scheduler_target_posts(), spread=0)
+    return [(row["id"], row["handle"]) for row in planned if row["due_at"] <= now]
 
-    print(f"Found {len(sources)} instagram sources.")
-    for source_id, handle in sources:
-        print(f"\n=== Fetching posts for @{handle} ===")
-        posts = fetch_instagram_posts(handle, limit=limit)
-        print(f"Fetched {len(posts)} posts from Apify for @{handle}")
 
-        if not posts:
-            continue
+def main(
+    limit: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    source_timeout: Optional[float] = None,
+    profiles_per_run: Optional[int] = None,
+    run_mode: Optional[str] = None,
+    due_only: bool = False,
+):
+    sources = get_due_instagram_sources() if due_only else get_instagram_sources()
+    if not sources:
+        print("No instagram sources due." if due_only else "No instagram sources found in the database.")
+        return
 
-        upsert_posts(
-            platform="instagram",
-            source_id=source_id,
-            posts=posts,
+    print(f"Found {len(sources)} instagram sources{' due' if due_only else ''}.")
+    stats = asyncio.run(
+        crawl_instagram_sources(
+            sources,
+            limit=limit,
+            concurrency=concurrency,
+            source_timeout=source_timeout,
+            profiles_per_run=profiles_per_run,
+            run_mode=run_mode,
         )
-        print(f"Upserted posts into posts_raw for @{handle}")
+    )
+
+    print("\n=== Crawl summary ===")
+    print(format_summary(stats))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Crawl all Instagram sources into posts_raw")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help="posts to request per source (default: sized from each source's posting rate)",
+    )
+    parser.add_argument("--concurrency", type=int, help="sources scraped at once (default: INGEST_CONCURRENCY or 5)")
+    parser.add_argument("--timeout", type=float, help="per-source timeout in seconds (default: 120)")
+    parser.add_argument(
+        "--profiles-per-run",
+        type=int,
+        help="profiles per Apify actor run (default: APIFY_PROFILES_PER_RUN, capped to fit the sync timeout)",
+    )
+    parser.add_argument(
+        "--run-mode",
+        choices=("sync", "async"),
+        help="'async' pages each run's dataset into ingestion as it fills (default: APIFY_RUN_MODE or sync)",
+    )
+    parser.add_argument(
+        "--due-only",
+        action="store_true",
+        help="only sources due by their fetch_schedule (see app.cli.crawl_scheduler for the daemon)",
+    )
+    args = parser.parse_args()
+
+    main(
+        limit=args.limit,
+        concurrency=args.concurrency,
+        source_timeout=args.timeout,
+        profiles_per_run=args.profiles_per_run,
+        run_mode=args.run_mode,
+        due_only=args.due_only,
+    )
@@ -0,0 +1,87 @@
+# app/cli/precompute_discovery.py
+"""
+Precompute discovery suggestions for every brand, so /discovery/ui only
+has to read the `discovery_suggestions` table.
+
+Usage:
+  # One pass over all brands (e.g. from cron, nightly)
+  python -m app.cli.precompute_discovery
+
+  #   0 3 * * *  cd /app && python -m app.cli.precompute_discovery
+
+  # Or keep running and recompute every N hours
+  python -m app.cli.precompute_discovery --loop --interval-hours 12
+
+  # Just one brand
+  python -m app.cli.precompute_discovery --brand-id 4c91c352-66f0-4c50-8466-dbaf4dfbff04
+"""
+
+from typing import Optional
+import argparse
+import time
+
+from app.config import get_discovery_parallel
+from app.services.discovery_service import discover_for_brand, list_brands, replace_suggestions
+
+# Stored beyond the page size: suggestions that get tracked (approved) are
+# deleted from the table, and these keep the page full until the next run.
+SPARE_SUGGESTIONS = 10
+
+
+def precompute_all(brand_id: Optional[str] = None, max_suggestions: int = 15) -> int:
+    """
+    One precompute pass. A failing brand is logged and skipped so it
+    doesn't hold up the rest. Returns the number of brands refreshed.
+    """
+    brands = list_brands()
+    if brand_id:
+        brands = [b for b in brands if b[0] == brand_id]
+
+    refreshed = 0
+    for b_id, name, voice_traits, account_handles in brands:
+        started = time.time()
+        try:
+            suggestions = discover_for_brand(
+                name,
+                voice_traits,
+                account_handles,
+                max_suggestions=max_suggestions + SPARE_SUGGESTIONS,
+                parallel=get_discovery_parallel(),
+            )
+        except Exception as e:
+            print(f"[precompute_discovery] {name}: discovery failed: {e}")
+            continue
+
+        if suggestions is None:
+            print(f"[precompute_discovery] {name}: no brand description/audience, skipping")
+            continue
+        if not suggestions:
+            # Keep yesterday's suggestions rather than blanking the page
+            print(f"[precompute_discovery] {name}: no suggestions returned, keeping previous set")
+            continue
+
+        stored = replace_suggestions(b_id, suggestions)
+        refreshed += 1
+        print(f"[precompute_discovery] {name}: stored {stored} suggestions in {time.time() - started:.1f}s")
+
+    return refreshed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute discovery suggestions for all brands")
+    parser.add_argument("--brand-id", help="only this brand")
+    parser.add_argument("--max-suggestions", type=int, default=15)
+    parser.add_argument("--loop", action="store_true", help="keep running instead of a single pass")
+    parser.add_argument("--interval-hours", type=float, default=24.0)
+    args = parser.parse_args()
+
+    while True:
+        refreshed = precompute_all(args.brand_id, args.max_suggestions)
+        print(f"[precompute_discovery] Refreshed {refreshed} brand(s)")
+        if not args.loop:
+            break
+        time.sleep(args.interval_hours * 3600)
+
+
+if __name__ == "__main__":
+    main()
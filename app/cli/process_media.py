@@ -0,0 +1,63 @@
+# app/cli/process_media.py
+"""
+Make thumbnails and perceptual hashes for downloaded media (see
+app/services/image_service.py). Run it after app.cli.download_media.
+
+Usage:
+  # Everything pending, then exit
+  python -m app.cli.process_media
+
+  # Keep running
+  python -m app.cli.process_media --loop --interval 60
+
+  # Tune the pass
+  python -m app.cli.process_media --workers 8 --batch 500
+"""
+
+from typing import Optional
+import argparse
+import time
+
+from app.config import get_media_batch_posts
+from app.services.image_service import format_summary, process_pending_images
+
+
+def drain(batch: int, workers: Optional[int]) -> dict:
+    """Run passes until no unprocessed images are left. Returns the summed stats."""
+    total = {"images": 0, "processed": 0, "failed": 0, "thumb_bytes": 0, "posts_updated": 0, "elapsed_s": 0.0}
+    while True:
+        stats = process_pending_images(max_objects=batch, workers=workers)
+        for k, v in stats.items():
+            total[k] += v
+        if stats["images"]:
+            print(f"[process_media] {stats['processed']}/{stats['images']} images, {stats['posts_updated']} posts")
+        if stats["images"] < batch:
+            return total
+
+
+def main(
+    loop: bool = False,
+    interval: float = 60.0,
+    batch: Optional[int] = None,
+    workers: Optional[int] = None,
+):
+    batch = batch or get_media_batch_posts()
+    while True:
+        total = drain(batch, workers)
+        if not loop:
+            print("\n=== Image summary ===")
+            print(format_summary(total))
+            return
+        if total["images"]:
+            print(format_summary(total))
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Thumbnail and hash downloaded post images")
+    parser.add_argument("--loop", action="store_true", help="keep polling for new media")
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between polls with --loop (default: 60)")
+    parser.add_argument("--batch", type=int, help="images per pass (default: MEDIA_BATCH_POSTS or 200)")
+    parser.add_argument("--workers", type=int, help="image processes (default: MEDIA_IMAGE_WORKERS or CPU count)")
+    args = parser.parse_args()
+    main(loop=args.loop, interval=args.interval, batch=args.batch, workers=args.workers)
@@ -0,0 +1,178 @@
+# app/cli/replay_raw_archive.py
+"""
+Re-ingest archived raw Apify responses (see app/services/raw_archive.py)
+through the current normalization and the bulk upsert, without any
+network calls to Apify. Use it after fixing a field mapping instead of
+re-scraping.
+
+Usage:
+  # Everything archived in RAW_ARCHIVE_BUCKET (asa-exports)
+  python -m app.cli.replay_raw_archive
+
+  # One day, or a key prefix
+  python -m app.cli.replay_raw_archive --day 2026-10-01
+  python -m app.cli.replay_raw_archive --prefix instagram/raw/2026/10/
+
+  # Archive files copied somewhere local
+  python -m app.cli.replay_raw_archive --file a.jsonl.gz --file b.jsonl.gz
+
+  # Rewrite the content of posts we already have with the new normalization
+  # (engagement is kept: the archived numbers are older than the crawled ones)
+  python -m app.cli.replay_raw_archive --overwrite
+
+  # Only count what would be ingested
+  python -m app.cli.replay_raw_archive --dry-run
+"""
+
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import argparse
+import time
+
+from app.config import get_raw_archive_bucket
+from app.db.connection import get_db_cursor
+from app.db.object_store import get_object_store
+from app.services.ingestion_service import STAGING_PAGE_SIZE, upsert_posts
+from app.services.instagram_scraper import normalize_raw_items
+from app.services.raw_archive import ARCHIVE_SUFFIX, archive_prefix, read_archive
+
+
+def _source_ids(platform: str) -> Dict[str, str]:
+    """{lowercased handle: source_id} for every source of a platform."""
+    with get_db_cursor() as cur:
+        cur.execute("select id, handle from sources where platform = %s", (platform,))
+        return {r[1].lstrip("@").lower(): str(r[0]) for r in cur.fetchall()}
+
+
+def _archives(
+    files: Optional[List[str]],
+    prefix: str,
+) -> Iterator[Tuple[str, BinaryIO]]:
+    """(name, stream) for each archive to replay, oldest first."""
+    if files:
+        for path in files:
+            yield path, open(path, "rb")
+        return
+
+    store = get_object_store(get_raw_archive_bucket())
+    for key in store.list(prefix):
+        if key.endswith(ARCHIVE_SUFFIX):
+            yield store.describe(key), store.open(key)
+
+
+def replay(
+    files: Optional[List[str]] = None,
+    prefix: str = "",
+    overwrite: bool = False,
+    dry_run: bool = False,
+    platform: str = "instagram",
+) -> Dict[str, Any]:
+    """
+    Replay archives into posts_raw. Posts are buffered per source and
+    written STAGING_PAGE_SIZE at a time, so a large replay is a handful of
+    bulk statements per source rather than one per archive.
+
+    Archives are read oldest first (keys sort by fetch time), and a post
+    seen again while buffered replaces the earlier copy, so the latest
+    response is what gets written.
+    """
+    stats: Dict[str, Any] = {
+        "archives": 0,
+        "failed_archives": 0,
+        "items": 0,
+        "posts": 0,
+        "inserted": 0,
+        "updated": 0,
+        "skipped": 0,
+        "unknown_handles": set(),
+        "elapsed_s": 0.0,
+    }
+    started = time.monotonic()
+    source_ids = {} if dry_run else _source_ids(platform)
+    pending: Dict[str, Dict[str, Dict[str, Any]]] = {}  # source_id -> {post_id: post}
+
+    def flush(source_id: str) -> None:
+        posts = list(pending.pop(source_id, {}).values())
+        if not posts or dry_run:
+            return
+        # archived engagement is stale: never snapshot it, and --overwrite
+        # only rewrites content (see scripts/test_replay_overwrite.py)
+        counts = upsert_posts(
+            platform=platform, source_id=source_id, posts=posts,
+            overwrite=overwrite, track_engagement=False,
+        )
+        for k in ("inserted", "updated", "skipped"):
+            stats[k] += counts.get(k, 0)
+
+    for name, stream in _archives(files, prefix):
+        try:
+            header, items = read_archive(stream)
+            raw = list(items)
+        except Exception as e:
+            stats["failed_archives"] += 1
+            print(f"[replay_raw_archive] {name}: unreadable: {e}")
+            continue
+        finally:
+            stream.close()
+        if header.get("platform", platform) != platform:
+            continue
+
+        stats["archives"] += 1
+        stats["items"] += len(raw)
+        for username, posts in normalize_raw_items(raw, header.get("usernames") or []).items():
+            if not posts:
+                continue
+            stats["posts"] += len(posts)
+            if dry_run:
+                continue
+            source_id = source_ids.get(username)
+            if source_id is None:
+                stats["unknown_handles"].add(username)
+                continue
+            buffered = pending.setdefault(source_id, {})
+            for post in posts:
+                post_id = str(post.get("post_id") or "").strip()
+                if not post_id:
+                    stats["skipped"] += 1
+                    continue
+                if post_id in buffered:
+                    # an older copy of this post: the later archive wins
+                    stats["skipped"] += 1
+                buffered[post_id] = post
+            if len(buffered) >= STAGING_PAGE_SIZE:
+                flush(source_id)
+
+        if stats["archives"] % 100 == 0:
+            print(f"[replay_raw_archive] {stats['archives']} archives, {stats['posts']} posts so far")
+
+    for source_id in list(pending):
+        flush(source_id)
+
+    stats["elapsed_s"] = time.monotonic() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-ingest archived raw Apify responses (no scraping)")
+    parser.add_argument("--file", action="append", help="archive file to replay (repeatable); default: the bucket")
+    parser.add_argument("--day", help="only archives from this day (YYYY-MM-DD)")
+    parser.add_argument("--prefix", help="only archive keys under this prefix")
+    parser.add_argument("--overwrite", action="store_true", help="update the content of posts we already have if it changed")
+    parser.add_argument("--dry-run", action="store_true", help="read and normalize, don't write")
+    args = parser.parse_args()
+
+    prefix = args.prefix or archive_prefix("instagram", args.day)
+    stats = replay(files=args.file, prefix=prefix, overwrite=args.overwrite, dry_run=args.dry_run)
+
+    elapsed = max(stats["elapsed_s"], 1e-9)
+    print("\n=== Replay summary ===")
+    print(f"Archives:   {stats['archives']} read, {stats['failed_archives']} unreadable")
+    print(f"Posts:      {stats['items']} raw items -> {stats['posts']} normalized posts")
+    if not args.dry_run:
+        print(f"Stored:     {stats['inserted']} inserted, {stats['updated']} updated, {stats['skipped']} unchanged")
+    print(f"Elapsed:    {stats['elapsed_s']:.1f}s ({stats['items'] / elapsed:.0f} items/s)")
+    if stats["unknown_handles"]:
+        print(f"Skipped handles with no source: {', '.join(sorted(stats['unknown_handles']))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+# app/config.py
+"""
+Runtime settings read from the environment (.env), with sensible defaults.
+
+Everything here is read at call time, so tests and scripts can override a
+value by setting the env var before calling into the app.
+"""
+
+from typing import Optional, Tuple
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an int env var, falling back to `default` if unset or invalid."""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float env var, falling back to `default` if unset or invalid."""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean env var ('1', 'true', 'yes', 'on' are true)."""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_inspiration_token_budget() -> int:
+    """
+    Max number of prompt tokens the drafting agent may spend on
+    inspiration posts (captions + metadata).
+    """
+    return _env_int("INSPIRATION_TOKEN_BUDGET", 1200)
+
+
+def get_cassette_mode() -> str:
+    """
+    Record/replay mode for external calls (see app/utils/cassette.py):
+    'off' (default), 'record' or 'replay'.
+    """
+    mode = os.getenv("CASSETTE_MODE", "off").strip().lower()
+    return mode if mode in ("off", "record", "replay") else "off"
+
+
+def get_cassette_dir() -> str:
+    """Directory holding cassette files."""
+    return os.getenv("CASSETTE_DIR", "cassettes")
+
+
+def get_cassette_latency() -> str:
+    """
+    Synthetic latency applied to each replayed call:
+    a number of milliseconds, or 'recorded' to replay the original timing.
+    """
+    return os.getenv("CASSETTE_LATENCY_MS", "0").strip().lower()
+
+
+def get_openai_base_url() -> Optional[str]:
+    """
+    Override the OpenAI API base URL, e.g. http://localhost:8100/v1 to run
+    against the local stub server (app/stubs/openai_server.py).
+    """
+    return os.getenv("OPENAI_BASE_URL") or None
+
+
+def get_discovery_cache_ttl() -> int:
+    """
+    Seconds cached discovery suggestions count as fresh. Older entries are
+    still served, but trigger a background refresh.
+    """
+    return _env_int("DISCOVERY_CACHE_TTL_SECONDS", 6 * 3600)
+
+
+def get_discovery_cache_max_age() -> int:
+    """Seconds after which cached discovery suggestions are dropped entirely."""
+    return _env_int("DISCOVERY_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600)
+
+
+def get_discovery_parallel() -> bool:
+    """
+    Fan discovery out into one small LLM request per (platform, account type)
+    instead of one big request.
+    """
+    return _env_bool("DISCOVERY_PARALLEL", False)
+
+
+def get_discovery_deadline_seconds() -> float:
+    """How long a fanned-out discovery run waits for its slowest sub-request."""
+    return _env_float("DISCOVERY_DEADLINE_SECONDS", 20.0)
+
+
+def get_discovery_accounts_per_slice() -> int:
+    """Max accounts requested from each fanned-out discovery sub-request."""
+    return _env_int("DISCOVERY_ACCOUNTS_PER_SLICE", 3)
+
+
+def get_singleflight_lock_seconds() -> int:
+    """
+    How long a single-flight leader may hold the cross-worker lock before
+    it's considered dead and another worker takes over.
+    """
+    return _env_int("SINGLEFLIGHT_LOCK_SECONDS", 120)
+
+
+def get_singleflight_result_seconds() -> int:
+    """How long a single-flight result stays available to waiting workers."""
+    return _env_int("SINGLEFLIGHT_RESULT_SECONDS", 15)
+
+
+def get_admission_limits(route: str, concurrency: int, queue: int) -> Tuple[int, int]:
+    """
+    (max concurrent, max queued) requests for an admission-controlled route,
+    from ADMISSION_<ROUTE>_CONCURRENCY / ADMISSION_<ROUTE>_QUEUE.
+    """
+    prefix = f"ADMISSION_{route.upper()}"
+    return _env_int(f"{prefix}_CONCURRENCY", concurrency), _env_int(f"{prefix}_QUEUE", queue)
+
+
+def get_admission_queue_timeout() -> float:
+    """Seconds a queued request waits for a slot before getting a 503."""
+    return _env_float("ADMISSION_QUEUE_TIMEOUT_SECONDS", 10.0)
+
+
+def get_request_deadline_seconds() -> float:
+    """Deadline for an LLM-backed request (discovery), end to end."""
+    return _env_float("REQUEST_DEADLINE_SECONDS", 30.0)
+
+
+def get_fetch_deadline_seconds() -> float:
+    """Deadline for a manual dashboard fetch (Apify scrape + ingest)."""
+    return _env_float("FETCH_DEADLINE_SECONDS", 120.0)
+
+
+def get_ingest_concurrency() -> int:
+    """How many sources the Instagram crawler scrapes at the same time."""
+    return _env_int("INGEST_CONCURRENCY", 5)
+
+
+def get_ingest_batch_size() -> int:
+    """Posts per upsert when ingesting a streamed scrape response."""
+    return _env_int("INGEST_BATCH_SIZE", 200)
+
+
+def get_ingest_source_timeout() -> float:
+    """Seconds one source's scrape may take before it's counted as failed."""
+    return _env_float("INGEST_SOURCE_TIMEOUT_SECONDS", 120.0)
+
+
+def get_apify_profiles_per_run() -> int:
+    """Max Instagram profiles sent to Apify in one multi-profile actor run."""
+    return _env_int("APIFY_PROFILES_PER_RUN", 5)
+
+
+def get_apify_seconds_per_profile() -> float:
+    """
+    Rough actor time per profile at 20 posts, used to keep multi-profile
+    runs inside the run-sync timeout.
+    """
+    return _env_float("APIFY_SECONDS_PER_PROFILE", 30.0)
+
+
+def get_apify_base_url() -> str:
+    """
+    Apify API base URL. Point it at the local stub (app/stubs/apify_server.py),
+    e.g. http://localhost:8200, for offline runs and benchmarks.
+    """
+    return os.getenv("APIFY_BASE_URL") or "https://api.apify.com"
+
+
+def get_apify_run_mode() -> str:
+    """
+    'sync': one blocking run-sync-get-dataset-items call per run (300 s cap).
+    'async': start the run, poll it, and page through its dataset.
+    """
+    mode = os.getenv("APIFY_RUN_MODE", "sync").strip().lower()
+    return mode if mode in ("sync", "async") else "sync"
+
+
+def get_apify_page_size() -> int:
+    """Dataset items fetched per page in async run mode."""
+    return _env_int("APIFY_PAGE_SIZE", 100)
+
+
+def get_apify_run_timeout() -> float:
+    """Seconds an async-mode actor run may take before we abort it."""
+    return _env_float("APIFY_RUN_TIMEOUT_SECONDS", 1800.0)
+
+
+def get_scheduler_workers() -> int:
+    """Crawl batches the scheduler daemon runs at once."""
+    return _env_int("SCHEDULER_WORKERS", 2)
+
+
+def get_scheduler_batch_size() -> int:
+    """Due sources handed to one worker (one crawl_instagram_sources call)."""
+    return _env_int("SCHEDULER_BATCH_SIZE", 10)
+
+
+def get_scheduler_refresh_seconds() -> float:
+    """How often the scheduler re-reads sources (new sources, changed schedules)."""
+    return _env_float("SCHEDULER_REFRESH_SECONDS", 300.0)
+
+
+def get_scheduler_spread_seconds() -> float:
+    """Window over which new or overdue sources are spread instead of crawled at once."""
+    return _env_float("SCHEDULER_SPREAD_SECONDS", 900.0)
+
+
+def get_scheduler_target_posts() -> int:
+    """New posts we'd like each crawl to find; busy sources get crawled more often."""
+    return _env_int("SCHEDULER_TARGET_POSTS", 10)
+
+
+def get_scheduler_retry_seconds() -> float:
+    """Retry delay for a source whose crawl failed (capped at its interval)."""
+    return _env_float("SCHEDULER_RETRY_SECONDS", 900.0)
+
+
+def get_crawl_default_limit() -> int:
+    """resultsLimit for a source we can't estimate yet (first crawl, no history)."""
+    return _env_int("CRAWL_DEFAULT_LIMIT", 20)
+
+
+def get_crawl_max_limit() -> int:
+    """Upper bound on the adaptive per-source resultsLimit."""
+    return _env_int("CRAWL_MAX_LIMIT", 100)
+
+
+def get_object_store_backend() -> str:
+    """
+    'minio': S3 API at MINIO_ENDPOINT. 'local': files under OBJECT_STORE_DIR.
+    Defaults to minio when MINIO_ENDPOINT is set (setup.sh writes it).
+    """
+    default = "minio" if os.getenv("MINIO_ENDPOINT") else "local"
+    backend = os.getenv("OBJECT_STORE_BACKEND", default).strip().lower()
+    return backend if backend in ("minio", "local") else default
+
+
+def get_object_store_dir() -> str:
+    """Root directory of the local object store backend."""
+    return os.getenv("OBJECT_STORE_DIR") or os.path.join("data", "objects")
+
+
+def get_raw_archive_enabled() -> bool:
+    """Archive every raw Apify response before normalization."""
+    return _env_bool("RAW_ARCHIVE_ENABLED", True)
+
+
+def get_raw_archive_bucket() -> str:
+    """Bucket raw scrape archives are written to."""
+    return os.getenv("RAW_ARCHIVE_BUCKET") or "asa-exports"
+
+
+def get_media_bucket() -> str:
+    """Bucket downloaded post media is stored in (setup.sh's MINIO_BUCKET)."""
+    return os.getenv("MEDIA_BUCKET") or os.getenv("MINIO_BUCKET") or "asa-media"
+
+
+def get_media_concurrency() -> int:
+    """Media files the download worker fetches at the same time."""
+    return _env_int("MEDIA_CONCURRENCY", 16)
+
+
+def get_media_batch_posts() -> int:
+    """Posts whose media the download worker handles per pass."""
+    return _env_int("MEDIA_BATCH_POSTS", 200)
+
+
+def get_media_max_bytes() -> int:
+    """Media files larger than this are skipped."""
+    return _env_int("MEDIA_MAX_BYTES", 50 * 1024 * 1024)
+
+
+def get_media_timeout() -> float:
+    """Seconds one media download may take."""
+    return _env_float("MEDIA_TIMEOUT_SECONDS", 30.0)
+
+
+def get_media_thumb_size() -> int:
+    """Edge length in pixels of the square thumbnails made from stored images."""
+    return _env_int("MEDIA_THUMB_SIZE", 320)
+
+
+def get_media_image_workers() -> int:
+    """Processes decoding images for thumbnails and hashes (default: CPU count)."""
+    return _env_int("MEDIA_IMAGE_WORKERS", os.cpu_count() or 2)
+
+
+def get_media_duplicate_distance() -> int:
+    """Max differing dHash bits for two images to count as the same picture."""
+    return _env_int("MEDIA_DUPLICATE_DISTANCE", 6)
+
+
+def get_engagement_refresh_hours() -> float:
+    """
+    Crawls re-fetch posts at least this recent (even if already stored) so
+    their engagement keeps being snapshotted. 0 only fetches new posts.
+    """
+    return _env_float("ENGAGEMENT_REFRESH_HOURS", 24.0)
+
+
+def get_crawl_lease_seconds() -> int:
+    """
+    Expiry of a per-source crawl lease. The holder renews it while it
+    crawls, so this is how long a crashed crawl blocks its sources.
+    """
+    return _env_int("CRAWL_LEASE_SECONDS", 60)
@@ -0,0 +1,174 @@
+# app/db/object_store.py
+"""
+Minimal object storage: MinIO (S3 API, via boto3) in docker-compose, or a
+plain directory for local dev without MinIO.
+
+OBJECT_STORE_BACKEND=minio uses MINIO_ENDPOINT / MINIO_ACCESS_KEY /
+MINIO_SECRET_KEY; OBJECT_STORE_BACKEND=local stores bucket/key under
+OBJECT_STORE_DIR (default ./data/objects).
+"""
+
+from typing import BinaryIO, Dict, Iterator, Optional
+import os
+import shutil
+import threading
+
+from app.config import get_object_store_backend, get_object_store_dir
+
+_stores: Dict[str, "ObjectStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def get_minio_config() -> dict:
+    """Get MinIO configuration from environment or defaults."""
+    endpoint = os.getenv("MINIO_ENDPOINT", "localhost:9000")
+    if not endpoint.startswith(("http://", "https://")):
+        endpoint = f"http://{endpoint}"
+    return {
+        "endpoint_url": endpoint,
+        "aws_access_key_id": os.getenv("MINIO_ACCESS_KEY", "minio"),
+        "aws_secret_access_key": os.getenv("MINIO_SECRET_KEY", "minio123"),
+    }
+
+
+class ObjectStore:
+    """put/get/list of whole objects in one bucket."""
+
+    bucket: str
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        """Upload from an open file (read from its current position) without loading it whole."""
+        raise NotImplementedError
+
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def open(self, key: str) -> BinaryIO:
+        """A readable stream over the object, for reading it without loading it whole."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        """Keys under `prefix`, in lexical order."""
+        raise NotImplementedError
+
+    def describe(self, key: str) -> str:
+        """Where an object lives, for log lines."""
+        raise NotImplementedError
+
+
+class LocalObjectStore(ObjectStore):
+    def __init__(self, root: str, bucket: str):
+        self.bucket = bucket
+        self.root = os.path.join(root, bucket)
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"object key escapes the bucket: {key!r}")
+        return path
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # readers never see a half-written object
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, "wb") as f:
+            shutil.copyfileobj(fileobj, f)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        keys = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if ".tmp." in name:
+                    continue
+                key = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return iter(sorted(keys))
+
+    def describe(self, key: str) -> str:
+        return self._path(key)
+
+
+class S3ObjectStore(ObjectStore):
+    def __init__(self, bucket: str):
+        import boto3  # only needed with the minio backend
+
+        self.bucket = bucket
+        self.client = boto3.client("s3", **get_minio_config())
+
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+
+    def put_file(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> None:
+        extra = {"ExtraArgs": {"ContentType": content_type}} if content_type else {}
+        self.client.upload_fileobj(fileobj, self.bucket, key, **extra)  # multipart for big files
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def list(self, prefix: str = "") -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"]
+
+    def describe(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+
+def get_object_store(bucket: str) -> ObjectStore:
+    """
+    Return a process-wide store for `bucket` (boto3 clients are thread-safe,
+    so one per bucket is shared across threads).
+    """
+    store = _stores.get(bucket)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(bucket)
+            if store is None:
+                if get_object_store_backend() == "minio":
+                    store = S3ObjectStore(bucket)
+                else:
+                    store = LocalObjectStore(get_object_store_dir(), bucket)
+                _stores[bucket] = store
+    return store
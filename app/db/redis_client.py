@@ -0,0 +1,42 @@
+# app/db/redis_client.py
+"""
+Shared Redis client, configured from the environment like the Postgres one.
+"""
+
+import os
+import threading
+
+import redis
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_config() -> dict:
+    """Get Redis configuration from environment or defaults."""
+    return {
+        "host": os.getenv("REDIS_HOST", "localhost"),
+        "port": int(os.getenv("REDIS_PORT", 6379)),
+        "db": int(os.getenv("REDIS_DB", 0)),
+    }
+
+
+def get_redis_client() -> redis.Redis:
+    """
+    Return a process-wide Redis client (it owns a connection pool, so it is
+    safe and cheap to share across threads).
+
+    Short socket timeouts keep callers fast when Redis is down: anything
+    using Redis as a cache should catch redis.RedisError and fall back.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis(
+                    **get_redis_config(),
+                    decode_responses=True,
+                    socket_connect_timeout=0.5,
+                    socket_timeout=1.0,
+                )
+    return _client
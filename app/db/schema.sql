@@ -98,4 +98,87 @@ create table if not exists metrics (
   shares bigint,
   ctr numeric,
   watch_time numeric
-);
\ No newline at end of file
+);
+
+-- precomputed discovery suggestions (app/cli/precompute_discovery.py)
+create table if not exists discovery_suggestions (
+  id uuid primary key default gen_random_uuid(),
+  brand_id uuid references brands(id) on delete cascade,
+  platform text not null,
+  handle text not null,
+  display_name text,
+  type text,
+  reason text,
+  voice_notes text,
+  fit_score numeric,
+  generated_at timestamptz default now()
+);
+
+create index if not exists discovery_suggestions_brand_fit_idx
+  on discovery_suggestions (brand_id, fit_score desc);
+
+
+-- incremental crawling: newest post seen per source and the last crawl's yield
+alter table sources add column if not exists last_post_at timestamptz;
+alter table sources add column if not exists last_post_id text;
+alter table sources add column if not exists last_crawl_new int;
+alter table sources add column if not exists last_crawl_known int;
+
+-- adaptive crawl limits: estimated posting rate and what the last crawl expected
+alter table sources add column if not exists posts_per_day double precision;
+alter table sources add column if not exists last_crawl_expected double precision;
+
+-- downloaded post media (app/services/media_service.py): one object per
+-- distinct file (sha256), one row per media URL we've tried
+create table if not exists media_objects (
+  sha256 text primary key,
+  object_key text not null,
+  content_type text,
+  bytes bigint,
+  created_at timestamptz default now()
+);
+
+create table if not exists media_downloads (
+  url_key text primary key,
+  url text,
+  status text not null,
+  sha256 text references media_objects(sha256),
+  error text,
+  attempts int not null default 1,
+  fetched_at timestamptz default now()
+);
+
+alter table posts_raw add column if not exists media_keys text[];
+
+create index if not exists posts_raw_media_pending_idx
+  on posts_raw (created_at desc) where media_keys is null;
+
+-- image stage (app/services/image_service.py): thumbnail + 64-bit dHash
+-- per stored image, copied onto posts in media_keys order
+alter table media_objects add column if not exists thumb_key text;
+alter table media_objects add column if not exists dhash bigint;
+alter table media_objects add column if not exists width int;
+alter table media_objects add column if not exists height int;
+alter table media_objects add column if not exists process_error text;
+alter table media_objects add column if not exists processed_at timestamptz;
+
+create unique index if not exists media_objects_object_key_idx on media_objects (object_key);
+create index if not exists media_objects_unprocessed_idx
+  on media_objects (created_at) where processed_at is null;
+
+alter table posts_raw add column if not exists thumb_keys text[];
+alter table posts_raw add column if not exists dhashes bigint[];
+
+create index if not exists posts_raw_dhashes_idx on posts_raw using gin (dhashes);
+
+-- engagement over time: one row per post per crawl that saw it change;
+-- posts_raw.engagement always holds the latest value
+create table if not exists engagement_snapshots (
+  post_raw_id uuid not null references posts_raw(id) on delete cascade,
+  captured_at timestamptz not null default now(),
+  likes int,
+  comments int,
+  primary key (post_raw_id, captured_at)
+);
+
+alter table posts_raw add column if not exists engagement_updated_at timestamptz;
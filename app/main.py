@@ -8,9 +8,13 @@ from app.routes.discovery import router as discovery_router
 from app.routes.sources import router as sources_router
 from app.routes.dashboard import router as dashboard_router
 from app.routes.scheduled import router as scheduled_router
+from app.utils.admission import AdmissionControlMiddleware, default_gates
 
 app = FastAPI(title="FuelAI Agents", version="1.0.0")
 
+# Concurrency limits + bounded queues on slow LLM/scraper routes
+app.add_middleware(AdmissionControlMiddleware, gates=default_gates())
+
 app.include_router(health_router)
 app.include_router(discovery_router)
 app.include_router(sources_router)
@@ -1,11 +1,15 @@
 # app/routes/dashboard.py
 
 from typing import Dict, Any, List, Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 import psycopg2
 from datetime import datetime
 
+from app.config import get_fetch_deadline_seconds
+from app.utils.deadline import run_cancellable
+
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
@@ -36,13 +40,17 @@ def dashboard_home():
             s.is_competitor,
             s.fetch_schedule,
             s.last_crawl_at,
+            s.posts_per_day,
+            s.last_crawl_new,
+            s.last_crawl_expected,
             COUNT(DISTINCT p.id) as post_count,
             MAX(p.posted_at) as latest_post,
             COALESCE(SUM((p.engagement->>'likes')::int), 0) as total_likes,
             COALESCE(SUM((p.engagement->>'comments')::int), 0) as total_comments
         FROM sources s
         LEFT JOIN posts_raw p ON p.source_id = s.id
-        GROUP BY s.id, s.platform, s.handle, s.is_competitor, s.fetch_schedule, s.last_crawl_at
+        GROUP BY s.id, s.platform, s.handle, s.is_competitor, s.fetch_schedule, s.last_crawl_at,
+                 s.posts_per_day, s.last_crawl_new, s.last_crawl_expected
         ORDER BY post_count DESC, s.handle
     """)
     sources = cur.fetchall()
@@ -78,7 +86,8 @@ def dashboard_home():
     # Build sources table
     sources_html = ""
     if sources:
-        for (src_id, platform, handle, is_competitor, schedule, last_crawl, 
+        for (src_id, platform, handle, is_competitor, schedule, last_crawl,
+             posts_per_day, last_new, last_expected,
              post_count, latest_post, total_likes, total_comments) in sources:
             
             platform_badge = _get_platform_badge(platform)
@@ -93,6 +102,11 @@ def dashboard_home():
                 last_crawl_str = _format_time_ago(last_crawl)
             else:
                 last_crawl_str = "Never"
+            if last_new is not None and last_expected is not None:
+                last_crawl_str += f'<br><small>{last_new} new / {last_expected:.1f} expected</small>'
+            
+            # Estimated posting rate
+            rate_str = f'<br><small>~{posts_per_day:.1f} posts/day</small>' if posts_per_day is not None else ""
             
             # Latest post
             if latest_post:
@@ -110,7 +124,7 @@ def dashboard_home():
                 <td>{comments_str}</td>
                 <td>{latest_post_str}</td>
                 <td>{last_crawl_str}</td>
-                <td><span class="schedule-badge">{schedule}</span></td>
+                <td><span class="schedule-badge">{schedule}</span>{rate_str}</td>
                 <td>
                     <button class="btn-small btn-fetch" onclick="fetchPosts('{src_id}', '{handle}')">Fetch</button>
                     <button class="btn-small btn-delete" onclick="deleteSource('{src_id}', '{handle}')">Delete</button>
@@ -517,7 +531,7 @@ def dashboard_home():
                     const data = await resp.json();
                     
                     if (resp.ok) {{
-                        alert(`Success! Fetched ${{data.posts_fetched}} posts for @${{handle}}`);
+                        alert(`Success! Fetched ${{data.posts_fetched}} posts for @${{handle}} (${{data.posts_new}} new)`);
                         location.reload();
                     }} else {{
                         alert('Error: ' + (data.error || 'Unknown error'));
@@ -552,12 +566,28 @@ def dashboard_home():
 
 
 @router.post("/fetch/{source_id}")
-async def fetch_source_posts(source_id: str):
+async def fetch_source_posts(source_id: str, request: Request):
     """
     Manually trigger a fetch for a specific source.
+
+    The scrape is async and runs under FETCH_DEADLINE_SECONDS; if the user
+    navigates away it is cancelled instead of holding an Apify run.
+
+    Only one crawl per source runs at a time (crawl_lock): if another fetch
+    or the crawler is already scraping this source, we wait for its result
+    instead of paying Apify twice.
     """
-    from app.services.instagram_scraper import fetch_instagram_posts
+    from app.services.instagram_scraper import afetch_instagram_posts
     from app.services.ingestion_service import upsert_posts
+    from app.services.crawl_lock import crawl_flight, crawl_key, crawl_result
+    from app.services.crawl_service import (
+        load_marks,
+        newer_than,
+        newest_post,
+        plan_limits,
+        record_crawl,
+        split_new_posts,
+    )
     from app.db.connection import get_db_cursor
     
     # Get source details
@@ -577,35 +607,59 @@ async def fetch_source_posts(source_id: str):
     if platform != "instagram":
         raise HTTPException(status_code=400, detail="Only Instagram supported for now")
     
-    try:
+    async def crawl() -> Dict[str, Any]:
+        # Only ask for posts newer than what we already have, and about as
+        # many as the account's posting rate says there should be
+        mark = (await run_in_threadpool(load_marks, [source_id])).get(source_id)
+        since = newer_than([mark]) if mark else None
+        limit, expected = (await run_in_threadpool(plan_limits, [source_id]))[source_id]
+
         # Fetch posts
-        posts = fetch_instagram_posts(handle, limit=20)
+        posts = await afetch_instagram_posts(handle, limit=limit, newer_than=since)
+        new_posts, known = split_new_posts(posts, mark)
         
-        # Ingest
-        upsert_posts(
+        # Ingest (off the event loop); known posts refresh their engagement
+        counts = await run_in_threadpool(
+            upsert_posts,
             platform=platform,
             source_id=source_id,
             posts=posts
         )
         
-        # Update last_crawl_at
-        with get_db_cursor() as cur:
-            cur.execute("""
-                UPDATE sources
-                SET last_crawl_at = NOW()
-                WHERE id = %s
-            """, (source_id,))
+        # Update last_crawl_at and the high-water mark
+        await run_in_threadpool(
+            record_crawl, source_id, len(new_posts), known, newest_post(new_posts), expected
+        )
         
-        return {
-            "success": True,
-            "posts_fetched": len(posts),
-            "handle": handle
-        }
+        return crawl_result(
+            handle, len(posts), len(new_posts), known, counts["engagement_updated"], expected, limit
+        )
+    
+    try:
+        return await run_cancellable(
+            request,
+            lambda: crawl_flight.do_async(crawl_key(source_id), crawl),
+            seconds=get_fetch_deadline_seconds(),
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/posts/{post_id}/duplicates")
+def post_duplicates(post_id: str, max_distance: Optional[int] = None):
+    """
+    Posts from any source whose images look like this post's (dHash within
+    max_distance bits, default MEDIA_DUPLICATE_DISTANCE), closest first.
+    Empty until app.cli.process_media has hashed the post's images.
+    """
+    from app.services.image_service import find_duplicate_posts
+
+    return {"post_id": post_id, "duplicates": find_duplicate_posts(post_id, max_distance)}
+
+
 def _get_platform_badge(platform: str) -> str:
     """Generate platform badge HTML."""
     badges = {
@@ -1,12 +1,26 @@
 # app/routes/discovery.py
 
-from typing import Dict, List, Any
-from fastapi import APIRouter
+from typing import Dict, List, Any, Optional
+from fastapi import APIRouter, BackgroundTasks, Request
 from fastapi.responses import HTMLResponse
 import psycopg2
+import html as html_lib
 import json
 
 from app.agents.discovery_agent import suggest_accounts_for_brand
+from app.config import get_discovery_parallel, get_request_deadline_seconds
+from app.db.connection import get_db_cursor
+from app.services.discovery_cache import cache_key, get_suggestions_swr
+from app.services.discovery_service import (
+    FUELAI_AUDIENCE,
+    FUELAI_DESCRIPTION,
+    get_brand_profile,
+    get_existing_handles,
+    load_suggestions,
+)
+from app.utils import deadline
+from app.utils.deadline import run_cancellable
+from app.utils.singleflight import fingerprint, single_flight
 
 router = APIRouter(prefix="/discovery", tags=["discovery"])
 
@@ -21,122 +35,175 @@ def _get_db_conn():
     )
 
 
-def _get_existing_handles_for_brand(brand_id: str) -> dict:
+def _get_existing_handles_for_brand(brand_id: str, account_handles: Optional[dict] = None) -> dict:
     """
     Collect existing handles for the brand itself (brands.account_handles)
-    AND any already-approved sources from the sources table.
-    Returns a dict:
+    AND any already-approved sources (from the handle index, so we don't
+    scan the sources table on every request).
+    Returns a dict of sorted, normalized handles:
       {
         "instagram": [...],
         "facebook": [...],
         "linkedin": [...]
       }
     """
-    conn = _get_db_conn()
-    cur = conn.cursor()
+    if account_handles is None:
+        with get_db_cursor() as cur:
+            cur.execute(
+                """
+                select account_handles
+                from brands
+                where id = %s
+                """,
+                (brand_id,),
+            )
+            row = cur.fetchone()
+        account_handles = row[0] if row else {}
+
+    return get_existing_handles(account_handles)
 
-    # Brand's own handles
-    cur.execute(
-        """
-        select account_handles
-        from brands
-        where id = %s
-        """,
-        (brand_id,),
-    )
-    row = cur.fetchone()
-    if row:
-        account_handles = row[0]
-    else:
-        account_handles = {}
 
-    if isinstance(account_handles, str):
-        account_handles = json.loads(account_handles)
+@router.get("/suggestions")
+async def get_suggestions(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    max_suggestions: int = 15,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    Return suggested accounts for the FuelAI brand as JSON.
 
-    existing = {
-        "instagram": [],
-        "facebook": [],
-        "linkedin": [],
-    }
+    Served from the Redis cache when we have an answer for the same brand
+    description, audience and tracked handles; stale answers are refreshed
+    in the background. Pass force_refresh=true to regenerate right now.
 
-    for plat in existing.keys():
-        handle = account_handles.get(plat)
-        if handle:
-            existing[plat].append(handle)
+    Identical concurrent requests (in this worker or any other) are
+    coalesced, so a burst of page loads triggers at most one LLM call.
 
-    # Now pull all sources
-    cur.execute(
-        """
-        select platform, handle
-        from sources
-        """
+    Runs under REQUEST_DEADLINE_SECONDS. If the client disconnects we stop
+    waiting; the shared LLM work is cancelled once no caller is left.
+    """
+    key = fingerprint("discovery_suggestions", max_suggestions, force_refresh)
+    return await run_cancellable(
+        request,
+        lambda: single_flight.do_async(
+            key,
+            lambda: deadline.to_thread(_load_suggestions, background_tasks, max_suggestions, force_refresh),
+        ),
+        seconds=get_request_deadline_seconds(),
     )
-    for platform, handle in cur.fetchall():
-        platform = (platform or "").lower()
-        if platform in existing and handle:
-            existing[platform].append(handle)
-
-    cur.close()
-    conn.close()
-    return existing
 
 
-@router.get("/suggestions")
-def get_suggestions(max_suggestions: int = 15) -> Dict[str, List[Dict[str, Any]]]:
-    """
-    Return suggested accounts for the FuelAI brand as JSON.
-    """
+def _load_suggestions(
+    background_tasks: BackgroundTasks,
+    max_suggestions: int,
+    force_refresh: bool,
+) -> Dict[str, Any]:
     brand_id = "4c91c352-66f0-4c50-8466-dbaf4dfbff04"
 
-    conn = _get_db_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        select name
-        from brands
-        where id = %s
-        """,
-        (brand_id,),
-    )
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select name, voice_traits, account_handles
+            from brands
+            where id = %s
+            """,
+            (brand_id,),
+        )
+        row = cur.fetchone()
 
     if not row:
         return {"suggestions": []}
 
-    brand_name = row[0]
-    existing_handles = _get_existing_handles_for_brand(brand_id)
+    brand_name, voice_traits, account_handles = row
+    existing_handles = _get_existing_handles_for_brand(brand_id, account_handles)
 
-    brand_description = (
-        "FuelAI is an AI-powered platform that automates lead engagement, appointment scheduling, "
-        "and sales follow-ups across multiple channels (email, text, voicemail, live chat, Facebook Messenger). "
-        "It enables businesses to scale their sales efforts without increasing team workload, delivering authentic "
-        "human-like communication 24/7 that mirrors your brand's tone and voice."
+    brand_description, target_audience = (
+        get_brand_profile(brand_name, voice_traits) or (FUELAI_DESCRIPTION, FUELAI_AUDIENCE)
     )
 
-    target_audience = (
-        "B2B SaaS founders, sales leaders, SDR/BDR managers, RevOps leaders, and founder-led sales teams "
-        "who want to respond faster, follow up smarter, and book more meetings without additional hires. "
-        "Teams focused on pipeline generation, outbound efficiency, and scaling sales without just hiring more headcount."
+    def compute() -> List[Dict[str, Any]]:
+        return suggest_accounts_for_brand(
+            brand_name=brand_name,
+            brand_description=brand_description,
+            target_audience=target_audience,
+            existing_handles=existing_handles,
+            max_suggestions=max_suggestions,
+            parallel=get_discovery_parallel(),
+        )
+
+    key = cache_key(brand_description, target_audience, existing_handles, max_suggestions)
+    result = get_suggestions_swr(
+        key,
+        compute,
+        schedule=background_tasks.add_task,
+        force_refresh=force_refresh,
     )
 
-    suggestions = suggest_accounts_for_brand(
-        brand_name=brand_name,
-        brand_description=brand_description,
-        target_audience=target_audience,
-        existing_handles=existing_handles,
-        max_suggestions=max_suggestions,
-    )
+    return {
+        "suggestions": result["suggestions"],
+        "generated_at": result["generated_at"],
+        "cache": result["cache"],
+    }
 
-    return {"suggestions": suggestions}
+
+_PLATFORM_BADGES = {
+    "instagram": '<span class="badge badge-ig">Instagram</span>',
+    "facebook": '<span class="badge badge-fb">Facebook</span>',
+}
+
+
+def _render_rows(suggestions: List[Dict[str, Any]]) -> str:
+    """
+    Server-side version of the row template in loadSuggestions().
+    """
+    esc = html_lib.escape
+    rows = []
+    for i, s in enumerate(suggestions, start=1):
+        plat_badge = _PLATFORM_BADGES.get(s["platform"], '<span class="badge badge-li">LinkedIn</span>')
+        acc_type = s.get("type") or "inspiration"
+
+        reason_cell = esc(s.get("reason") or "")
+        if s.get("voice_notes"):
+            reason_cell += (
+                '<div class="voice-notes"><strong>Voice to borrow:</strong> '
+                f"{esc(s['voice_notes'])}</div>"
+            )
+
+        approve_args = esc(
+            f"{json.dumps(s['platform'])}, {json.dumps(s['handle'])}, "
+            f"{'true' if acc_type == 'competitor' else 'false'}, 'row-{i}'"
+        )
+        rows.append(
+            f"""
+            <tr id="row-{i}">
+              <td>{i}</td>
+              <td>{plat_badge}</td>
+              <td>{esc(s['handle'])}</td>
+              <td>{esc(s.get('display_name') or '')}</td>
+              <td><span class="type-pill">{esc(acc_type.capitalize())}</span></td>
+              <td class="fit-score">{round(s.get('fit_score') or 0)}%</td>
+              <td>{reason_cell}</td>
+              <td>
+                <button onclick="approve({approve_args})">
+                  Approve
+                </button>
+              </td>
+            </tr>
+            """
+        )
+    return "".join(rows)
 
 
 @router.get("/ui", response_class=HTMLResponse)
 def discovery_ui():
     """
     Simple HTML UI to view suggested accounts and approve them.
-    Now loads instantly and fetches suggestions asynchronously.
+
+    Rows come from the precomputed discovery_suggestions table (see
+    app/cli/precompute_discovery.py), so the page is a cheap indexed read.
+    If nothing has been precomputed yet, suggestions are fetched
+    asynchronously from /discovery/suggestions instead.
     """
     brand_id = "4c91c352-66f0-4c50-8466-dbaf4dfbff04"
 
@@ -159,18 +226,29 @@ def discovery_ui():
 
     brand_name = row[0]
 
-    # Don't fetch suggestions here - do it async via JavaScript for instant page load
-    rows_html = """
-    <tr id="loading-row">
-        <td colspan="8" style="text-align:center; padding:40px;">
-            <div class="loading-spinner"></div>
-            <div style="margin-top:16px; color:#6b7280;">
-                🤖 AI is analyzing your audience and finding relevant accounts...<br>
-                <small>This takes 5-10 seconds</small>
-            </div>
-        </td>
-    </tr>
-    """
+    try:
+        precomputed = load_suggestions(brand_id, limit=15)
+    except psycopg2.Error as e:
+        print(f"[discovery] Could not read precomputed suggestions: {e}")
+        precomputed = []
+    generated_label = ""
+    if precomputed:
+        rows_html = _render_rows(precomputed)
+        generated = max(s["generated_at"] for s in precomputed)
+        generated_label = f"Generated {generated:%Y-%m-%d %H:%M}"
+    else:
+        # Nothing precomputed yet - fetch async via JavaScript for instant page load
+        rows_html = """
+        <tr id="loading-row">
+            <td colspan="8" style="text-align:center; padding:40px;">
+                <div class="loading-spinner"></div>
+                <div style="margin-top:16px; color:#6b7280;">
+                    🤖 Loading suggested accounts...<br>
+                    <small>Usually instant; a fresh batch takes 5-10 seconds</small>
+                </div>
+            </td>
+        </tr>
+        """
 
     html = f"""
     <!DOCTYPE html>
@@ -314,9 +392,14 @@ def discovery_ui():
       </style>
       <script>
         // Load suggestions asynchronously when page loads
-        async function loadSuggestions() {{
+        async function loadSuggestions(forceRefresh) {{
           try {{
-            const resp = await fetch("/discovery/suggestions?max_suggestions=15");
+            let url = "/discovery/suggestions?max_suggestions=15";
+            if (forceRefresh === true) {{
+              url += "&force_refresh=true";
+              document.querySelector("tbody").innerHTML = '<tr><td colspan="8" style="text-align:center;padding:40px;"><div class="loading-spinner"></div><div style="margin-top:16px;color:#6b7280;">Generating a fresh batch (5-10 seconds)...</div></td></tr>';
+            }}
+            const resp = await fetch(url);
             
             if (!resp.ok) {{
               throw new Error("Failed to fetch suggestions");
@@ -374,6 +457,12 @@ def discovery_ui():
             }});
             
             tbody.innerHTML = html;
+
+            if (data.generated_at) {{
+              const generated = new Date(data.generated_at * 1000);
+              document.getElementById("generated-at").innerText =
+                "Generated " + generated.toLocaleString();
+            }}
             
           }} catch (err) {{
             console.error(err);
@@ -423,7 +512,11 @@ def discovery_ui():
         }}
         
         // Load suggestions when page loads
-        window.addEventListener('DOMContentLoaded', loadSuggestions);
+        window.addEventListener('DOMContentLoaded', () => {{
+          if (!document.querySelector("tbody").dataset.precomputed) {{
+            loadSuggestions(false);
+          }}
+        }});
       </script>
     </head>
     <body>
@@ -436,7 +529,8 @@ def discovery_ui():
             </p>
           </div>
           <div class="refresh-hint">
-            Refresh this page to get a fresh batch of suggestions.
+            <span id="generated-at">{generated_label}</span>
+            <button onclick="loadSuggestions(true)">Get fresh suggestions</button>
           </div>
         </div>
         <table>
@@ -452,7 +546,7 @@ def discovery_ui():
               <th>Action</th>
             </tr>
           </thead>
-          <tbody>
+          <tbody{' data-precomputed="1"' if precomputed else ''}>
             {rows_html}
           </tbody>
         </table>
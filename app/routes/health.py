@@ -1,7 +1,15 @@
 from fastapi import APIRouter
 
+from app.utils.admission import admission_metrics
+
 router = APIRouter()
 
 @router.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@router.get("/health/admission")
+async def admission():
+    """Queue depth, in-flight requests and rejection counts per gated route."""
+    return admission_metrics()
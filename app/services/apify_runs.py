@@ -0,0 +1,146 @@
+# app/services/apify_runs.py
+"""
+Asynchronous Apify actor runs with dataset pagination.
+
+run-sync-get-dataset-items holds one HTTP connection for the whole scrape
+and gives up after 300 s. Instead we:
+
+  1. start the run           POST /v2/acts/{actor}/runs
+  2. poll its status          GET  /v2/actor-runs/{id}          (backoff)
+  3. page through its dataset GET  /v2/datasets/{id}/items?offset=&limit=
+
+Pages are yielded as soon as the actor has pushed them, while the run is
+still going, so callers can ingest page by page.
+
+Honors APIFY_BASE_URL, so everything here also works against the local
+stub (app/stubs/apify_server.py).
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import os
+import time
+
+import httpx
+
+from app.config import get_apify_base_url, get_apify_page_size, get_apify_run_timeout
+
+TERMINAL_STATUSES = ("SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED")
+
+POLL_INITIAL_SECONDS = 1.0
+POLL_MAX_SECONDS = 15.0
+
+
+class ApifyRunError(RuntimeError):
+    """The actor run failed, was aborted, or took longer than allowed."""
+
+
+def _token() -> str:
+    token = os.environ.get("APIFY_TOKEN")
+    if not token:
+        raise RuntimeError("APIFY_TOKEN not set in environment")
+    return token
+
+
+def _url(path: str) -> str:
+    return f"{get_apify_base_url().rstrip('/')}/v2{path}"
+
+
+async def start_run(client: httpx.AsyncClient, actor_id: str, run_input: Dict[str, Any]) -> Dict[str, Any]:
+    resp = await client.post(_url(f"/acts/{actor_id}/runs"), params={"token": _token()}, json=run_input)
+    resp.raise_for_status()
+    return resp.json()["data"]
+
+
+async def get_run(client: httpx.AsyncClient, run_id: str) -> Dict[str, Any]:
+    resp = await client.get(_url(f"/actor-runs/{run_id}"), params={"token": _token()})
+    resp.raise_for_status()
+    return resp.json()["data"]
+
+
+async def abort_run(client: httpx.AsyncClient, run_id: str) -> None:
+    try:
+        await client.post(_url(f"/actor-runs/{run_id}/abort"), params={"token": _token()})
+    except httpx.HTTPError as e:
+        print(f"[apify_runs] Could not abort run {run_id}: {e}")
+
+
+async def get_items(
+    client: httpx.AsyncClient,
+    dataset_id: str,
+    offset: int,
+    limit: int,
+) -> List[Dict[str, Any]]:
+    resp = await client.get(
+        _url(f"/datasets/{dataset_id}/items"),
+        params={"token": _token(), "offset": offset, "limit": limit, "clean": "true", "format": "json"},
+    )
+    resp.raise_for_status()
+    items = resp.json()
+    return items if isinstance(items, list) else []
+
+
+async def iter_run_pages(
+    client: httpx.AsyncClient,
+    actor_id: str,
+    run_input: Dict[str, Any],
+    page_size: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Start an actor run and yield its dataset items a page at a time.
+
+    While the run is going we alternate between reading new items and
+    polling its status, backing off (1s -> 15s) while nothing new shows up.
+    Once the run is finished the rest of the dataset is drained.
+
+    Raises ApifyRunError if the run ends in anything but SUCCEEDED (after
+    yielding whatever it produced) or runs past `timeout`. If the caller
+    stops early or is cancelled, the run is aborted so it stops billing.
+    """
+    if page_size is None:
+        page_size = get_apify_page_size()
+    if timeout is None:
+        timeout = get_apify_run_timeout()
+
+    run = await start_run(client, actor_id, run_input)
+    run_id, dataset_id = run["id"], run["defaultDatasetId"]
+    print(f"[apify_runs] Started run {run_id} of {actor_id}")
+
+    started = time.monotonic()
+    offset = 0
+    status = run.get("status")
+    delay = POLL_INITIAL_SECONDS
+
+    try:
+        while True:
+            page = await get_items(client, dataset_id, offset, page_size)
+            if page:
+                offset += len(page)
+                delay = POLL_INITIAL_SECONDS
+                yield page
+                if len(page) == page_size:
+                    continue  # probably more waiting, read again right away
+
+            if status in TERMINAL_STATUSES:
+                if page:
+                    continue
+                break  # finished and drained
+
+            status = (await get_run(client, run_id)).get("status")
+            if status in TERMINAL_STATUSES:
+                continue  # one more read to drain what's left
+
+            if time.monotonic() - started > timeout:
+                raise ApifyRunError(f"run {run_id} still {status} after {timeout:.0f}s")
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_SECONDS)
+    except BaseException:
+        if status not in TERMINAL_STATUSES:
+            await asyncio.shield(abort_run(client, run_id))
+        raise
+
+    print(f"[apify_runs] Run {run_id} {status}: {offset} items in {time.monotonic() - started:.1f}s")
+    if status != "SUCCEEDED":
+        raise ApifyRunError(f"run {run_id} ended {status} after {offset} items")
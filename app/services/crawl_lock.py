@@ -0,0 +1,73 @@
+# app/services/crawl_lock.py
+"""
+Per-source crawl leases, so the dashboard's manual fetch and the crawler
+(CLI or scheduler) never scrape the same source at the same time.
+
+The lease is the single-flight lock for crawl:<source_id> in Redis,
+renewed by a heartbeat while the crawl runs, so it expires on its own
+CRAWL_LEASE_SECONDS after its holder dies. Whoever comes second joins
+instead of scraping again:
+
+  - a dashboard fetch waits for the in-flight crawl's result, whether the
+    leader is another fetch or the crawler (which publishes a result for
+    each source as it finishes)
+  - the crawler skips sources that are already being crawled
+
+Without Redis, leases only coalesce callers within one process.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config import get_crawl_lease_seconds
+from app.utils.singleflight import Lease, SingleFlight, try_lease
+
+crawl_flight = SingleFlight(lock_seconds=get_crawl_lease_seconds, heartbeat=True)
+
+
+def crawl_key(source_id: str) -> str:
+    return f"crawl:{source_id}"
+
+
+def crawl_result(
+    handle: str,
+    fetched: int,
+    new: int,
+    known: int,
+    engagement_updated: int,
+    expected: Optional[float],
+    limit: int,
+) -> Dict[str, Any]:
+    """What a finished crawl of one source reports (and what joiners get)."""
+    return {
+        "success": True,
+        "posts_fetched": fetched,
+        "posts_new": new,
+        "posts_known": known,
+        "engagement_updated": engagement_updated,
+        "posts_expected": expected,
+        "limit": limit,
+        "handle": handle,
+    }
+
+
+def claim_sources(source_ids: Iterable[str]) -> Tuple[Dict[str, Lease], List[str]]:
+    """
+    Take crawl leases for every source nobody else is crawling.
+    Returns ({source_id: lease}, source_ids already being crawled).
+    """
+    seconds = get_crawl_lease_seconds()
+    leases: Dict[str, Lease] = {}
+    busy: List[str] = []
+    for source_id in source_ids:
+        lease = try_lease(crawl_key(source_id), seconds)
+        if lease is None:
+            busy.append(source_id)
+        else:
+            leases[source_id] = lease
+    return leases, busy
+
+
+def release_all(leases: Iterable[Lease]) -> None:
+    """Release leases that never got a result (failed or unfinished crawls)."""
+    for lease in list(leases):
+        lease.release()
@@ -0,0 +1,162 @@
+# app/services/crawl_schedule.py
+"""
+When each source is next due for a crawl.
+
+  - sources.fetch_schedule sets the base interval ("hourly", "daily",
+    "6h", "30m", ...; "manual" opts a source out of scheduled crawls)
+  - the source's posting rate (sources.posts_per_day, estimated by
+    crawl_service) stretches or shrinks it: busy accounts are
+    crawled often enough that a crawl returns ~target_posts new posts,
+    quiet ones less often than their schedule
+  - every source gets a stable slot inside its interval (hash of its id),
+    so a thousand daily sources spread over the day instead of all coming
+    due at the same minute
+"""
+
+from typing import Any, Dict, List, Optional
+import hashlib
+import math
+import re
+
+from app.db.connection import get_db_cursor
+
+SCHEDULE_SECONDS = {
+    "hourly": 3600,
+    "twice_daily": 12 * 3600,
+    "daily": 24 * 3600,
+    "weekly": 7 * 24 * 3600,
+}
+MANUAL_SCHEDULES = ("manual", "never", "off", "paused")
+DEFAULT_SCHEDULE = "daily"
+
+_UNITS = {"m": 60, "h": 3600, "d": 24 * 3600}
+
+MIN_INTERVAL_SECONDS = 15 * 60
+MAX_SPEEDUP = 4.0  # never crawl more than 4x as often as the schedule asks
+IDLE_SLOWDOWN = 2.0  # or less than half as often
+
+
+def schedule_interval(fetch_schedule: Optional[str]) -> Optional[float]:
+    """
+    Base crawl interval in seconds for a fetch_schedule value, or None if
+    the source should only be crawled by hand. Unknown values mean daily.
+    """
+    value = (fetch_schedule or DEFAULT_SCHEDULE).strip().lower()
+    if value in MANUAL_SCHEDULES:
+        return None
+    if value in SCHEDULE_SECONDS:
+        return float(SCHEDULE_SECONDS[value])
+
+    match = re.fullmatch(r"(?:every\s*)?(\d+(?:\.\d+)?)\s*([mhd])", value)
+    if match:
+        return max(float(match.group(1)) * _UNITS[match.group(2)], MIN_INTERVAL_SECONDS)
+
+    print(f"[crawl_schedule] Unknown fetch_schedule {fetch_schedule!r}, treating as {DEFAULT_SCHEDULE}")
+    return float(SCHEDULE_SECONDS[DEFAULT_SCHEDULE])
+
+
+def effective_interval(base: float, posts_per_day: Optional[float], target_posts: int) -> float:
+    """
+    Adjust a base interval to how fast the source actually posts: roughly
+    the time it takes to publish `target_posts`, kept within
+    [base / MAX_SPEEDUP, base * IDLE_SLOWDOWN].
+    """
+    if posts_per_day is None:
+        return base
+    if posts_per_day <= 0:
+        return base * IDLE_SLOWDOWN
+
+    needed = target_posts / posts_per_day * 24 * 3600
+    lowest = max(base / MAX_SPEEDUP, MIN_INTERVAL_SECONDS)
+    return min(max(needed, lowest), base * IDLE_SLOWDOWN)
+
+
+def _phase(source_id: str) -> float:
+    """Stable position in [0, 1) for a source, the same in every process."""
+    return int(hashlib.sha1(source_id.encode("utf-8")).hexdigest()[:8], 16) / float(0x100000000)
+
+
+def next_due(
+    source_id: str,
+    last_crawl_at: Optional[float],
+    interval: float,
+    now: float,
+    spread: float,
+) -> float:
+    """
+    Epoch seconds at which a source is next due.
+
+    Normally that's the source's slot (phase * interval into each interval)
+    at least half an interval after its last crawl. Sources never crawled,
+    or overdue (e.g. after the scheduler was down), are spread over the
+    next `spread` seconds rather than all dispatched at once.
+    """
+    phase = _phase(source_id)
+    if last_crawl_at is not None:
+        offset = phase * interval
+        earliest = last_crawl_at + interval / 2
+        due = offset + math.ceil((earliest - offset) / interval) * interval
+        if due >= now:
+            return due
+    return now + phase * min(interval, spread)
+
+
+def load_schedule(platform: str = "instagram") -> List[Dict[str, Any]]:
+    """
+    Every source of a platform with what the scheduler needs: id, handle,
+    fetch_schedule, last_crawl_at (epoch seconds or None) and posts_per_day
+    (None until the source has been crawled).
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select
+              s.id,
+              s.handle,
+              s.fetch_schedule,
+              extract(epoch from s.last_crawl_at),
+              s.posts_per_day
+            from sources s
+            where s.platform = %s
+            """,
+            (platform,),
+        )
+        rows = cur.fetchall()
+
+    return [
+        {
+            "id": str(r[0]),
+            "handle": r[1],
+            "fetch_schedule": r[2],
+            "last_crawl_at": float(r[3]) if r[3] is not None else None,
+            "posts_per_day": float(r[4]) if r[4] is not None else None,
+        }
+        for r in rows
+    ]
+
+
+def plan_schedule(
+    rows: List[Dict[str, Any]],
+    now: float,
+    target_posts: int,
+    spread: float,
+) -> List[Dict[str, Any]]:
+    """
+    Attach interval_s and due_at to each schedulable row (manual sources
+    are dropped) and return them soonest first.
+    """
+    scheduled = []
+    for row in rows:
+        base = schedule_interval(row["fetch_schedule"])
+        if base is None:
+            continue
+        interval = effective_interval(base, row["posts_per_day"], target_posts)
+        scheduled.append(
+            dict(
+                row,
+                interval_s=interval,
+                due_at=next_due(row["id"], row["last_crawl_at"], interval, now, spread),
+            )
+        )
+    scheduled.sort(key=lambda r: r["due_at"])
+    return scheduled
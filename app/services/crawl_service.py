@@ -0,0 +1,260 @@
+# app/services/crawl_service.py
+"""
+Per-source crawl bookkeeping: the high-water mark (newest post we've
+stored) and what each crawl returned.
+
+Crawls pass the mark to the scraper (onlyPostsNewerThan) so Apify only
+returns recent posts, then split whatever comes back into new and
+already-known posts, newest first, stopping at the first known one.
+
+Each source also carries an estimated posting rate (sources.posts_per_day,
+refreshed on every crawl), which sizes the next crawl's resultsLimit to
+the posts we expect since the last one.
+
+The window reaches back at least ENGAGEMENT_REFRESH_HOURS, so posts still
+gathering likes are re-seen and their engagement snapshotted (see
+ingestion_service.upsert_posts) even when nothing new was published.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import math
+from datetime import datetime, timedelta, timezone
+
+from app.config import get_crawl_default_limit, get_crawl_max_limit, get_engagement_refresh_hours
+from app.db.connection import get_db_cursor
+from app.services.ingestion_service import _parse_iso_datetime
+
+# (posted_at, post_id) of the newest post stored for a source
+Mark = Tuple[Optional[datetime], Optional[str]]
+
+# Posting rate: posts in the RATE_WINDOW_DAYS before now, over the days
+# since the oldest of them (at most RATE_SAMPLE posts), so an account that
+# went quiet decays towards 0 instead of keeping its old rate.
+RATE_WINDOW_DAYS = 90
+RATE_SAMPLE = 50
+
+# resultsLimit = expected posts * headroom + margin, within [MIN_LIMIT, CRAWL_MAX_LIMIT]
+LIMIT_HEADROOM = 1.5
+LIMIT_MARGIN = 2
+MIN_LIMIT = 3
+
+_POSTING_RATE_SQL = """
+  case when exists (select 1 from posts_raw p0 where p0.source_id = {source})
+  then (
+    select count(*) / greatest(extract(epoch from now() - min(r.posted_at)) / 86400.0, 1.0)
+    from (
+      select p.posted_at
+      from posts_raw p
+      where p.source_id = {source}
+        and p.posted_at > now() - make_interval(days => %(rate_window)s)
+      order by p.posted_at desc
+      limit %(rate_sample)s
+    ) r
+  )
+  end
+"""
+
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def load_marks(source_ids: Iterable[str]) -> Dict[str, Mark]:
+    """
+    High-water marks for many sources in one query. Sources crawled before
+    the mark columns existed fall back to their newest post in posts_raw.
+    """
+    source_ids = list(source_ids)
+    if not source_ids:
+        return {}
+
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select
+              s.id,
+              coalesce(
+                s.last_post_at,
+                (select max(p.posted_at) from posts_raw p where p.source_id = s.id)
+              ),
+              s.last_post_id
+            from sources s
+            where s.id = any(%s::uuid[])
+            """,
+            (source_ids,),
+        )
+        return {str(r[0]): (_aware(r[1]), r[2]) for r in cur.fetchall()}
+
+
+def newer_than(marks: Iterable[Mark], refresh_hours: Optional[float] = None) -> Optional[str]:
+    """
+    onlyPostsNewerThan for a run covering these marks: the oldest of them
+    (pulled back to the engagement refresh window, default
+    ENGAGEMENT_REFRESH_HOURS), or None if any source has never been
+    crawled (it needs full history).
+    """
+    if refresh_hours is None:
+        refresh_hours = get_engagement_refresh_hours()
+    dates = [m[0] for m in marks]
+    if not dates or any(d is None for d in dates):
+        return None
+    since = min(dates)
+    if refresh_hours > 0:
+        since = min(since, datetime.now(timezone.utc) - timedelta(hours=refresh_hours))
+    return since.isoformat()
+
+
+def split_new_posts(posts: List[Dict[str, Any]], mark: Optional[Mark]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Return (new posts, number of known posts).
+
+    Dated posts are walked newest first (so a pinned old post can't hide
+    newer ones) and we stop at the first one at or before the mark. Posts
+    without a date can't be placed and are kept; the insert dedupes them.
+    """
+    if not mark or (mark[0] is None and mark[1] is None):
+        return list(posts), 0
+    mark_at, mark_id = mark
+
+    undated: List[Dict[str, Any]] = []
+    dated: List[Tuple[datetime, Dict[str, Any]]] = []
+    for post in posts:
+        posted = _aware(_parse_iso_datetime(post.get("posted_at")))
+        if posted is None:
+            undated.append(post)
+        else:
+            dated.append((posted, post))
+    dated.sort(key=lambda x: x[0], reverse=True)
+
+    new_posts = list(undated)
+    for i, (posted, post) in enumerate(dated):
+        known = (mark_at is not None and posted <= mark_at) or (
+            mark_id is not None and str(post.get("post_id")) == mark_id
+        )
+        if known:
+            return new_posts, len(dated) - i
+        new_posts.append(post)
+    return new_posts, 0
+
+
+def newest_post(posts: Iterable[Dict[str, Any]]) -> Optional[Tuple[datetime, str]]:
+    """(posted_at, post_id) of the newest dated post, if any."""
+    best: Optional[Tuple[datetime, str]] = None
+    for post in posts:
+        posted = _aware(_parse_iso_datetime(post.get("posted_at")))
+        if posted is not None and (best is None or posted > best[0]):
+            best = (posted, str(post.get("post_id")))
+    return best
+
+
+def record_crawl(
+    source_id: str,
+    new_count: int,
+    known_count: int,
+    newest: Optional[Tuple[datetime, str]] = None,
+    expected: Optional[float] = None,
+) -> None:
+    """
+    Stamp last_crawl_at, store this crawl's new/known counts (and how many
+    new posts we expected), move the high-water mark forward (never
+    backwards) and re-estimate the source's posting rate.
+    """
+    newest_at, newest_id = newest if newest else (None, None)
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            update sources s
+            set last_crawl_at = now(),
+                last_crawl_new = %(new)s,
+                last_crawl_known = %(known)s,
+                last_crawl_expected = %(expected)s,
+                last_post_id = case
+                  when %(newest_at)s::timestamptz is not null
+                   and (s.last_post_at is null or %(newest_at)s::timestamptz > s.last_post_at)
+                  then %(newest_id)s else s.last_post_id end,
+                last_post_at = greatest(s.last_post_at, %(newest_at)s::timestamptz),
+                posts_per_day = """ + _POSTING_RATE_SQL.format(source="s.id") + """
+            where s.id = %(source_id)s
+            """,
+            {
+                "new": new_count,
+                "known": known_count,
+                "expected": expected,
+                "newest_at": newest_at,
+                "newest_id": newest_id,
+                "source_id": source_id,
+                "rate_window": RATE_WINDOW_DAYS,
+                "rate_sample": RATE_SAMPLE,
+            },
+        )
+
+
+def refresh_posting_rates(platform: str = "instagram") -> int:
+    """
+    Re-estimate posts_per_day for every source of a platform in one
+    statement (backfill for sources not crawled since the column was
+    added). Returns the number of sources updated.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            update sources s
+            set posts_per_day = """ + _POSTING_RATE_SQL.format(source="s.id") + """
+            where s.platform = %(platform)s
+            """,
+            {"platform": platform, "rate_window": RATE_WINDOW_DAYS, "rate_sample": RATE_SAMPLE},
+        )
+        return cur.rowcount
+
+
+def expected_new_posts(posts_per_day: Optional[float], since: Optional[datetime]) -> Optional[float]:
+    """Posts we expect a source to have published since `since`, if we can tell."""
+    if posts_per_day is None or since is None:
+        return None
+    days = max((datetime.now(timezone.utc) - _aware(since)).total_seconds(), 0.0) / 86400
+    return posts_per_day * days
+
+
+def crawl_limit(expected: Optional[float]) -> int:
+    """
+    resultsLimit for a crawl expecting `expected` new posts. Unknown
+    (never crawled, no rate yet) gets CRAWL_DEFAULT_LIMIT to backfill.
+    """
+    if expected is None:
+        return get_crawl_default_limit()
+    limit = math.ceil(expected * LIMIT_HEADROOM) + LIMIT_MARGIN
+    return max(MIN_LIMIT, min(limit, get_crawl_max_limit()))
+
+
+def plan_limits(source_ids: Iterable[str]) -> Dict[str, Tuple[int, Optional[float]]]:
+    """
+    {source_id: (resultsLimit, expected new posts)} for the next crawl,
+    from each source's posting rate and time since its last crawl. The
+    limit also leaves room for the posts re-seen in the engagement refresh
+    window.
+    """
+    source_ids = list(source_ids)
+    if not source_ids:
+        return {}
+
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select id, posts_per_day, coalesce(last_crawl_at, last_post_at)
+            from sources
+            where id = any(%s::uuid[])
+            """,
+            (source_ids,),
+        )
+        rows = cur.fetchall()
+
+    refresh_days = max(get_engagement_refresh_hours(), 0.0) / 24
+    plans: Dict[str, Tuple[int, Optional[float]]] = {}
+    for source_id, posts_per_day, since in rows:
+        rate = float(posts_per_day) if posts_per_day is not None else None
+        expected = expected_new_posts(rate, since)
+        wanted = expected + rate * refresh_days if expected is not None else None
+        plans[str(source_id)] = (crawl_limit(wanted), expected)
+    return plans
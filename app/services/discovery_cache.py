@@ -0,0 +1,120 @@
+# app/services/discovery_cache.py
+"""
+Stale-while-revalidate cache for discovery suggestions, stored in Redis.
+
+Suggestions are keyed by everything that shapes the LLM answer (brand
+description, audience, the set of handles we already track, max count).
+
+  - fresh hit   -> served straight from Redis
+  - stale hit   -> served straight from Redis, refresh scheduled in the
+                   background (one refresher at a time via a lock key)
+  - miss/forced -> computed now and stored
+
+If Redis is unavailable we just compute, like before the cache existed.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import hashlib
+import json
+import time
+
+import redis
+
+from app.config import get_discovery_cache_max_age, get_discovery_cache_ttl
+from app.db.redis_client import get_redis_client
+
+KEY_PREFIX = "discovery:suggestions:"
+LOCK_PREFIX = "discovery:refresh-lock:"
+
+# A refresh should never take this long; the lock expires on its own after.
+REFRESH_LOCK_SECONDS = 120
+
+
+def cache_key(
+    brand_description: str,
+    target_audience: str,
+    existing_handles: Dict[str, List[str]],
+    max_suggestions: int,
+) -> str:
+    """
+    Stable key for a discovery request. Handle order doesn't matter.
+    """
+    payload = {
+        "brand_description": brand_description,
+        "target_audience": target_audience,
+        "existing_handles": {
+            platform: sorted({h.lower() for h in handles})
+            for platform, handles in sorted(existing_handles.items())
+        },
+        "max_suggestions": max_suggestions,
+    }
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+    return KEY_PREFIX + digest
+
+
+def _read(key: str) -> Optional[Dict[str, Any]]:
+    raw = get_redis_client().get(key)
+    return json.loads(raw) if raw else None
+
+
+def _write(key: str, suggestions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    entry = {"suggestions": suggestions, "generated_at": time.time()}
+    get_redis_client().set(key, json.dumps(entry), ex=get_discovery_cache_max_age())
+    return entry
+
+
+def refresh(key: str, compute: Callable[[], List[Dict[str, Any]]]) -> None:
+    """
+    Recompute and store suggestions. Meant to run as a background task;
+    the lock must already be held and is released when done.
+    """
+    try:
+        _write(key, compute())
+    except Exception as e:
+        print(f"[discovery_cache] Background refresh failed: {e}")
+    finally:
+        try:
+            get_redis_client().delete(LOCK_PREFIX + key)
+        except redis.RedisError:
+            pass
+
+
+def get_suggestions_swr(
+    key: str,
+    compute: Callable[[], List[Dict[str, Any]]],
+    schedule: Callable[..., Any],
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    Return {"suggestions": [...], "generated_at": float|None, "cache": str}
+    where cache is one of "hit", "stale", "miss", "refresh" or "bypass".
+
+    `schedule(fn, *args)` runs work after the response is sent
+    (FastAPI's BackgroundTasks.add_task).
+    """
+    try:
+        entry = None if force_refresh else _read(key)
+    except redis.RedisError as e:
+        print(f"[discovery_cache] Redis unavailable, computing directly: {e}")
+        return {"suggestions": compute(), "generated_at": time.time(), "cache": "bypass"}
+
+    if entry is not None:
+        age = time.time() - entry.get("generated_at", 0)
+        if age <= get_discovery_cache_ttl():
+            return {**entry, "cache": "hit"}
+
+        try:
+            got_lock = get_redis_client().set(LOCK_PREFIX + key, "1", nx=True, ex=REFRESH_LOCK_SECONDS)
+        except redis.RedisError:
+            got_lock = False
+        if got_lock:
+            schedule(refresh, key, compute)
+        return {**entry, "cache": "stale"}
+
+    suggestions = compute()
+    try:
+        entry = _write(key, suggestions)
+    except redis.RedisError as e:
+        print(f"[discovery_cache] Could not store suggestions: {e}")
+        entry = {"suggestions": suggestions, "generated_at": time.time()}
+    return {**entry, "cache": "refresh" if force_refresh else "miss"}
@@ -0,0 +1,198 @@
+# app/services/discovery_service.py
+"""
+Shared discovery logic: what we tell the LLM about a brand, which handles
+it should not suggest again, and the precomputed `discovery_suggestions`
+table that /discovery/ui browses.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+
+from psycopg2.extras import execute_values
+
+from app.agents.discovery_agent import PLATFORMS, suggest_accounts_for_brand
+from app.db.connection import get_db_cursor
+from app.services.handle_index import get_tracked_handles, normalize_handle
+
+FUELAI_DESCRIPTION = (
+    "FuelAI is an AI-powered platform that automates lead engagement, appointment scheduling, "
+    "and sales follow-ups across multiple channels (email, text, voicemail, live chat, Facebook Messenger). "
+    "It enables businesses to scale their sales efforts without increasing team workload, delivering authentic "
+    "human-like communication 24/7 that mirrors your brand's tone and voice."
+)
+
+FUELAI_AUDIENCE = (
+    "B2B SaaS founders, sales leaders, SDR/BDR managers, RevOps leaders, and founder-led sales teams "
+    "who want to respond faster, follow up smarter, and book more meetings without additional hires. "
+    "Teams focused on pipeline generation, outbound efficiency, and scaling sales without just hiring more headcount."
+)
+
+# Brands we have hand-written positioning for. Others can carry
+# "description" / "target_audience" in brands.voice_traits.
+BRAND_PROFILES: Dict[str, Tuple[str, str]] = {
+    "fuelai": (FUELAI_DESCRIPTION, FUELAI_AUDIENCE),
+}
+
+
+def _as_dict(value: Any) -> Dict[str, Any]:
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or {}
+
+
+def get_brand_profile(
+    brand_name: str,
+    voice_traits: Optional[Any] = None,
+) -> Optional[Tuple[str, str]]:
+    """
+    Return (brand_description, target_audience) for a brand, or None if
+    we don't know enough about it to ask for suggestions.
+    """
+    profile = BRAND_PROFILES.get((brand_name or "").strip().lower())
+    if profile:
+        return profile
+
+    traits = _as_dict(voice_traits)
+    description = traits.get("description")
+    audience = traits.get("target_audience") or traits.get("audience")
+    if description and audience:
+        return str(description), str(audience)
+    return None
+
+
+def get_existing_handles(account_handles: Optional[Any] = None) -> Dict[str, List[str]]:
+    """
+    Handles the LLM should not suggest: the brand's own accounts
+    (brands.account_handles) plus every source we already track.
+    Returns {platform: sorted normalized handles}.
+    """
+    account_handles = _as_dict(account_handles)
+
+    existing = get_tracked_handles(PLATFORMS)
+    for plat in existing.keys():
+        handle = account_handles.get(plat)
+        if handle:
+            existing[plat].add(normalize_handle(handle))
+
+    return {plat: sorted(handles) for plat, handles in existing.items()}
+
+
+def discover_for_brand(
+    brand_name: str,
+    voice_traits: Optional[Any],
+    account_handles: Optional[Any],
+    max_suggestions: int = 15,
+    parallel: bool = False,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ask the discovery agent for accounts for one brand.
+    Returns None if the brand has no profile to work from.
+    """
+    profile = get_brand_profile(brand_name, voice_traits)
+    if profile is None:
+        return None
+    brand_description, target_audience = profile
+
+    return suggest_accounts_for_brand(
+        brand_name=brand_name,
+        brand_description=brand_description,
+        target_audience=target_audience,
+        existing_handles=get_existing_handles(account_handles),
+        max_suggestions=max_suggestions,
+        parallel=parallel,
+    )
+
+
+def list_brands() -> List[Tuple[str, str, Any, Any]]:
+    """(id, name, voice_traits, account_handles) for every brand."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select id, name, voice_traits, account_handles
+            from brands
+            order by name
+            """
+        )
+        return [(str(r[0]), r[1], r[2], r[3]) for r in cur.fetchall()]
+
+
+def replace_suggestions(brand_id: str, suggestions: List[Dict[str, Any]]) -> int:
+    """
+    Swap in a brand's new suggestions. Delete + insert run in one
+    transaction, so readers see either the old set or the new one.
+    Handles we already track are dropped here (and, once stored, deleted
+    when they get tracked, see sources_service), so reads need no filter.
+    """
+    tracked = get_tracked_handles(PLATFORMS)
+    rows = [
+        (
+            brand_id,
+            s["platform"],
+            s["handle"],
+            s.get("display_name") or "",
+            s.get("type") or "inspiration",
+            s.get("reason") or "",
+            s.get("voice_notes") or "",
+            float(s.get("fit_score") or 0),
+        )
+        for s in suggestions
+        if normalize_handle(s["handle"]) not in tracked.get((s["platform"] or "").lower(), set())
+    ]
+
+    with get_db_cursor() as cur:
+        cur.execute("delete from discovery_suggestions where brand_id = %s", (brand_id,))
+        if rows:
+            execute_values(
+                cur,
+                """
+                insert into discovery_suggestions (
+                  brand_id,
+                  platform,
+                  handle,
+                  display_name,
+                  type,
+                  reason,
+                  voice_notes,
+                  fit_score
+                )
+                values %s
+                """,
+                rows,
+                page_size=len(rows),
+            )
+
+    return len(rows)
+
+
+def load_suggestions(brand_id: str, limit: int = 15) -> List[Dict[str, Any]]:
+    """
+    Precomputed suggestions for a brand, best fit first. Tracked handles
+    never make it into (or stay in) the table, so this is a plain read of
+    the (brand_id, fit_score desc) index.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select platform, handle, display_name, type, reason, voice_notes, fit_score, generated_at
+            from discovery_suggestions
+            where brand_id = %s
+            order by fit_score desc
+            limit %s
+            """,
+            (brand_id, limit),
+        )
+        rows = cur.fetchall()
+
+    return [
+        {
+            "platform": platform,
+            "handle": handle,
+            "display_name": display_name,
+            "type": acc_type,
+            "reason": reason,
+            "voice_notes": voice_notes,
+            "fit_score": float(fit_score or 0),
+            "generated_at": generated_at,
+        }
+        for platform, handle, display_name, acc_type, reason, voice_notes, fit_score, generated_at in rows
+    ]
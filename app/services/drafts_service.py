@@ -1,9 +1,61 @@
 # app/services/drafts_service.py
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+import uuid
+
+from psycopg2.extras import execute_values
 
 from app.db.connection import get_db_cursor
 
+DRAFT_PLATFORMS = ("instagram", "facebook", "linkedin")
+
+_INSERT_DRAFT_SQL = """
+    insert into drafts (
+      brand_id,
+      platform,
+      type,
+      caption,
+      hashtags,
+      asset_refs
+    )
+    values (%s, %s, %s, %s, %s, %s)
+    returning id
+"""
+
+
+def _draft_rows(brand_id: str, package: Dict[str, Any]) -> List[Tuple]:
+    """
+    Turn one post package into insert params for each platform row.
+    """
+    rows: List[Tuple] = []
+
+    core = package.get("core", {})
+    core_style = core.get("style", "unspecified")
+
+    for platform in DRAFT_PLATFORMS:
+        section = package.get(platform, {}) or {}
+
+        caption = section.get("caption", "")
+        hashtags = section.get("hashtags", []) or []
+        style = section.get("style") or core_style or "unspecified"
+
+        # Ensure hashtags is a Python list of strings
+        if not isinstance(hashtags, list):
+            hashtags = [str(hashtags)]
+
+        rows.append(
+            (
+                brand_id,
+                platform,
+                style,
+                caption,
+                hashtags,   # psycopg2 will adapt Python list -> text[]
+                [],         # asset_refs empty for now
+            )
+        )
+
+    return rows
+
 
 def save_draft(brand_id: str, package: Dict[str, Any]) -> List[str]:
     """
@@ -24,45 +76,64 @@ def save_draft(brand_id: str, package: Dict[str, Any]) -> List[str]:
     """
     created_ids: List[str] = []
 
-    core = package.get("core", {})
-    core_style = core.get("style", "unspecified")
-
     with get_db_cursor() as cur:
-        for platform in ("instagram", "facebook", "linkedin"):
-            section = package.get(platform, {}) or {}
-
-            caption = section.get("caption", "")
-            hashtags = section.get("hashtags", []) or []
-            style = section.get("style") or core_style or "unspecified"
-
-            # Ensure hashtags is a Python list of strings
-            if not isinstance(hashtags, list):
-                hashtags = [str(hashtags)]
-
-            cur.execute(
-                """
-                insert into drafts (
-                  brand_id,
-                  platform,
-                  type,
-                  caption,
-                  hashtags,
-                  asset_refs
-                )
-                values (%s, %s, %s, %s, %s, %s)
-                returning id
-                """,
-                (
-                    brand_id,
-                    platform,
-                    style,
-                    caption,
-                    hashtags,   # psycopg2 will adapt Python list -> text[]
-                    [],         # asset_refs empty for now
-                ),
-            )
-
+        for row in _draft_rows(brand_id, package):
+            cur.execute(_INSERT_DRAFT_SQL, row)
             draft_id = cur.fetchone()[0]
             created_ids.append(str(draft_id))
 
-    return created_ids
\ No newline at end of file
+    return created_ids
+
+
+def save_drafts(brand_id: str, packages: List[Dict[str, Any]]) -> List[List[str]]:
+    """
+    Save many post packages at once (e.g. the results of a batch drafting run).
+
+    Every platform row of every package goes into ONE multi-row
+    `insert ... values ... returning id` (psycopg2's execute_values), instead
+    of one round trip per row like save_draft.
+
+    Postgres doesn't promise RETURNING order matches VALUES order, so ids are
+    generated client-side; that's what lets us hand them back in input order.
+
+    Returns one list of draft IDs per package, in input order.
+    """
+    if not packages:
+        return []
+
+    created: List[List[str]] = []
+    rows: List[Tuple] = []
+    for package in packages:
+        ids: List[str] = []
+        for row in _draft_rows(brand_id, package):
+            draft_id = str(uuid.uuid4())
+            ids.append(draft_id)
+            rows.append((draft_id,) + row)
+        created.append(ids)
+
+    with get_db_cursor() as cur:
+        returned = execute_values(
+            cur,
+            """
+            insert into drafts (
+              id,
+              brand_id,
+              platform,
+              type,
+              caption,
+              hashtags,
+              asset_refs
+            )
+            values %s
+            returning id
+            """,
+            rows,
+            template="(%s::uuid, %s, %s, %s, %s, %s::text[], %s::text[])",
+            page_size=len(rows),
+            fetch=True,
+        )
+        if len(returned) != len(rows):
+            # raising here rolls the whole batch back
+            raise RuntimeError(f"Expected {len(rows)} draft rows, inserted {len(returned)}")
+
+    return created
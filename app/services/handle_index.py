@@ -0,0 +1,210 @@
+# app/services/handle_index.py
+"""
+Per-platform index of tracked source handles, kept in Redis sets.
+
+  handles:<platform>          -> SET of normalized (lowercase, no '@') handles
+  handles:ready               -> marker that the sets were built from `sources`
+  handles:rebuilding          -> lock held by the one worker rebuilding
+  handles:added:<platform>    -> journal of add_handle calls since the last rebuild
+  handles:removed:<platform>  -> journal of remove_handle calls since the last rebuild
+
+The sets are built from the `sources` table once (and again whenever the
+ready marker expires, as a safety net against drift), then maintained
+incrementally by create_source/delete_source. Discovery reads them in one
+round trip instead of scanning `sources` on every request.
+
+A rebuild reads `sources` and then swaps the new sets in; anything added
+or removed in between is replayed from the journals in the same
+transaction as the swap, so it isn't lost.
+
+If Redis is unavailable, everything falls back to reading `sources`.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import uuid
+
+import redis
+
+from app.db.connection import get_db_cursor
+from app.db.redis_client import get_redis_client
+
+KEY_PREFIX = "handles:"
+READY_KEY = "handles:ready"
+LOCK_KEY = "handles:rebuilding"
+ADDED_PREFIX = "handles:added:"
+REMOVED_PREFIX = "handles:removed:"
+
+# Full rebuild at least this often, in case something wrote to `sources`
+# behind our back (psql, scripts...).
+REBUILD_INTERVAL_SECONDS = 24 * 3600
+
+# Upper bound on one rebuild (a single query and one pipeline)
+REBUILD_LOCK_SECONDS = 60
+
+# Drop the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def normalize_handle(handle: str) -> str:
+    """Handles compare case-insensitively and without a leading '@'."""
+    return str(handle or "").strip().lstrip("@").lower()
+
+
+def _platform_key(platform: str) -> str:
+    return KEY_PREFIX + (platform or "").lower()
+
+
+def _is_platform_key(key: str) -> bool:
+    return key != READY_KEY and key != LOCK_KEY and ":" not in key[len(KEY_PREFIX):]
+
+
+def _load_from_db() -> List[Tuple[str, str]]:
+    with get_db_cursor() as cur:
+        cur.execute("select platform, handle from sources")
+        return [(p, h) for p, h in cur.fetchall() if p and h]
+
+
+def _group(rows: Iterable[Tuple[str, str]]) -> Dict[str, Set[str]]:
+    grouped: Dict[str, Set[str]] = {}
+    for platform, handle in rows:
+        grouped.setdefault(platform.lower(), set()).add(normalize_handle(handle))
+    return grouped
+
+
+def rebuild() -> Optional[Dict[str, Set[str]]]:
+    """
+    Rebuild every platform set from `sources`. New sets are written under
+    temp keys and renamed into place, so readers never see a half-built set.
+    Returns None without doing anything if another worker is rebuilding.
+    """
+    r = get_redis_client()
+    token = uuid.uuid4().hex
+    if not r.set(LOCK_KEY, token, nx=True, ex=REBUILD_LOCK_SECONDS):
+        return None
+
+    try:
+        # Changes journaled before the read are in `sources` already
+        journals = list(r.scan_iter(match=ADDED_PREFIX + "*")) + list(r.scan_iter(match=REMOVED_PREFIX + "*"))
+        if journals:
+            r.delete(*journals)
+
+        grouped = _group(_load_from_db())
+
+        stale = {k for k in r.scan_iter(match=KEY_PREFIX + "*") if _is_platform_key(k)}
+        # A platform first seen after the read has a journal (or, if it
+        # shows up after this scan, a set that isn't in `stale`)
+        platforms = set(grouped) | {k[len(ADDED_PREFIX):] for k in r.scan_iter(match=ADDED_PREFIX + "*")}
+
+        pipe = r.pipeline(transaction=True)
+        for platform, handles in grouped.items():
+            tmp = _platform_key(platform) + ":rebuild"
+            pipe.delete(tmp)
+            pipe.sadd(tmp, *handles)
+            pipe.rename(tmp, _platform_key(platform))
+            stale.discard(_platform_key(platform))
+        for key in stale:
+            pipe.delete(key)
+        # Replay what add_handle/remove_handle did while we were reading
+        # (a missing journal is an empty set, so this is a no-op without one)
+        for platform in platforms:
+            key = _platform_key(platform)
+            pipe.sunionstore(key, key, ADDED_PREFIX + platform)
+            pipe.sdiffstore(key, key, REMOVED_PREFIX + platform)
+        pipe.set(READY_KEY, "1", ex=REBUILD_INTERVAL_SECONDS)
+        pipe.execute()
+    finally:
+        try:
+            r.eval(_RELEASE_SCRIPT, 1, LOCK_KEY, token)
+        except redis.RedisError:
+            pass
+
+    print(f"[handle_index] Rebuilt handle index: {sum(len(h) for h in grouped.values())} handles")
+    return grouped
+
+
+def _ensure_ready(r: redis.Redis) -> bool:
+    """
+    True once the sets can be read. False while another worker is still
+    building them for the first time: read `sources` instead.
+    """
+    if r.exists(READY_KEY):
+        return True
+    return rebuild() is not None
+
+
+def get_tracked_handles(platforms: Iterable[str]) -> Dict[str, Set[str]]:
+    """
+    Return {platform: set(normalized handles)} for the given platforms.
+    """
+    platforms = [p.lower() for p in platforms]
+    try:
+        r = get_redis_client()
+        if _ensure_ready(r):
+            pipe = r.pipeline(transaction=False)
+            for platform in platforms:
+                pipe.smembers(_platform_key(platform))
+            return {p: set(members) for p, members in zip(platforms, pipe.execute())}
+    except redis.RedisError as e:
+        print(f"[handle_index] Redis unavailable, reading sources table: {e}")
+    grouped = _group(_load_from_db())
+    return {p: grouped.get(p, set()) for p in platforms}
+
+
+def is_tracked(platform: str, handle: str) -> bool:
+    """O(1) membership check for a single handle."""
+    try:
+        r = get_redis_client()
+        if _ensure_ready(r):
+            return bool(r.sismember(_platform_key(platform), normalize_handle(handle)))
+    except redis.RedisError:
+        pass
+    return normalize_handle(handle) in get_tracked_handles([platform])[platform.lower()]
+
+
+def add_handle(platform: str, handle: str) -> None:
+    """Record a newly tracked source. Call after the insert has committed."""
+    platform, handle = (platform or "").lower(), normalize_handle(handle)
+    try:
+        pipe = get_redis_client().pipeline(transaction=True)
+        pipe.sadd(_platform_key(platform), handle)
+        pipe.sadd(ADDED_PREFIX + platform, handle)
+        pipe.srem(REMOVED_PREFIX + platform, handle)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[handle_index] Could not add {platform}:{handle}: {e}")
+
+
+def remove_handle(platform: str, handle: str) -> None:
+    """Forget a deleted source. Call after the delete has committed."""
+    try:
+        key = (platform or "").lower()
+        pipe = get_redis_client().pipeline(transaction=True)
+        pipe.srem(_platform_key(key), normalize_handle(handle))
+        pipe.srem(ADDED_PREFIX + key, normalize_handle(handle))
+        pipe.sadd(REMOVED_PREFIX + key, normalize_handle(handle))
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[handle_index] Could not remove {platform}:{handle}: {e}")
+        return
+
+    # Two sources can normalize to the same handle (e.g. 'Nike' and 'nike');
+    # put it back if another one is still tracked.
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select 1
+            from sources
+            where lower(platform) = lower(%s)
+              and lower(ltrim(trim(handle), '@')) = %s
+            limit 1
+            """,
+            (platform, normalize_handle(handle)),
+        )
+        still_tracked = cur.fetchone() is not None
+    if still_tracked:
+        add_handle(platform, handle)
@@ -0,0 +1,321 @@
+# app/services/image_service.py
+"""
+Image stage for downloaded media (after app/services/media_service.py):
+a fixed-size JPEG thumbnail and a 64-bit difference hash (dHash) per
+stored image, plus a duplicate lookup over those hashes.
+
+  - decoding and resizing is CPU-bound, so each object is processed in a
+    ProcessPoolExecutor worker (which also reads the original and writes
+    the thumbnail, so image bytes never cross the process boundary)
+  - results go on media_objects (thumb_key, dhash, width, height), then
+    onto posts_raw (thumb_keys, dhashes, in media_keys order)
+  - DuplicateIndex keeps a BK-tree of every known dHash, so "which posts
+    look like this one" is a tree search plus one indexed query
+
+Thumbnails are stored next to the originals in the media bucket:
+thumbs/<sha256[:2]>/<sha256>.jpg. Videos are marked processed without
+a thumbnail.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import io
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image, ImageOps
+from psycopg2.extras import execute_values
+
+from app.config import (
+    get_media_bucket,
+    get_media_duplicate_distance,
+    get_media_image_workers,
+    get_media_thumb_size,
+)
+from app.db.connection import get_db_cursor
+from app.db.object_store import get_object_store
+from app.utils.bktree import BKTree
+
+HASH_BITS = 64
+THUMB_QUALITY = 80
+_SIGN_BIT = 1 << (HASH_BITS - 1)
+
+
+def to_signed(h: int) -> int:
+    """Unsigned 64-bit hash -> the value stored in a bigint column."""
+    return h - (1 << HASH_BITS) if h & _SIGN_BIT else h
+
+
+def to_unsigned(h: int) -> int:
+    return h & ((1 << HASH_BITS) - 1)
+
+
+def thumb_key(sha256: str) -> str:
+    return f"thumbs/{sha256[:2]}/{sha256}.jpg"
+
+
+def dhash(image: Any, size: int = 8) -> int:
+    """
+    Difference hash of a PIL image: shrink to (size+1) x size grayscale and
+    set one bit per pixel that is brighter than its right-hand neighbour.
+    Robust to rescaling and recompression, which is what reposts go through.
+    """
+    small = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def render(data: bytes, size: int) -> Tuple[bytes, int, int, int]:
+    """(thumbnail JPEG, dHash, width, height) for an encoded image."""
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        hashed = dhash(image)
+        thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        thumb.save(out, format="JPEG", quality=THUMB_QUALITY, optimize=True)
+    return out.getvalue(), hashed, width, height
+
+
+def _process_object(bucket: str, sha256: str, object_key: str, size: int) -> Dict[str, Any]:
+    """Process-pool worker: read one original, store its thumbnail."""
+    store = get_object_store(bucket)
+    thumb, hashed, width, height = render(store.get(object_key), size)
+    key = thumb_key(sha256)
+    store.put(key, thumb, content_type="image/jpeg")
+    return {"thumb_key": key, "dhash": hashed, "width": width, "height": height, "bytes": len(thumb)}
+
+
+def load_unprocessed(limit: int) -> List[Tuple[str, str]]:
+    """(sha256, object_key) of stored images without a thumbnail yet."""
+    with get_db_cursor() as cur:
+        # videos have nothing to render: settle them so they don't come back
+        cur.execute(
+            """
+            update media_objects
+            set processed_at = now()
+            where processed_at is null
+              and coalesce(content_type, '') not like 'image/%'
+            """
+        )
+        cur.execute(
+            """
+            select sha256, object_key
+            from media_objects
+            where processed_at is null
+            order by created_at
+            limit %s
+            """,
+            (limit,),
+        )
+        return [(r[0], r[1]) for r in cur.fetchall()]
+
+
+def _record_results(rows: List[Tuple[str, Optional[str], Optional[int], Optional[int], Optional[int], Optional[str]]]) -> None:
+    if not rows:
+        return
+    with get_db_cursor() as cur:
+        execute_values(
+            cur,
+            """
+            update media_objects o
+            set thumb_key = v.thumb_key,
+                dhash = v.dhash,
+                width = v.width,
+                height = v.height,
+                process_error = v.error,
+                processed_at = now()
+            from (values %s) as v(sha256, thumb_key, dhash, width, height, error)
+            where o.sha256 = v.sha256
+            """,
+            rows,
+            template="(%s, %s, %s::bigint, %s::int, %s::int, %s)",
+        )
+
+
+def settle_posts() -> int:
+    """
+    Copy thumbnails and hashes onto posts whose media objects are all
+    processed. Returns the number of posts updated.
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            update posts_raw p
+            set thumb_keys = m.thumb_keys,
+                dhashes = m.dhashes
+            from (
+              select p.id,
+                     coalesce(array_agg(o.thumb_key order by k.ord) filter (where o.thumb_key is not null), '{}') as thumb_keys,
+                     coalesce(array_agg(o.dhash order by k.ord) filter (where o.dhash is not null), '{}') as dhashes
+              from posts_raw p
+              cross join lateral unnest(p.media_keys) with ordinality as k(object_key, ord)
+              join media_objects o on o.object_key = k.object_key
+              where p.thumb_keys is null
+                and cardinality(p.media_keys) > 0
+              group by p.id
+              having bool_and(o.processed_at is not null)
+            ) m
+            where p.id = m.id
+            """
+        )
+        return cur.rowcount
+
+
+def process_pending_images(
+    max_objects: int = 200,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    One pass: thumbnail and hash up to `max_objects` stored images on a
+    process pool, then update the posts they belong to.
+    """
+    workers = workers or get_media_image_workers()
+    size = get_media_thumb_size()
+    bucket = get_media_bucket()
+    stats: Dict[str, Any] = {
+        "images": 0,
+        "processed": 0,
+        "failed": 0,
+        "thumb_bytes": 0,
+        "posts_updated": 0,
+        "elapsed_s": 0.0,
+    }
+    started = time.monotonic()
+
+    pending = load_unprocessed(max_objects)
+    stats["images"] = len(pending)
+    rows = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as pool:
+            futures = {
+                pool.submit(_process_object, bucket, sha256, object_key, size): sha256
+                for sha256, object_key in pending
+            }
+            for future in as_completed(futures):
+                sha256 = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # undecodable or missing originals are settled with the error
+                    stats["failed"] += 1
+                    print(f"[image_service] {sha256[:12]}: {type(e).__name__}: {e}")
+                    rows.append((sha256, None, None, None, None, f"{type(e).__name__}: {e}"[:500]))
+                    continue
+                stats["processed"] += 1
+                stats["thumb_bytes"] += result["bytes"]
+                rows.append((
+                    sha256, result["thumb_key"], to_signed(result["dhash"]),
+                    result["width"], result["height"], None,
+                ))
+        _record_results(rows)
+
+    stats["posts_updated"] = settle_posts()
+    stats["elapsed_s"] = time.monotonic() - started
+    return stats
+
+
+def format_summary(stats: Dict[str, Any]) -> str:
+    elapsed = max(stats["elapsed_s"], 1e-9)
+    return "\n".join([
+        f"Images:     {stats['processed']}/{stats['images']} processed, {stats['failed']} failed",
+        f"Posts:      {stats['posts_updated']} updated with thumbnails",
+        f"Elapsed:    {stats['elapsed_s']:.1f}s ({stats['processed'] / elapsed:.1f} images/s)",
+    ])
+
+
+class DuplicateIndex:
+    """
+    In-memory BK-tree of every distinct dHash in media_objects, refreshed
+    incrementally (only hashes processed since the last refresh are added).
+    """
+
+    def __init__(self, refresh_seconds: float = 60.0):
+        self.refresh_seconds = refresh_seconds
+        self._tree = BKTree()
+        self._since = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and time.monotonic() - self._checked < self.refresh_seconds:
+                return
+            with get_db_cursor() as cur:
+                cur.execute(
+                    """
+                    select dhash, processed_at
+                    from media_objects
+                    where dhash is not null
+                      and (%s::timestamptz is null or processed_at >= %s::timestamptz)
+                    """,
+                    (self._since, self._since),
+                )
+                for hashed, processed_at in cur.fetchall():
+                    self._tree.add(to_unsigned(hashed))
+                    if self._since is None or processed_at > self._since:
+                        self._since = processed_at
+            self._checked = time.monotonic()
+
+    def similar(self, hashed: int, max_distance: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(distance, hash) of known hashes within max_distance bits, closest first."""
+        if max_distance is None:
+            max_distance = get_media_duplicate_distance()
+        self.refresh()
+        with self._lock:
+            return self._tree.search(to_unsigned(hashed), max_distance)
+
+
+_index = DuplicateIndex()
+
+
+def find_duplicate_posts(post_id: str, max_distance: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Posts (any source) with an image within `max_distance` bits of one of
+    this post's images, closest first.
+    """
+    with get_db_cursor() as cur:
+        cur.execute("select dhashes from posts_raw where id = %s", (post_id,))
+        row = cur.fetchone()
+    if not row or not row[0]:
+        return []
+
+    distances: Dict[int, int] = {}
+    for hashed in row[0]:
+        for distance, match in _index.similar(hashed, max_distance):
+            signed = to_signed(match)
+            distances[signed] = min(distance, distances.get(signed, HASH_BITS))
+
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select p.id, p.dhashes, p.thumb_keys, p.posted_at, s.handle, s.platform
+            from posts_raw p
+            join sources s on s.id = p.source_id
+            where p.dhashes && %s::bigint[]
+              and p.id <> %s
+            """,
+            (list(distances), post_id),
+        )
+        rows = cur.fetchall()
+
+    matches = []
+    for pid, hashes, thumbs, posted_at, handle, platform in rows:
+        distance = min(distances[h] for h in hashes if h in distances)
+        matches.append({
+            "post_id": str(pid),
+            "handle": handle,
+            "platform": platform,
+            "posted_at": posted_at.isoformat() if posted_at else None,
+            "thumb_key": thumbs[0] if thumbs else None,
+            "distance": distance,
+        })
+    matches.sort(key=lambda m: m["distance"])
+    return matches
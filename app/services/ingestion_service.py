@@ -1,11 +1,18 @@
 # app/services/ingestion_service.py
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 import json
 
+from psycopg2.extras import execute_values
+
+from app.config import get_ingest_batch_size
 from app.db.connection import get_db_cursor
 
+# Rows per multi-row insert into the staging table; keeps each statement
+# a reasonable size on 100k-post backfills.
+STAGING_PAGE_SIZE = 1000
+
 
 def _parse_iso_datetime(value: Any) -> Optional[datetime]:
     """
@@ -29,11 +36,53 @@ def _parse_iso_datetime(value: Any) -> Optional[datetime]:
     return None
 
 
+def _normalize_post(post: Dict[str, Any]) -> Optional[Tuple]:
+    """
+    Turn one post dict into (post_id, caption, hashtags, media_urls,
+    posted_at, engagement_json), or None if it has no usable ID.
+    """
+    post_id = str(post.get("post_id") or "").strip()
+    if not post_id:
+        # no usable ID, skip this entry
+        return None
+
+    caption = post.get("caption") or ""
+
+    # Normalize hashtags to a list[str]
+    hashtags = post.get("hashtags") or []
+    if isinstance(hashtags, str):
+        # if someone passes "#a #b #c" as a string, split on whitespace
+        hashtags = [h.lstrip("#") for h in hashtags.split() if h.strip()]
+    elif isinstance(hashtags, list):
+        hashtags = [str(h).lstrip("#") for h in hashtags]
+    else:
+        hashtags = []
+
+    # Normalize media_urls to a list[str]
+    media_urls = post.get("media_urls") or []
+    if isinstance(media_urls, str):
+        media_urls = [media_urls]
+    elif isinstance(media_urls, list):
+        media_urls = [str(u) for u in media_urls]
+    else:
+        media_urls = []
+
+    posted_at = _parse_iso_datetime(post.get("posted_at"))
+
+    engagement = post.get("engagement") or {}
+    if not isinstance(engagement, dict):
+        engagement = {}
+
+    return (post_id, caption, hashtags, media_urls, posted_at, json.dumps(engagement))
+
+
 def upsert_posts(
     platform: str,
     source_id: str,
     posts: List[Dict[str, Any]],
-) -> None:
+    overwrite: bool = False,
+    track_engagement: bool = True,
+) -> Dict[str, int]:
     """
     Insert a batch of normalized posts into posts_raw.
 
@@ -61,48 +110,69 @@ def upsert_posts(
       - parse posted_at if it's a string
       - ensure hashtags/media_urls are lists of strings
       - JSON-encode engagement into the jsonb column
+
+    All posts are normalized first, bulk-loaded into a temp staging table
+    (execute_values), then moved into posts_raw with ONE
+    `insert ... select ... on conflict`, instead of one round trip per post.
+
+    Posts we already have keep their content, but a re-crawl that sees
+    different engagement updates posts_raw.engagement (the latest value)
+    and appends a row to engagement_snapshots; new posts get their first
+    snapshot on insert. Unchanged engagement writes nothing.
+    track_engagement=False (replaying old responses) leaves posts we
+    already have alone and takes no snapshots.
+
+    overwrite=True (archive replays after a normalization fix) instead
+    updates the content of posts we already have (caption, hashtags,
+    media_urls, posted_at) when any of it differs; the result then has
+    "updated" rather than "engagement_updated". Engagement of existing
+    posts is left alone and no snapshots are taken (archived engagement
+    isn't current). A post whose media_urls change loses its media_keys,
+    thumb_keys and dhashes, so the media pipeline processes it again.
+
+    Returns {"inserted": n, "engagement_updated": u, "skipped": m}; skipped
+    covers posts we already had (unchanged), duplicates within the batch,
+    and posts without an ID.
     """
+    empty = {"inserted": 0, "skipped": 0, **({"updated": 0} if overwrite else {"engagement_updated": 0})}
     if not posts:
-        return
+        return empty
+
+    rows = [r for r in (_normalize_post(p) for p in posts) if r is not None]
+    if not rows:
+        return dict(empty, skipped=len(posts))
 
     with get_db_cursor() as cur:
-        for post in posts:
-            post_id = str(post.get("post_id") or "").strip()
-            if not post_id:
-                # no usable ID, skip this entry
-                continue
-
-            caption = post.get("caption") or ""
-
-            # Normalize hashtags to a list[str]
-            hashtags = post.get("hashtags") or []
-            if isinstance(hashtags, str):
-                # if someone passes "#a #b #c" as a string, split on whitespace
-                hashtags = [h.lstrip("#") for h in hashtags.split() if h.strip()]
-            elif isinstance(hashtags, list):
-                hashtags = [str(h).lstrip("#") for h in hashtags]
-            else:
-                hashtags = []
-
-            # Normalize media_urls to a list[str]
-            media_urls = post.get("media_urls") or []
-            if isinstance(media_urls, str):
-                media_urls = [media_urls]
-            elif isinstance(media_urls, list):
-                media_urls = [str(u) for u in media_urls]
-            else:
-                media_urls = []
-
-            posted_at = _parse_iso_datetime(post.get("posted_at"))
-
-            engagement = post.get("engagement") or {}
-            if not isinstance(engagement, dict):
-                engagement = {}
-
-            # Insert into posts_raw using only existing columns
+        cur.execute(
+            """
+            create temp table posts_raw_staging (
+                post_id text,
+                caption text,
+                hashtags text[],
+                media_urls text[],
+                posted_at timestamptz,
+                engagement jsonb
+            ) on commit drop
+            """
+        )
+        execute_values(
+            cur,
+            """
+            insert into posts_raw_staging (
+                post_id, caption, hashtags, media_urls, posted_at, engagement
+            )
+            values %s
+            """,
+            rows,
+            template="(%s, %s, %s::text[], %s::text[], %s::timestamptz, %s::jsonb)",
+            page_size=STAGING_PAGE_SIZE,
+        )
+        if overwrite:
+            # distinct on: one row per post_id, or "do update" would hit
+            # the same row twice
             cur.execute(
                 """
-                INSERT INTO posts_raw (
+                insert into posts_raw (
                     source_id,
                     platform,
                     post_id,
@@ -112,10 +182,43 @@ def upsert_posts(
                     posted_at,
                     engagement
                 )
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (source_id, platform, post_id) DO NOTHING
+                select distinct on (post_id)
+                  %s::uuid, %s, post_id, caption, hashtags, media_urls, posted_at, engagement
+                from posts_raw_staging
+                order by post_id
+                on conflict (source_id, platform, post_id) do update
+                set caption = excluded.caption,
+                    hashtags = excluded.hashtags,
+                    media_urls = excluded.media_urls,
+                    posted_at = excluded.posted_at,
+                    -- new media: forget what was downloaded for the old URLs
+                    -- so media_service / image_service pick the post up again
+                    media_keys = case when posts_raw.media_urls is distinct from excluded.media_urls
+                                      then null else posts_raw.media_keys end,
+                    thumb_keys = case when posts_raw.media_urls is distinct from excluded.media_urls
+                                      then null else posts_raw.thumb_keys end,
+                    dhashes = case when posts_raw.media_urls is distinct from excluded.media_urls
+                                   then null else posts_raw.dhashes end
+                where (posts_raw.caption, posts_raw.hashtags, posts_raw.media_urls,
+                       posts_raw.posted_at)
+                      is distinct from
+                      (excluded.caption, excluded.hashtags, excluded.media_urls,
+                       excluded.posted_at)
+                returning (xmax = 0)
                 """,
-                (
+                (source_id, platform),
+            )
+            written = [r[0] for r in cur.fetchall()]
+            inserted = sum(1 for fresh in written if fresh)
+            updated = len(written) - inserted
+            return {"inserted": inserted, "updated": updated, "skipped": len(posts) - len(written)}
+
+        # same distinct on as above; the snapshot insert sees only the rows
+        # this statement actually wrote (new posts, changed engagement)
+        cur.execute(
+            """
+            with written as (
+                insert into posts_raw (
                     source_id,
                     platform,
                     post_id,
@@ -123,6 +226,72 @@ def upsert_posts(
                     hashtags,
                     media_urls,
                     posted_at,
-                    json.dumps(engagement),
-                ),
-            )
\ No newline at end of file
+                    engagement,
+                    engagement_updated_at
+                )
+                select distinct on (post_id)
+                  %(source_id)s::uuid, %(platform)s, post_id, caption, hashtags, media_urls,
+                  posted_at, engagement, now()
+                from posts_raw_staging
+                order by post_id
+                on conflict (source_id, platform, post_id) do update
+                set engagement = excluded.engagement,
+                    engagement_updated_at = excluded.engagement_updated_at
+                where %(track)s
+                  and excluded.engagement <> '{}'::jsonb
+                  and posts_raw.engagement is distinct from excluded.engagement
+                returning id, (xmax = 0) as inserted, engagement
+            ),
+            snapshots as (
+                insert into engagement_snapshots (post_raw_id, captured_at, likes, comments)
+                select id, now(), (engagement->>'likes')::int, (engagement->>'comments')::int
+                from written
+                where %(track)s
+                  and engagement ?| array['likes', 'comments']
+                on conflict do nothing
+            )
+            select inserted from written
+            """,
+            {"source_id": source_id, "platform": platform, "track": track_engagement},
+        )
+        written = [r[0] for r in cur.fetchall()]
+        inserted = sum(1 for fresh in written if fresh)
+
+    return {
+        "inserted": inserted,
+        "engagement_updated": len(written) - inserted,
+        "skipped": len(posts) - len(written),
+    }
+
+
+def upsert_posts_batched(
+    platform: str,
+    source_id: str,
+    posts: Iterable[Dict[str, Any]],
+    batch_size: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    upsert_posts over any iterable of posts (e.g. a streaming generator),
+    batch_size (default INGEST_BATCH_SIZE) at a time, so at most one batch
+    is held in memory however many posts the stream produces.
+
+    Returns the summed counts.
+    """
+    if batch_size is None:
+        batch_size = get_ingest_batch_size()
+    totals = {"inserted": 0, "engagement_updated": 0, "skipped": 0}
+    batch: List[Dict[str, Any]] = []
+
+    def flush() -> None:
+        counts = upsert_posts(platform=platform, source_id=source_id, posts=batch)
+        for k in totals:
+            totals[k] += counts[k]
+        batch.clear()
+
+    for post in posts:
+        batch.append(post)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return totals
@@ -0,0 +1,462 @@
+# app/services/instagram_crawler.py
+"""
+Concurrent crawler for many Instagram sources.
+
+  - scrapes run concurrently (up to `concurrency` at a time) over one
+    shared httpx.AsyncClient, each with its own timeout
+  - several profiles can share one Apify actor run (profiles_per_run)
+  - runs are either run-sync calls or async runs whose dataset is paged
+    into ingestion as it fills up (run_mode)
+  - every finished scrape is handed to a single writer task that upserts
+    it while the other scrapes are still running (fetch and write overlap)
+  - run-sync responses are parsed as they stream in and written
+    INGEST_BATCH_SIZE posts at a time, so memory doesn't grow with the
+    result count
+  - only posts newer than each source's high-water mark are requested
+    (onlyPostsNewerThan) and written (see crawl_service)
+  - resultsLimit is sized per source from its posting rate, and sources
+    with similar limits share actor runs
+  - one slow or failing source never holds up the rest
+  - each source is crawled under a lease (see crawl_lock): sources another
+    crawler or a dashboard fetch is already scraping are skipped, and
+    fetches waiting on one of ours get its result as soon as it's written
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import time
+
+import httpx
+
+from app.config import (
+    get_apify_profiles_per_run,
+    get_apify_run_mode,
+    get_cassette_mode,
+    get_crawl_default_limit,
+    get_ingest_batch_size,
+    get_ingest_concurrency,
+    get_ingest_source_timeout,
+)
+from app.services.crawl_lock import claim_sources, crawl_result, release_all
+from app.services.crawl_service import (
+    Mark,
+    load_marks,
+    newer_than,
+    newest_post,
+    plan_limits,
+    record_crawl,
+    split_new_posts,
+)
+from app.services.ingestion_service import upsert_posts
+from app.services.instagram_scraper import (
+    APIFY_SYNC_TIMEOUT_SECONDS,
+    afetch_instagram_posts,
+    afetch_instagram_posts_batch,
+    aiter_instagram_posts,
+    astream_instagram_posts,
+    profiles_per_run as scraper_profiles_per_run,
+)
+from app.utils.singleflight import Lease
+
+
+def _key(handle: str) -> str:
+    return handle.lstrip("@").lower()
+
+
+def _new_stats(total: int) -> Dict[str, Any]:
+    return {
+        "sources": total,
+        "busy": 0,
+        "succeeded": 0,
+        "failed": 0,
+        "empty": 0,
+        "posts_fetched": 0,
+        "posts_expected": 0.0,
+        "posts_new": 0,
+        "posts_known": 0,
+        "posts_inserted": 0,
+        "posts_engagement_updated": 0,
+        "posts_skipped": 0,
+        "elapsed_s": 0.0,
+        "failures": [],
+    }
+
+
+def _make_batches(
+    sources: List[Tuple[str, str]],
+    limits: Dict[str, int],
+    max_profiles: Callable[[int], int],
+) -> List[List[Tuple[str, str]]]:
+    """
+    Group sources into actor runs. A run's resultsLimit is its largest
+    member's, so sources are sorted by limit and a run never mixes limits
+    more than 2x apart; max_profiles(limit) caps the run size for that limit.
+    """
+    batches: List[List[Tuple[str, str]]] = []
+    batch: List[Tuple[str, str]] = []
+    for source in sorted(sources, key=lambda s: limits[s[0]]):
+        limit = limits[source[0]]
+        if batch and (
+            len(batch) + 1 > max(1, max_profiles(limit)) or limit > 2 * limits[batch[0][0]]
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(source)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _fail_source(
+    stats: Dict[str, Any],
+    failed_ids: Set[str],
+    source_id: str,
+    handle: str,
+    error: str,
+) -> None:
+    """
+    Record a failure. A source counts once in stats["failed"] however many
+    of its steps failed (e.g. a write, then the fetch it was part of).
+    """
+    failed_ids.add(source_id)
+    stats["failed"] = len(failed_ids)
+    stats["failures"].append((handle, error))
+    print(f"[instagram_crawler] @{handle}: {error}")
+
+
+async def _writer(
+    queue: asyncio.Queue,
+    stats: Dict[str, Any],
+    failed_ids: Set[str],
+    marks: Dict[str, Mark],
+    expected: Dict[str, Optional[float]],
+    limits: Dict[str, int],
+    leases: Dict[str, Lease],
+) -> None:
+    """
+    Drain scrape results into posts_raw as they arrive. A single writer
+    keeps DB connections to one at a time while scrapes stay concurrent.
+
+    Queue items are (source_id, handle, posts, finished): a source can
+    arrive in several pieces (async run pages); `finished` marks its last.
+    Posts newer than the source's high-water mark are new; every post is
+    upserted, so re-seen ones get their engagement refreshed.
+
+    A finished source's result is published on its lease (for dashboard
+    fetches waiting on it); a source whose write failed keeps its lease
+    until the crawl releases it.
+    """
+    fetched_counts: Dict[str, int] = {}
+    new_counts: Dict[str, int] = {}
+    known_counts: Dict[str, int] = {}
+    engagement_counts: Dict[str, int] = {}
+    newest: Dict[str, Any] = {}
+    write_failed = set()
+
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+
+        source_id, handle, posts, finished = item
+        if posts and source_id not in write_failed:
+            fetched_counts[source_id] = fetched_counts.get(source_id, 0) + len(posts)
+            new_posts, known = split_new_posts(posts, marks.get(source_id))
+            known_counts[source_id] = known_counts.get(source_id, 0) + known
+            stats["posts_known"] += known
+            try:
+                counts = await asyncio.to_thread(
+                    upsert_posts, platform="instagram", source_id=source_id, posts=posts
+                )
+                stats["posts_inserted"] += counts["inserted"]
+                stats["posts_engagement_updated"] += counts["engagement_updated"]
+                engagement_counts[source_id] = engagement_counts.get(source_id, 0) + counts["engagement_updated"]
+                stats["posts_skipped"] += counts["skipped"]
+                new_counts[source_id] = new_counts.get(source_id, 0) + len(new_posts)
+                stats["posts_new"] += len(new_posts)
+                page_newest = newest_post(new_posts)
+                if page_newest and (source_id not in newest or page_newest[0] > newest[source_id][0]):
+                    newest[source_id] = page_newest
+            except Exception as e:
+                write_failed.add(source_id)
+                _fail_source(stats, failed_ids, source_id, handle, f"write failed: {e}")
+
+        if not finished or source_id in write_failed:
+            continue
+
+        new, known = new_counts.get(source_id, 0), known_counts.get(source_id, 0)
+        try:
+            await asyncio.to_thread(
+                record_crawl, source_id, new, known, newest.get(source_id), expected.get(source_id)
+            )
+        except Exception as e:
+            print(f"[instagram_crawler] @{handle}: could not record crawl: {e}")
+        lease = leases.pop(source_id, None)
+        if lease is not None:
+            result = crawl_result(
+                handle, fetched_counts.get(source_id, 0), new, known,
+                engagement_counts.get(source_id, 0), expected.get(source_id), limits[source_id],
+            )
+            await asyncio.to_thread(lease.publish, result)
+        if not new:
+            stats["empty"] += 1
+        stats["succeeded"] += 1
+        guess = expected.get(source_id)
+        print(
+            f"[instagram_crawler] @{handle}: {new} new, {known} already known"
+            + (f" (expected {guess:.1f})" if guess is not None else "")
+        )
+
+
+async def crawl_instagram_sources(
+    sources: List[Tuple[str, str]],
+    limit: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    source_timeout: Optional[float] = None,
+    profiles_per_run: Optional[int] = None,
+    run_mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Crawl (source_id, handle) pairs concurrently and ingest the results.
+
+    By default each source's resultsLimit is sized from its posting rate
+    and time since its last crawl (crawl_service.plan_limits); pass
+    `limit` to request the same number of posts from every source.
+
+    With profiles_per_run > 1, sources are grouped into multi-profile actor
+    runs (see fetch_instagram_posts_batch) and `concurrency` counts runs,
+    not sources. Results are still upserted per source.
+
+    run_mode "async" (default: APIFY_RUN_MODE) starts each run without
+    waiting on it and ingests its dataset page by page as it fills up; the
+    run-sync timeout no longer limits the batch size.
+
+    Sources already being crawled elsewhere (their lease is held) are
+    skipped and counted as busy.
+
+    Returns counters: sources, busy, succeeded, failed, empty, posts_fetched,
+    posts_expected, posts_new, posts_known, posts_inserted, posts_engagement_updated,
+    posts_skipped, elapsed_s and
+    failures [(handle, error)].
+    """
+    leases, busy = await asyncio.to_thread(claim_sources, [source_id for source_id, _ in sources])
+    if busy:
+        skipped = ", ".join(f"@{handle}" for source_id, handle in sources if source_id in busy)
+        print(f"[instagram_crawler] Already being crawled elsewhere, skipping: {skipped}")
+    try:
+        stats = await _crawl_sources(
+            [s for s in sources if s[0] in leases],
+            dict(leases),
+            limit=limit,
+            concurrency=concurrency,
+            source_timeout=source_timeout,
+            profiles_per_run=profiles_per_run,
+            run_mode=run_mode,
+        )
+    finally:
+        # results were published as sources finished; this frees the rest
+        await asyncio.to_thread(release_all, leases.values())
+    stats["sources"] = len(sources)
+    stats["busy"] = len(busy)
+    return stats
+
+
+async def _crawl_sources(
+    sources: List[Tuple[str, str]],
+    leases: Dict[str, Lease],
+    limit: Optional[int],
+    concurrency: Optional[int],
+    source_timeout: Optional[float],
+    profiles_per_run: Optional[int],
+    run_mode: Optional[str],
+) -> Dict[str, Any]:
+    if concurrency is None:
+        concurrency = get_ingest_concurrency()
+    if source_timeout is None:
+        source_timeout = get_ingest_source_timeout()
+    if run_mode is None:
+        run_mode = get_apify_run_mode()
+
+    stats = _new_stats(len(sources))
+    started = time.monotonic()
+
+    source_ids = [source_id for source_id, _ in sources]
+    marks = await asyncio.to_thread(load_marks, source_ids)
+    plans = await asyncio.to_thread(plan_limits, source_ids)
+    limits = {sid: limit or plans.get(sid, (get_crawl_default_limit(), None))[0] for sid in source_ids}
+    expected = {sid: plans[sid][1] for sid in source_ids if sid in plans}
+    stats["posts_expected"] = sum(e for e in expected.values() if e is not None)
+
+    if profiles_per_run is not None:
+        max_profiles: Callable[[int], int] = lambda _limit: profiles_per_run
+    elif run_mode == "async":
+        max_profiles = lambda _limit: get_apify_profiles_per_run()
+    else:
+        max_profiles = scraper_profiles_per_run
+
+    batch_size = get_ingest_batch_size()
+    # bounded, so a slow database pushes back on parsing instead of
+    # letting parsed posts pile up in memory
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency) * 4)
+    failed_ids: Set[str] = set()
+    writer = asyncio.create_task(_writer(queue, stats, failed_ids, marks, expected, limits, leases))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    pool_limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=pool_limits) as client:
+
+        def fail(batch: List[Tuple[str, str]], error: str) -> None:
+            for source_id, handle in batch:
+                _fail_source(stats, failed_ids, source_id, handle, error)
+
+        def batch_newer_than(batch: List[Tuple[str, str]]) -> Optional[str]:
+            return newer_than(marks.get(source_id, (None, None)) for source_id, _ in batch)
+
+        def batch_limit(batch: List[Tuple[str, str]]) -> int:
+            return max(limits[source_id] for source_id, _ in batch)
+
+        async def stream_batch(batch: List[Tuple[str, str]]) -> None:
+            async with semaphore:
+                try:
+                    async for page in astream_instagram_posts(
+                        [h for _, h in batch], limit=batch_limit(batch), client=client,
+                        newer_than=batch_newer_than(batch),
+                    ):
+                        for source_id, handle in batch:
+                            posts = page.get(_key(handle))
+                            if posts:
+                                stats["posts_fetched"] += len(posts)
+                                await queue.put((source_id, handle, posts, False))
+                except Exception as e:
+                    fail(batch, f"async run failed: {e}")
+                    return
+
+            for source_id, handle in batch:
+                await queue.put((source_id, handle, [], True))
+
+        async def parse_batch(batch: List[Tuple[str, str]], timeout: float) -> None:
+            # run-sync, but items are parsed off the response as it streams
+            # and handed to the writer batch_size at a time
+            sources_by_key = {_key(handle): (source_id, handle) for source_id, handle in batch}
+            pending: Dict[str, List[Dict[str, Any]]] = {}
+
+            async def consume() -> None:
+                # `timeout` bounds the scrape, not the writer: time spent
+                # blocked on a full queue (a slow database) moves the
+                # deadline out instead of failing the source
+                loop = asyncio.get_running_loop()
+                deadline_at = loop.time() + timeout
+                items = aiter_instagram_posts(
+                    [h for _, h in batch], limit=batch_limit(batch), client=client, timeout=timeout,
+                    newer_than=batch_newer_than(batch),
+                )
+                try:
+                    while True:
+                        try:
+                            username, post = await asyncio.wait_for(
+                                items.__anext__(), timeout=deadline_at - loop.time()
+                            )
+                        except StopAsyncIteration:
+                            return
+                        if username not in sources_by_key:
+                            continue
+                        stats["posts_fetched"] += 1
+                        posts = pending.setdefault(username, [])
+                        posts.append(post)
+                        if len(posts) >= batch_size:
+                            source_id, handle = sources_by_key[username]
+                            pending[username] = []
+                            blocked_at = loop.time()
+                            await queue.put((source_id, handle, posts, False))
+                            deadline_at += loop.time() - blocked_at
+                finally:
+                    await items.aclose()
+
+            async with semaphore:
+                try:
+                    await consume()
+                except asyncio.TimeoutError:
+                    fail(batch, f"timed out after {timeout:.0f}s")
+                    return
+                except Exception as e:
+                    fail(batch, f"fetch failed: {e}")
+                    return
+
+            for source_id, handle in batch:
+                await queue.put((source_id, handle, pending.get(_key(handle), []), True))
+
+        async def crawl_batch(batch: List[Tuple[str, str]]) -> None:
+            timeout = source_timeout if len(batch) == 1 else APIFY_SYNC_TIMEOUT_SECONDS
+            if get_cassette_mode() == "off":
+                await parse_batch(batch, timeout)
+                return
+
+            # cassettes record whole return values, so record/replay runs
+            # keep using the buffered fetch functions
+            async with semaphore:
+                try:
+                    if len(batch) == 1:
+                        _, handle = batch[0]
+                        fetched = {
+                            _key(handle): await asyncio.wait_for(
+                                afetch_instagram_posts(
+                                    handle, limit=batch_limit(batch), client=client, timeout=timeout,
+                                    newer_than=batch_newer_than(batch),
+                                ),
+                                timeout=timeout,
+                            )
+                        }
+                    else:
+                        fetched = await asyncio.wait_for(
+                            afetch_instagram_posts_batch(
+                                [h for _, h in batch], limit=batch_limit(batch), client=client,
+                                newer_than=batch_newer_than(batch),
+                            ),
+                            timeout=timeout,
+                        )
+                except asyncio.TimeoutError:
+                    fail(batch, f"timed out after {timeout:.0f}s")
+                    return
+                except Exception as e:
+                    fail(batch, f"fetch failed: {e}")
+                    return
+
+            for source_id, handle in batch:
+                posts = fetched.get(_key(handle), [])
+                stats["posts_fetched"] += len(posts)
+                await queue.put((source_id, handle, posts, True))
+
+        batches = _make_batches(sources, limits, max_profiles)
+        try:
+            run_batch = stream_batch if run_mode == "async" else crawl_batch
+            await asyncio.gather(*(run_batch(batch) for batch in batches))
+        finally:
+            await queue.put(None)
+            await writer
+
+    stats["elapsed_s"] = time.monotonic() - started
+    return stats
+
+
+def format_summary(stats: Dict[str, Any]) -> str:
+    """Human-readable throughput summary for a crawl."""
+    elapsed = max(stats["elapsed_s"], 1e-9)
+    # busy sources were never scraped: keep them out of the rate
+    crawled = stats["succeeded"] + stats["failed"]
+    lines = [
+        f"Sources:    {stats['succeeded']}/{crawled} ok, "
+        f"{stats['failed']} failed, {stats['empty']} returned nothing",
+        f"Busy:       {stats['busy']} skipped (already being crawled elsewhere)",
+        f"Posts:      {stats['posts_fetched']} fetched: {stats['posts_new']} new, "
+        f"{stats['posts_known']} already known (at or before the high-water mark)",
+        f"Expected:   {stats['posts_expected']:.1f} new posts predicted from posting rates, "
+        f"{stats['posts_new']} found",
+        f"Stored:     {stats['posts_inserted']} inserted, {stats['posts_engagement_updated']} engagement updated, "
+        f"{stats['posts_skipped']} unchanged",
+        f"Elapsed:    {stats['elapsed_s']:.1f}s",
+        f"Throughput: {crawled / elapsed * 60:.1f} sources/min, "
+        f"{stats['posts_fetched'] / elapsed:.1f} posts/s",
+    ]
+    for handle, error in stats["failures"]:
+        lines.append(f"  failed @{handle}: {error}")
+    return "\n".join(lines)
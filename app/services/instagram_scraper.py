@@ -1,12 +1,25 @@
 # app/services/instagram_scraper.py
 
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
 import os
 import json
 from datetime import datetime, timezone
 
 import httpx
 
+from app.config import get_apify_base_url, get_apify_profiles_per_run, get_apify_seconds_per_profile
+from app.services.apify_runs import iter_run_pages
+from app.services.raw_archive import RawArchiveWriter, archive_raw_items
+from app.utils import deadline
+from app.utils.cassette import cassette
+from app.utils.json_stream import aiter_json_array, iter_json_array
+
+
+INSTAGRAM_ACTOR = "apify~instagram-scraper"
+
+# Apify aborts run-sync-get-dataset-items calls after 300 s
+APIFY_SYNC_TIMEOUT_SECONDS = 300
+
 
 def _get_apify_token() -> str:
     """
@@ -41,47 +54,33 @@ def _epoch_to_iso(ts: Any) -> Optional[str]:
     return None
 
 
-def fetch_instagram_posts(handle: str, limit: int = 20) -> List[Dict[str, Any]]:
-    """
-    Fetch the latest posts for a given Instagram handle using Apify's instagram-scraper.
-
-    Input:
-        handle: Instagram username (with or without leading '@')
-        limit:  how many recent posts to request
-
-    Returns:
-        A list of *normalized* posts in the shape expected by ingestion_service.upsert_posts:
-
-        {
-          "post_id": str,
-          "caption": str,
-          "hashtags": [str],
-          "media_urls": [str],
-          "posted_at": str | None,      # ISO8601 string if known
-          "engagement": {
-              "likes": int,
-              "comments": int,
-              ... (other fields can be added later)
-          }
-        }
-    """
+def _run_sync_url() -> str:
     token = _get_apify_token()
-    username = handle.lstrip("@")  # make sure we don't send '@@something' to Apify
-
-    url = (
-        "https://api.apify.com/v2/acts/"
-        "apify~instagram-scraper/run-sync-get-dataset-items"
+    return (
+        f"{get_apify_base_url().rstrip('/')}/v2/acts/"
+        f"{INSTAGRAM_ACTOR}/run-sync-get-dataset-items"
         f"?token={token}"
     )
 
+
+def _profile_url(username: str) -> str:
+    return f"https://www.instagram.com/{username}/"
+
+
+def _build_payload(usernames: List[str], limit: int, newer_than: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Actor input for one run over one or more profiles. resultsLimit
+    applies per profile URL; newer_than (ISO date) becomes the actor's
+    onlyPostsNewerThan, so it skips posts we already have.
+    """
     # Use directUrls instead of usernames - this works more reliably with Apify
-    profile_url = f"https://www.instagram.com/{username}/"
-    
     payload: Dict[str, Any] = {
-        "directUrls": [profile_url],
+        "directUrls": [_profile_url(u) for u in usernames],
         "resultsLimit": limit,
         "addParentData": False,  # Keep response simpler
     }
+    if newer_than:
+        payload["onlyPostsNewerThan"] = newer_than
 
     session_cookie = _get_ig_session_cookie()
     if session_cookie:
@@ -89,97 +88,464 @@ def fetch_instagram_posts(handle: str, limit: int = 20) -> List[Dict[str, Any]]:
         # uses something different (check its docs).
         payload["sessionCookie"] = session_cookie
 
+    return payload
+
+
+def _build_request(handle: str, limit: int, newer_than: Optional[str] = None) -> Tuple[str, Dict[str, Any], str]:
+    """
+    Return (url, payload, username) for a run-sync-get-dataset-items call.
+    """
+    username = handle.lstrip("@")  # make sure we don't send '@@something' to Apify
+    url = _run_sync_url()
+    payload = _build_payload([username], limit, newer_than)
+
     print(f"[instagram_scraper] Fetching IG posts for @{username} (limit={limit})")
-    print(f"[instagram_scraper] Using profile URL: {profile_url}")
-    resp = httpx.post(url, json=payload, timeout=120)  # Increased timeout to 120s
+    print(f"[instagram_scraper] Using profile URL: {_profile_url(username)}")
+    return url, payload, username
+
+
+def _read_items(resp: httpx.Response) -> Optional[List[Dict[str, Any]]]:
+    """
+    Decode an Apify dataset-items response, or None if the call failed.
+    """
     print("[instagram_scraper] HTTP status:", resp.status_code)
 
     # Apify commonly returns 201 = "run created + dataset items ready"
     if resp.status_code not in (200, 201):
         print("[instagram_scraper] Non-200/201 response body (truncated):")
         print(resp.text[:300])
-        return []
+        return None
 
     try:
         items = resp.json()
     except json.JSONDecodeError:
         print("[instagram_scraper] JSON decode error, raw (truncated):")
         print(resp.text[:500])
+        return None
+
+    return items if isinstance(items, list) else None
+
+
+def _archive_request(payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Actor input as recorded in archives (never the session cookie)."""
+    return {k: v for k, v in (payload or {}).items() if k != "sessionCookie"}
+
+
+def _archive(usernames: List[str], items: List[Any], mode: str, payload: Optional[Dict[str, Any]]) -> None:
+    """Keep the raw items for replay_raw_archive."""
+    archive_raw_items("instagram", usernames, items, mode, _archive_request(payload))
+
+
+def _parse_response(
+    resp: httpx.Response,
+    username: str,
+    payload: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Turn an Apify HTTP response into normalized posts ([] on any error).
+    """
+    items = _read_items(resp)
+    if items is None:
         return []
+    _archive([username], items, "sync", payload)
 
     # Actor-level error (what you've been seeing: {"error":"no_items", ...})
-    if isinstance(items, list) and items and isinstance(items[0], dict) and "error" in items[0]:
+    if items and isinstance(items[0], dict) and "error" in items[0]:
         print("[instagram_scraper] Apify error object:", items[0])
         return []
 
-    normalized: List[Dict[str, Any]] = []
+    normalized = _normalize_items(items)
+    print(f"[instagram_scraper] Normalized {len(normalized)} posts for @{username}")
+    return normalized
+
 
+def _item_username(item: Dict[str, Any]) -> Optional[str]:
+    """
+    Which requested profile an item belongs to: ownerUsername if the actor
+    set it, else the profile URL it was scraped from.
+    """
+    owner = item.get("ownerUsername")
+    if owner:
+        return str(owner).lower()
+    input_url = item.get("inputUrl") or ""
+    if "instagram.com/" in input_url:
+        path = input_url.split("instagram.com/", 1)[1]
+        return path.strip("/").split("/")[0].split("?")[0].lower() or None
+    return None
+
+
+def _split_by_profile(items: List[Dict[str, Any]], usernames: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group the raw items of a multi-profile run by requested username
+    (lowercased). Error objects and items we can't attribute are dropped.
+    """
+    grouped: Dict[str, List[Dict[str, Any]]] = {u.lower(): [] for u in usernames}
+    unattributed = 0
     for item in items:
-        # Apify field names can vary; this is a best-effort mapping.
-        post_id = item.get("id") or item.get("shortCode") or item.get("url")
-        if not post_id:
+        if not isinstance(item, dict):
             continue
+        owner = _item_username(item)
+        if "error" in item:
+            print(f"[instagram_scraper] Apify error object for @{owner}:", item)
+            continue
+        if owner in grouped:
+            grouped[owner].append(item)
+        else:
+            unattributed += 1
+    if unattributed:
+        print(f"[instagram_scraper] Dropped {unattributed} items not matching any requested profile")
+    return grouped
+
+
+def _parse_batch_response(
+    resp: httpx.Response,
+    usernames: List[str],
+    payload: Optional[Dict[str, Any]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    items = _read_items(resp)
+    if items is None:
+        return {u.lower(): [] for u in usernames}
+    _archive(usernames, items, "sync", payload)
+
+    result = {u: _normalize_items(raw) for u, raw in _split_by_profile(items, usernames).items()}
+    print(
+        f"[instagram_scraper] Normalized {sum(len(p) for p in result.values())} posts "
+        f"for {len(usernames)} profiles in one run"
+    )
+    return result
+
+
+def normalize_raw_items(items: List[Any], usernames: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Normalize raw items the way the live fetch paths do, for archived
+    responses: {username (lowercase): [normalized posts]}. Single-profile
+    responses belong to their one username; multi-profile ones are split
+    by owner.
+    """
+    if len(usernames) == 1:
+        if items and isinstance(items[0], dict) and "error" in items[0]:
+            return {usernames[0].lower(): []}
+        return {usernames[0].lower(): _normalize_items([i for i in items if isinstance(i, dict)])}
+    return {u: _normalize_items(raw) for u, raw in _split_by_profile(items, usernames).items()}
+
+
+def _normalize_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Map raw Apify items to the shape expected by ingestion_service.upsert_posts.
+    """
+    return [post for post in (_normalize_item(item) for item in items) if post is not None]
+
+
+def _normalize_item(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Map one raw Apify item to an upsert_posts post, or None if it has no ID.
+    """
+    # Apify field names can vary; this is a best-effort mapping.
+    post_id = item.get("id") or item.get("shortCode") or item.get("url")
+    if not post_id:
+        return None
+
+    caption = (
+        item.get("caption")
+        or item.get("captionText")
+        or ""
+    )
+
+    # Extract hashtags from caption
+    hashtags: List[str] = []
+    if caption:
+        for word in caption.split():
+            if word.startswith("#") and len(word) > 1:
+                hashtags.append(word.lstrip("#"))
+
+    # Media URLs: resources[] or main url/displayUrl
+    media_urls: List[str] = []
+    resources = item.get("resources") or item.get("images") or []
+    if isinstance(resources, list):
+        for r in resources:
+            if not isinstance(r, dict):
+                continue
+            url_field = r.get("url") or r.get("src")
+            if url_field:
+                media_urls.append(url_field)
+
+    main_url = item.get("url") or item.get("displayUrl")
+    if main_url and main_url not in media_urls:
+        media_urls.append(main_url)
+
+    # Timestamp: "timestamp" or "takenAtTimestamp"
+    ts = item.get("timestamp") or item.get("takenAtTimestamp")
+    ts_iso = _epoch_to_iso(ts) if isinstance(ts, (int, float)) else ts
+    # At this point ts_iso may be a string or None; ingestion will try to parse
+
+    # Engagement fields
+    likes = (
+        item.get("likesCount")
+        or item.get("likes")
+        or (item.get("edge_liked_by") or {}).get("count")
+    )
+    comments = (
+        item.get("commentsCount")
+        or item.get("comments")
+        or (item.get("edge_media_to_comment") or {}).get("count")
+    )
+
+    engagement = {
+        "likes": int(likes or 0),
+        "comments": int(comments or 0),
+    }
+
+    return {
+        "post_id": str(post_id),
+        "caption": caption or "",
+        "hashtags": hashtags,
+        "media_urls": media_urls,
+        "posted_at": ts_iso,
+        "engagement": engagement,
+    }
+
+
+@cassette("fetch_instagram_posts")
+def fetch_instagram_posts(handle: str, limit: int = 20, newer_than: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch the latest posts for a given Instagram handle using Apify's instagram-scraper.
 
-        caption = (
-            item.get("caption")
-            or item.get("captionText")
-            or ""
-        )
-
-        # Extract hashtags from caption
-        hashtags: List[str] = []
-        if caption:
-            for word in caption.split():
-                if word.startswith("#") and len(word) > 1:
-                    hashtags.append(word.lstrip("#"))
-
-        # Media URLs: resources[] or main url/displayUrl
-        media_urls: List[str] = []
-        resources = item.get("resources") or item.get("images") or []
-        if isinstance(resources, list):
-            for r in resources:
-                if not isinstance(r, dict):
-                    continue
-                url_field = r.get("url") or r.get("src")
-                if url_field:
-                    media_urls.append(url_field)
-
-        main_url = item.get("url") or item.get("displayUrl")
-        if main_url and main_url not in media_urls:
-            media_urls.append(main_url)
-
-        # Timestamp: "timestamp" or "takenAtTimestamp"
-        ts = item.get("timestamp") or item.get("takenAtTimestamp")
-        ts_iso = _epoch_to_iso(ts) if isinstance(ts, (int, float)) else ts
-        # At this point ts_iso may be a string or None; ingestion will try to parse
-
-        # Engagement fields
-        likes = (
-            item.get("likesCount")
-            or item.get("likes")
-            or (item.get("edge_liked_by") or {}).get("count")
-        )
-        comments = (
-            item.get("commentsCount")
-            or item.get("comments")
-            or (item.get("edge_media_to_comment") or {}).get("count")
-        )
-
-        engagement = {
-            "likes": int(likes or 0),
-            "comments": int(comments or 0),
+    Input:
+        handle:     Instagram username (with or without leading '@')
+        limit:      how many recent posts to request
+        newer_than: optional ISO timestamp; only posts after it are scraped
+
+    Returns:
+        A list of *normalized* posts in the shape expected by ingestion_service.upsert_posts:
+
+        {
+          "post_id": str,
+          "caption": str,
+          "hashtags": [str],
+          "media_urls": [str],
+          "posted_at": str | None,      # ISO8601 string if known
+          "engagement": {
+              "likes": int,
+              "comments": int,
+              ... (other fields can be added later)
+          }
         }
+    """
+    url, payload, username = _build_request(handle, limit, newer_than)
+    # Up to 120s, or less if the request that asked for this has a closer deadline
+    resp = httpx.post(url, json=payload, timeout=deadline.timeout(120))
+    return _parse_response(resp, username, payload)
+
+
+@cassette("fetch_instagram_posts", ignore=("client", "timeout"))
+async def afetch_instagram_posts(
+    handle: str,
+    limit: int = 20,
+    client: Optional[httpx.AsyncClient] = None,
+    timeout: float = 120,
+    newer_than: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Async version of fetch_instagram_posts (same request, same output).
 
-        normalized.append(
-            {
-                "post_id": str(post_id),
-                "caption": caption or "",
-                "hashtags": hashtags,
-                "media_urls": media_urls,
-                "posted_at": ts_iso,
-                "engagement": engagement,
-            }
-        )
+    Pass a shared `client` when fetching many sources concurrently so they
+    reuse its connection pool. `timeout` caps this one scrape (the request
+    deadline, if any, can shorten it).
 
-    print(f"[instagram_scraper] Normalized {len(normalized)} posts for @{username}")
-    return normalized
\ No newline at end of file
+    Cancelling the awaiting task aborts the HTTP call, so a scrape nobody is
+    waiting for anymore stops using an Apify run slot.
+    """
+    url, payload, username = _build_request(handle, limit, newer_than)
+    if client is None:
+        async with httpx.AsyncClient() as own_client:
+            resp = await own_client.post(url, json=payload, timeout=deadline.timeout(timeout))
+    else:
+        resp = await client.post(url, json=payload, timeout=deadline.timeout(timeout))
+    return _parse_response(resp, username, payload)
+
+
+def profiles_per_run(limit: int) -> int:
+    """
+    How many profiles to put in one multi-profile run: APIFY_PROFILES_PER_RUN,
+    capped so the run's estimated duration stays well inside the run-sync
+    timeout (bigger per-profile limits mean fewer profiles per run).
+    """
+    per_profile = get_apify_seconds_per_profile() * max(1.0, limit / 20)
+    fits = int(APIFY_SYNC_TIMEOUT_SECONDS * 0.8 // per_profile)
+    return max(1, min(get_apify_profiles_per_run(), fits))
+
+
+@cassette("fetch_instagram_posts_batch")
+def fetch_instagram_posts_batch(
+    handles: List[str],
+    limit: int = 20,
+    newer_than: Optional[str] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch several profiles in ONE actor run (one startup instead of one per
+    profile). Keep len(handles) <= profiles_per_run(limit).
+
+    Returns {username (lowercase, no '@'): [normalized posts]}, with an
+    entry for every requested handle (empty if it returned nothing).
+    """
+    usernames = [h.lstrip("@") for h in handles]
+    print(f"[instagram_scraper] Fetching {len(usernames)} profiles in one run (limit={limit} each)")
+    payload = _build_payload(usernames, limit, newer_than)
+    resp = httpx.post(
+        _run_sync_url(),
+        json=payload,
+        timeout=deadline.timeout(APIFY_SYNC_TIMEOUT_SECONDS),
+    )
+    return _parse_batch_response(resp, usernames, payload)
+
+
+@cassette("fetch_instagram_posts_batch", ignore=("client",))
+async def afetch_instagram_posts_batch(
+    handles: List[str],
+    limit: int = 20,
+    client: Optional[httpx.AsyncClient] = None,
+    newer_than: Optional[str] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Async version of fetch_instagram_posts_batch.
+    """
+    usernames = [h.lstrip("@") for h in handles]
+    print(f"[instagram_scraper] Fetching {len(usernames)} profiles in one run (limit={limit} each)")
+    url, payload = _run_sync_url(), _build_payload(usernames, limit, newer_than)
+    timeout = deadline.timeout(APIFY_SYNC_TIMEOUT_SECONDS)
+    if client is None:
+        async with httpx.AsyncClient() as own_client:
+            resp = await own_client.post(url, json=payload, timeout=timeout)
+    else:
+        resp = await client.post(url, json=payload, timeout=timeout)
+    return _parse_batch_response(resp, usernames, payload)
+
+
+async def astream_instagram_posts(
+    handles: List[str],
+    limit: int = 20,
+    client: Optional[httpx.AsyncClient] = None,
+    page_size: Optional[int] = None,
+    newer_than: Optional[str] = None,
+) -> AsyncIterator[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Async-run mode: start one actor run for all `handles` and yield
+    {username (lowercase): [normalized posts]} for each dataset page as it
+    arrives. No 300 s cap, so large resultsLimit values and many profiles
+    per run are fine.
+
+    Raises apify_runs.ApifyRunError if the run fails or times out.
+    """
+    usernames = [h.lstrip("@") for h in handles]
+    payload = _build_payload(usernames, limit, newer_than)
+    print(f"[instagram_scraper] Starting async run for {len(usernames)} profiles (limit={limit} each)")
+
+    if client is None:
+        async with httpx.AsyncClient(timeout=30) as own_client:
+            async for page in astream_instagram_posts(handles, limit, own_client, page_size, newer_than):
+                yield page
+        return
+
+    async for items in iter_run_pages(client, INSTAGRAM_ACTOR, payload, page_size=page_size):
+        _archive(usernames, items, "async", payload)
+        grouped = _split_by_profile(items, usernames)
+        yield {u: _normalize_items(raw) for u, raw in grouped.items() if raw}
+
+
+def _iter_normalized(
+    items: Iterable[Any],
+    usernames: List[str],
+    archive: RawArchiveWriter,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Archive and normalize raw items one at a time: (username, post).
+    Single-profile responses all belong to their one username, like
+    _parse_response; multi-profile items are attributed by owner.
+    """
+    wanted = {u.lower() for u in usernames}
+    only = usernames[0].lower() if len(usernames) == 1 else None
+    for item in items:
+        archive.add(item)
+        if not isinstance(item, dict):
+            continue
+        if "error" in item:
+            print(f"[instagram_scraper] Apify error object for @{_item_username(item)}:", item)
+            continue
+        owner = only or _item_username(item)
+        if owner not in wanted:
+            continue
+        post = _normalize_item(item)
+        if post is not None:
+            yield owner, post
+
+
+def iter_instagram_posts(
+    handles: List[str],
+    limit: int = 20,
+    newer_than: Optional[str] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming run-sync fetch: yield (username (lowercase), normalized post)
+    as items are parsed off the response body, instead of decoding the
+    whole body and building lists. Memory stays flat whatever the result
+    count; pair it with ingestion_service.upsert_posts_batched.
+
+    A non-2xx response or a body that isn't a JSON array is logged and
+    ends the stream (posts already yielded stand).
+    """
+    usernames = [h.lstrip("@") for h in handles]
+    payload = _build_payload(usernames, limit, newer_than)
+    print(f"[instagram_scraper] Streaming {len(usernames)} profiles (limit={limit} each)")
+
+    archive = RawArchiveWriter("instagram", usernames, "stream", _archive_request(payload))
+    try:
+        with httpx.stream(
+            "POST", _run_sync_url(), json=payload, timeout=deadline.timeout(APIFY_SYNC_TIMEOUT_SECONDS)
+        ) as resp:
+            if resp.status_code not in (200, 201):
+                resp.read()
+                _read_items(resp)  # logs status and body
+                return
+            try:
+                yield from _iter_normalized(iter_json_array(resp.iter_bytes()), usernames, archive)
+            except ValueError as e:
+                print(f"[instagram_scraper] Stream decode error: {e}")
+    finally:
+        archive.close()
+
+
+async def aiter_instagram_posts(
+    handles: List[str],
+    limit: int = 20,
+    client: Optional[httpx.AsyncClient] = None,
+    timeout: float = APIFY_SYNC_TIMEOUT_SECONDS,
+    newer_than: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Async version of iter_instagram_posts (one run-sync call, parsed as it streams)."""
+    if client is None:
+        async with httpx.AsyncClient() as own_client:
+            async for pair in aiter_instagram_posts(handles, limit, own_client, timeout, newer_than):
+                yield pair
+        return
+
+    usernames = [h.lstrip("@") for h in handles]
+    payload = _build_payload(usernames, limit, newer_than)
+    print(f"[instagram_scraper] Streaming {len(usernames)} profiles (limit={limit} each)")
+
+    archive = RawArchiveWriter("instagram", usernames, "stream", _archive_request(payload))
+    try:
+        async with client.stream(
+            "POST", _run_sync_url(), json=payload, timeout=deadline.timeout(timeout)
+        ) as resp:
+            if resp.status_code not in (200, 201):
+                await resp.aread()
+                _read_items(resp)
+                return
+            try:
+                async for item in aiter_json_array(resp.aiter_bytes()):
+                    for pair in _iter_normalized((item,), usernames, archive):
+                        yield pair
+            except ValueError as e:
+                print(f"[instagram_scraper] Stream decode error: {e}")
+    finally:
+        archive.close()
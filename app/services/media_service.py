@@ -0,0 +1,330 @@
+# app/services/media_service.py
+"""
+Download post media (posts_raw.media_urls) into the asa-media bucket
+before the Instagram CDN links expire.
+
+  - objects are content-addressed: media/<sha256[:2]>/<sha256>.<ext>, so
+    a repost of the same image is stored once (media_objects)
+  - every URL's outcome is remembered in media_downloads, keyed by the URL
+    without its (signed, changing) query string, so a URL is fetched once
+  - downloads run concurrently over one pooled httpx.AsyncClient, bodies
+    are hashed as they stream and spooled to disk past a few MB
+  - posts get media_keys (object keys, in media_urls order) once all of
+    their URLs are settled
+
+Links that are gone (403/404/410), aren't media (the permalink page in
+media_urls is HTML) or are larger than MEDIA_MAX_BYTES are settled right
+away; other failures, including storage and database errors while saving
+an object, are retried up to MAX_ATTEMPTS times on later passes.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import tempfile
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from psycopg2.extras import execute_values
+
+from app.config import (
+    get_media_bucket,
+    get_media_concurrency,
+    get_media_max_bytes,
+    get_media_timeout,
+)
+from app.db.connection import get_db_cursor
+from app.db.object_store import get_object_store
+
+MAX_ATTEMPTS = 3
+SPOOL_BYTES = 4 * 1024 * 1024
+GONE_STATUSES = (403, 404, 410)
+
+_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+    "image/heic": "heic",
+    "video/mp4": "mp4",
+    "video/quicktime": "mov",
+}
+
+
+def url_key(url: str) -> str:
+    """A media URL without its query string and fragment (CDN signatures change)."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, "", ""))
+
+
+def object_key(sha256: str, content_type: Optional[str]) -> str:
+    ext = _EXTENSIONS.get((content_type or "").split(";")[0].strip().lower(), "bin")
+    return f"media/{sha256[:2]}/{sha256}.{ext}"
+
+
+def new_stats() -> Dict[str, Any]:
+    return {
+        "posts": 0,
+        "posts_completed": 0,
+        "urls": 0,
+        "urls_known": 0,
+        "downloaded": 0,
+        "deduped": 0,
+        "not_media": 0,
+        "gone": 0,
+        "too_large": 0,
+        "failed": 0,
+        "bytes": 0,
+        "elapsed_s": 0.0,
+    }
+
+
+def load_pending_posts(limit: int) -> List[Tuple[str, List[str]]]:
+    """(post id, media_urls) for the newest posts whose media isn't settled yet."""
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select id, media_urls
+            from posts_raw
+            where media_keys is null
+              and cardinality(media_urls) > 0
+            order by created_at desc
+            limit %s
+            """,
+            (limit,),
+        )
+        return [(str(r[0]), list(r[1])) for r in cur.fetchall()]
+
+
+def load_known(url_keys: List[str]) -> Dict[str, Tuple[str, Optional[str], int]]:
+    """{url_key: (status, object_key, attempts)} for URLs we've tried before."""
+    if not url_keys:
+        return {}
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            select d.url_key, d.status, o.object_key, d.attempts
+            from media_downloads d
+            left join media_objects o on o.sha256 = d.sha256
+            where d.url_key = any(%s)
+            """,
+            (url_keys,),
+        )
+        return {r[0]: (r[1], r[2], r[3]) for r in cur.fetchall()}
+
+
+def _known_objects(hashes: List[str]) -> Dict[str, str]:
+    if not hashes:
+        return {}
+    with get_db_cursor() as cur:
+        cur.execute("select sha256, object_key from media_objects where sha256 = any(%s)", (hashes,))
+        return {r[0]: r[1] for r in cur.fetchall()}
+
+
+def _store_object(sha256: str, key: str, body: Any, content_type: Optional[str], size: int) -> bool:
+    """
+    Upload `body` under `key` unless an object with this hash already
+    exists. Returns True if this call uploaded it.
+    """
+    if _known_objects([sha256]):
+        return False
+    body.seek(0)
+    get_object_store(get_media_bucket()).put_file(key, body, content_type=content_type)
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            insert into media_objects (sha256, object_key, content_type, bytes)
+            values (%s, %s, %s, %s)
+            on conflict (sha256) do nothing
+            """,
+            (sha256, key, content_type, size),
+        )
+    return True
+
+
+async def _download(
+    client: httpx.AsyncClient,
+    url: str,
+    max_bytes: int,
+) -> Dict[str, Any]:
+    """
+    Fetch one URL, hashing and spooling the body as it streams. Returns
+    {status, sha256?, object_key?, content_type?, bytes, error?, uploaded}.
+    """
+    try:
+        async with client.stream("GET", url) as resp:
+            if resp.status_code in GONE_STATUSES:
+                return {"status": "gone", "bytes": 0, "error": f"HTTP {resp.status_code}"}
+            if resp.status_code != 200:
+                return {"status": "failed", "bytes": 0, "error": f"HTTP {resp.status_code}"}
+
+            content_type = resp.headers.get("content-type", "").split(";")[0].strip().lower()
+            if not content_type.startswith(("image/", "video/")):
+                return {"status": "not_media", "bytes": 0, "error": content_type or "no content-type"}
+
+            digest = hashlib.sha256()
+            size = 0
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as body:
+                async for chunk in resp.aiter_bytes():
+                    size += len(chunk)
+                    if size > max_bytes:
+                        return {"status": "too_large", "bytes": 0, "error": f"larger than {max_bytes} bytes"}
+                    digest.update(chunk)
+                    body.write(chunk)
+
+                sha256 = digest.hexdigest()
+                key = object_key(sha256, content_type)
+                try:
+                    uploaded = await asyncio.to_thread(_store_object, sha256, key, body, content_type, size)
+                except Exception as e:
+                    # storage or database trouble: fail this URL, not the pass
+                    return {"status": "failed", "bytes": 0, "error": f"store: {type(e).__name__}: {e}"}
+    except httpx.HTTPError as e:
+        return {"status": "failed", "bytes": 0, "error": f"{type(e).__name__}: {e}"}
+
+    return {
+        "status": "ok",
+        "sha256": sha256,
+        "object_key": key,
+        "content_type": content_type,
+        "bytes": size,
+        "uploaded": uploaded,
+    }
+
+
+def _record_downloads(results: Dict[str, Tuple[str, Dict[str, Any]]]) -> None:
+    """Upsert media_downloads rows for this pass's results ({url_key: (url, result)})."""
+    if not results:
+        return
+    rows = [
+        (key, url, result["status"], result.get("sha256"), result.get("error"))
+        for key, (url, result) in results.items()
+    ]
+    with get_db_cursor() as cur:
+        execute_values(
+            cur,
+            """
+            insert into media_downloads (url_key, url, status, sha256, error)
+            values %s
+            on conflict (url_key) do update
+            set url = excluded.url,
+                status = excluded.status,
+                sha256 = excluded.sha256,
+                error = excluded.error,
+                attempts = media_downloads.attempts + 1,
+                fetched_at = now()
+            """,
+            rows,
+            template="(%s, %s, %s, %s, %s)",
+        )
+
+
+def _settle_posts(updates: List[Tuple[str, List[str]]]) -> None:
+    if not updates:
+        return
+    with get_db_cursor() as cur:
+        execute_values(
+            cur,
+            """
+            update posts_raw p
+            set media_keys = v.keys
+            from (values %s) as v(id, keys)
+            where p.id = v.id
+            """,
+            updates,
+            template="(%s::uuid, %s::text[])",
+        )
+
+
+async def download_pending_media(
+    max_posts: int = 200,
+    concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    One pass: download the media of up to `max_posts` unsettled posts and
+    settle them. Returns counters (see format_summary).
+    """
+    if concurrency is None:
+        concurrency = get_media_concurrency()
+    stats = new_stats()
+    started = time.monotonic()
+
+    posts = await asyncio.to_thread(load_pending_posts, max_posts)
+    stats["posts"] = len(posts)
+    urls: Dict[str, str] = {}
+    for _, media_urls in posts:
+        for url in media_urls:
+            urls.setdefault(url_key(url), url)
+    stats["urls"] = len(urls)
+
+    known = await asyncio.to_thread(load_known, list(urls))
+    todo = [
+        (key, url) for key, url in urls.items()
+        if key not in known or (known[key][0] == "failed" and known[key][2] < MAX_ATTEMPTS)
+    ]
+    stats["urls_known"] = len(urls) - len(todo)
+
+    results: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    max_bytes = get_media_max_bytes()
+
+    async with httpx.AsyncClient(
+        limits=limits, timeout=get_media_timeout(), follow_redirects=True
+    ) as client:
+
+        async def fetch(key: str, url: str) -> None:
+            async with semaphore:
+                result = await _download(client, url, max_bytes)
+            results[key] = (url, result)
+            status = result["status"]
+            if status == "ok":
+                stats["bytes"] += result["bytes"]
+                stats["downloaded" if result["uploaded"] else "deduped"] += 1
+            else:
+                stats[status] += 1
+                if status == "failed":
+                    print(f"[media_service] {url[:80]}: {result['error']}")
+
+        await asyncio.gather(*(fetch(key, url) for key, url in todo))
+
+    await asyncio.to_thread(_record_downloads, results)
+
+    # what every URL resolves to now: an object key, None (settled without
+    # one) or missing (retry on a later pass)
+    resolved: Dict[str, Optional[str]] = {}
+    for key, (status, obj_key, attempts) in known.items():
+        if status != "failed" or attempts >= MAX_ATTEMPTS:
+            resolved[key] = obj_key
+    for key, (_, result) in results.items():
+        attempts = (known[key][2] if key in known else 0) + 1
+        if result["status"] != "failed" or attempts >= MAX_ATTEMPTS:
+            resolved[key] = result.get("object_key")
+
+    updates: List[Tuple[str, List[str]]] = []
+    for post_id, media_urls in posts:
+        keys = [url_key(url) for url in media_urls]
+        if all(k in resolved for k in keys):
+            updates.append((post_id, [resolved[k] for k in keys if resolved[k]]))
+    await asyncio.to_thread(_settle_posts, updates)
+    stats["posts_completed"] = len(updates)
+
+    stats["elapsed_s"] = time.monotonic() - started
+    return stats
+
+
+def format_summary(stats: Dict[str, Any]) -> str:
+    """Human-readable throughput summary for a media pass."""
+    elapsed = max(stats["elapsed_s"], 1e-9)
+    fetched = stats["downloaded"] + stats["deduped"]
+    lines = [
+        f"Posts:      {stats['posts_completed']}/{stats['posts']} settled",
+        f"URLs:       {stats['urls']} unique, {stats['urls_known']} already handled",
+        f"Fetched:    {fetched} ({stats['downloaded']} new objects, {stats['deduped']} duplicates of stored media)",
+        f"Skipped:    {stats['not_media']} not media, {stats['gone']} expired, "
+        f"{stats['too_large']} too large, {stats['failed']} failed",
+        f"Elapsed:    {stats['elapsed_s']:.1f}s",
+        f"Throughput: {fetched / elapsed:.1f} files/s, {stats['bytes'] / elapsed / 1024 / 1024:.2f} MB/s",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,205 @@
+# app/services/raw_archive.py
+"""
+Archive of raw Apify responses, so a normalization fix can be replayed
+over past scrapes (app/cli/replay_raw_archive.py) instead of re-scraping.
+
+Every response is one gzip-compressed JSONL object in RAW_ARCHIVE_BUCKET
+(asa-exports):
+
+  {platform}/raw/YYYY/MM/DD/HHMMSS.ffffff-{mode}-{id}.jsonl.gz
+
+The first line is a header {"_archive": {platform, usernames, mode,
+fetched_at, request}}; every following line is one raw item, untouched.
+
+Writes happen on a background thread so scraping never waits on storage,
+and a failed write is logged, never raised. Streamed responses go through
+RawArchiveWriter, which compresses items into a temp file as they arrive.
+"""
+
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import gzip
+import io
+import json
+import tempfile
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from app.config import get_raw_archive_bucket, get_raw_archive_enabled
+from app.db.object_store import get_object_store
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="raw-archive")
+
+
+def archive_prefix(platform: str, day: Optional[str] = None) -> str:
+    """Key prefix for a platform's archives, optionally one day (YYYY-MM-DD)."""
+    prefix = f"{platform}/raw/"
+    if day:
+        prefix += day.replace("-", "/") + "/"
+    return prefix
+
+
+def archive_key(platform: str, mode: str, fetched_at: datetime) -> str:
+    return (
+        f"{archive_prefix(platform)}{fetched_at:%Y/%m/%d/%H%M%S.%f}"
+        f"-{mode}-{uuid.uuid4().hex[:8]}{ARCHIVE_SUFFIX}"
+    )
+
+
+def encode_archive(header: Dict[str, Any], items: List[Any]) -> bytes:
+    """Header line + one line per item, gzip-compressed."""
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6) as gz:
+        gz.write(json.dumps({"_archive": header}, ensure_ascii=False).encode("utf-8"))
+        gz.write(b"\n")
+        for item in items:
+            gz.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            gz.write(b"\n")
+    return buf.getvalue()
+
+
+def _archive_header(
+    platform: str,
+    usernames: List[str],
+    mode: str,
+    fetched_at: datetime,
+    request: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    return {
+        "platform": platform,
+        "usernames": usernames,
+        "mode": mode,
+        "fetched_at": fetched_at.isoformat(),
+        "request": request or {},
+    }
+
+
+def write_archive(
+    platform: str,
+    usernames: List[str],
+    items: List[Any],
+    mode: str,
+    request: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Store one raw response now. Returns its key."""
+    fetched_at = datetime.now(timezone.utc)
+    header = dict(_archive_header(platform, usernames, mode, fetched_at, request), items=len(items))
+    key = archive_key(platform, mode, fetched_at)
+    get_object_store(get_raw_archive_bucket()).put(
+        key, encode_archive(header, items), content_type="application/x-ndjson"
+    )
+    return key
+
+
+def _log_failure(future: Future) -> None:
+    error = future.exception()
+    if error is not None:
+        print(f"[raw_archive] Could not archive raw response: {error}")
+
+
+def archive_raw_items(
+    platform: str,
+    usernames: List[str],
+    items: List[Any],
+    mode: str,
+    request: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Queue a raw response for archiving (no-op if RAW_ARCHIVE_ENABLED is
+    off). Returns immediately; the caller must not mutate `items` after.
+    """
+    if not get_raw_archive_enabled() or not items:
+        return
+    future = _executor.submit(write_archive, platform, list(usernames), items, mode, request)
+    future.add_done_callback(_log_failure)
+
+
+class RawArchiveWriter:
+    """
+    Archive a response item by item, for streamed responses: items are
+    gzip-compressed into an anonymous temp file (not memory) and uploaded
+    on close(). A no-op when RAW_ARCHIVE_ENABLED is off.
+
+      writer = RawArchiveWriter("instagram", usernames, "stream", request)
+      for item in items:
+          writer.add(item)
+      writer.close()
+    """
+
+    def __init__(
+        self,
+        platform: str,
+        usernames: List[str],
+        mode: str,
+        request: Optional[Dict[str, Any]] = None,
+    ):
+        self.count = 0
+        self._file = None
+        self._gz = None
+        if not get_raw_archive_enabled():
+            return
+
+        self._fetched_at = datetime.now(timezone.utc)
+        self._key = archive_key(platform, mode, self._fetched_at)
+        self._file = tempfile.TemporaryFile()
+        self._gz = gzip.GzipFile(fileobj=self._file, mode="wb", compresslevel=6)
+        header = _archive_header(platform, list(usernames), mode, self._fetched_at, request)
+        self._gz.write(json.dumps({"_archive": header}, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def add(self, item: Any) -> None:
+        if self._gz is None:
+            return
+        self._gz.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        self.count += 1
+
+    def close(self) -> None:
+        """Finish the archive and queue its upload (skipped if nothing was added)."""
+        if self._gz is None:
+            return
+        gz, f = self._gz, self._file
+        self._gz = self._file = None
+        gz.close()
+        if not self.count:
+            f.close()
+            return
+
+        def upload() -> str:
+            try:
+                f.seek(0)
+                get_object_store(get_raw_archive_bucket()).put_file(
+                    self._key, f, content_type="application/x-ndjson"
+                )
+                return self._key
+            finally:
+                f.close()
+
+        _executor.submit(upload).add_done_callback(_log_failure)
+
+    def abort(self) -> None:
+        """Drop the archive (e.g. the response turned out to be an error)."""
+        if self._gz is not None:
+            self._gz.close()
+            self._file.close()
+            self._gz = self._file = None
+
+
+def read_archive(stream: BinaryIO) -> Tuple[Dict[str, Any], Iterator[Any]]:
+    """
+    Open an archive stream: returns (header, items iterator). Items are
+    decoded one line at a time, so big archives never sit in memory whole.
+    """
+    gz = gzip.GzipFile(fileobj=stream, mode="rb")
+    first = gz.readline()
+    if not first:
+        return {}, iter(())
+    header = json.loads(first).get("_archive") or {}
+
+    def items() -> Iterator[Any]:
+        with gz:
+            for line in gz:
+                if line.strip():
+                    yield json.loads(line)
+
+    return header, items()
@@ -3,6 +3,7 @@
 from typing import Optional, List, Dict, Any
 
 from app.db.connection import get_db_cursor
+from app.services import handle_index
 
 
 def create_source(
@@ -14,7 +15,20 @@ def create_source(
     """
     Insert a new row into the sources table, or return the existing id
     if a row with the same (platform, handle) already exists.
+
+    Keeps the handle index (see handle_index) in sync.
     """
+    source_id = _insert_source(platform, handle, is_competitor, fetch_schedule)
+    handle_index.add_handle(platform, handle)
+    return source_id
+
+
+def _insert_source(
+    platform: str,
+    handle: str,
+    is_competitor: bool,
+    fetch_schedule: str,
+) -> str:
     with get_db_cursor() as cur:
         # Check if it already exists
         cur.execute(
@@ -39,6 +53,17 @@ def create_source(
             (platform, handle, is_competitor, fetch_schedule),
         )
         source_id = cur.fetchone()[0]
+
+        # Now tracked: stop suggesting it (precomputed suggestions are
+        # read without filtering, see discovery_service.load_suggestions)
+        cur.execute(
+            """
+            delete from discovery_suggestions
+            where lower(platform) = lower(%s)
+              and lower(ltrim(trim(handle), '@')) = %s
+            """,
+            (platform, handle_index.normalize_handle(handle)),
+        )
         return str(source_id)
 
 
@@ -77,15 +102,31 @@ def delete_source(source_id: str) -> Optional[str]:
     """
     with get_db_cursor() as cur:
         # Check if source exists
-        cur.execute("SELECT handle FROM sources WHERE id = %s", (source_id,))
+        cur.execute("SELECT platform, handle FROM sources WHERE id = %s", (source_id,))
         row = cur.fetchone()
         
         if not row:
             return None
         
-        handle = row[0]
+        platform, handle = row
         
         # Delete source (cascade will delete posts)
         cur.execute("DELETE FROM sources WHERE id = %s", (source_id,))
-        
-        return handle
\ No newline at end of file
+
+    # Only after the delete has committed
+    handle_index.remove_handle(platform, handle)
+    return handle
+
+def mark_crawled(source_id: str) -> None:
+    """
+    Record that a source was just crawled (sources.last_crawl_at).
+    """
+    with get_db_cursor() as cur:
+        cur.execute(
+            """
+            update sources
+            set last_crawl_at = now()
+            where id = %s
+            """,
+            (source_id,),
+        )
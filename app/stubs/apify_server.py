@@ -0,0 +1,201 @@
+# app/stubs/apify_server.py
+"""
+Local stub of the bits of the Apify API we use, for offline runs and
+crawler benchmarks.
+
+Implements:
+  - POST /v2/acts/{actor}/run-sync-get-dataset-items   (blocks, returns items)
+  - POST /v2/acts/{actor}/runs                         (start an async run)
+  - GET  /v2/actor-runs/{id}                           (poll a run)
+  - POST /v2/actor-runs/{id}/abort
+  - GET  /v2/datasets/{id}/items?offset=&limit=        (page a dataset)
+
+The input is read like apify~instagram-scraper's: every entry in directUrls
+is a profile and gets resultsLimit posts, newest first (only those after
+onlyPostsNewerThan, when given). Each fake profile
+posts once every STUB_APIFY_POST_INTERVAL_SECONDS (default 3600), so post
+IDs are stable between runs and new ones show up over time.
+
+A run takes STUB_APIFY_RUN_SECONDS (default 5) and fills its dataset
+gradually over that time. The same knobs can be changed at runtime with
+  GET/POST /stub/config   {"run_seconds": 2, "post_interval_seconds": 60, ...}
+
+Run it with:
+  uvicorn app.stubs.apify_server:app --port 8200
+
+and point the app at it:
+  APIFY_BASE_URL=http://localhost:8200 APIFY_TOKEN=stub
+"""
+
+from typing import Any, Dict, List
+import asyncio
+import hashlib
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, HTTPException
+
+app = FastAPI(title="FuelAI Apify stub", version="1.0.0")
+
+_runs: Dict[str, Dict[str, Any]] = {}
+_datasets: Dict[str, str] = {}  # dataset id -> run id
+
+_config: Dict[str, Any] = {
+    "run_seconds": float(os.getenv("STUB_APIFY_RUN_SECONDS", "5")),
+    "post_interval_seconds": float(os.getenv("STUB_APIFY_POST_INTERVAL_SECONDS", "3600")),
+    "error_rate": float(os.getenv("STUB_APIFY_ERROR_RATE", "0")),
+}
+
+_stats: Dict[str, int] = {"runs_started": 0, "sync_runs": 0, "item_pages": 0, "items_served": 0}
+
+
+def _username(url: str) -> str:
+    return url.split("instagram.com/", 1)[-1].strip("/").split("/")[0]
+
+
+def _post_item(username: str, url: str, n: int) -> Dict[str, Any]:
+    """The n-th post ever made by a fake profile (stable across runs)."""
+    posted = n * _config["post_interval_seconds"]
+    seed = random.Random(f"{username}:{n}")
+    return {
+        "id": str(int(hashlib.sha1(f"{username}:{n}".encode("utf-8")).hexdigest()[:15], 16)),
+        "shortCode": f"{username[:4]}{n:x}",
+        "ownerUsername": username,
+        "inputUrl": url,
+        "url": f"https://www.instagram.com/p/{username[:4]}{n:x}/",
+        "displayUrl": f"https://cdn.example.com/{username}/{n}.jpg",
+        "caption": f"Stub post {n} from @{username} #sales #outbound #stub",
+        "timestamp": datetime.fromtimestamp(posted, tz=timezone.utc).isoformat().replace("+00:00", "Z"),
+        "likesCount": seed.randint(10, 5000),
+        "commentsCount": seed.randint(0, 300),
+    }
+
+
+def _generate_items(run_input: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """All items a run over `run_input` produces, profile by profile."""
+    limit = int(run_input.get("resultsLimit") or 20)
+    latest = int(time.time() // _config["post_interval_seconds"])
+    items: List[Dict[str, Any]] = []
+    newer_than = run_input.get("onlyPostsNewerThan")
+    for url in run_input.get("directUrls") or []:
+        username = _username(url)
+        items.extend(_post_item(username, url, latest - i) for i in range(limit))
+    if newer_than:
+        cutoff = datetime.fromisoformat(str(newer_than).replace("Z", "+00:00"))
+        if cutoff.tzinfo is None:
+            cutoff = cutoff.replace(tzinfo=timezone.utc)
+        items = [
+            item for item in items
+            if datetime.fromisoformat(item["timestamp"].replace("Z", "+00:00")) > cutoff
+        ]
+    return items
+
+
+def _maybe_fail() -> None:
+    if _config["error_rate"] and random.random() < _config["error_rate"]:
+        raise HTTPException(status_code=500, detail="stub: injected Apify failure")
+
+
+def _refresh(run: Dict[str, Any]) -> Dict[str, Any]:
+    """Advance a run's status and visible item count based on elapsed time."""
+    if run["status"] in ("RUNNING", "READY"):
+        elapsed = time.time() - run["started_at"]
+        total = len(run["items"])
+        duration = max(_config["run_seconds"], 1e-6)
+        run["visible"] = total if elapsed >= duration else int(total * elapsed / duration)
+        if elapsed >= duration:
+            run["status"] = "SUCCEEDED"
+            run["finished_at"] = time.time()
+    return run
+
+
+def _run_view(run: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "data": {
+            "id": run["id"],
+            "actId": run["actor"],
+            "status": run["status"],
+            "defaultDatasetId": run["dataset_id"],
+            "startedAt": datetime.fromtimestamp(run["started_at"], tz=timezone.utc).isoformat(),
+            "finishedAt": (
+                datetime.fromtimestamp(run["finished_at"], tz=timezone.utc).isoformat()
+                if run.get("finished_at") else None
+            ),
+            "stats": {"itemCount": run["visible"]},
+        }
+    }
+
+
+@app.post("/v2/acts/{actor_id}/run-sync-get-dataset-items", status_code=201)
+async def run_sync(actor_id: str, body: Dict[str, Any]):
+    _maybe_fail()
+    _stats["sync_runs"] += 1
+    await asyncio.sleep(_config["run_seconds"])
+    return _generate_items(body)
+
+
+@app.post("/v2/acts/{actor_id}/runs", status_code=201)
+def start_run(actor_id: str, body: Dict[str, Any]):
+    _maybe_fail()
+    run_id = uuid.uuid4().hex[:17]
+    dataset_id = uuid.uuid4().hex[:17]
+    _runs[run_id] = {
+        "id": run_id,
+        "actor": actor_id,
+        "status": "RUNNING",
+        "dataset_id": dataset_id,
+        "started_at": time.time(),
+        "items": _generate_items(body),
+        "visible": 0,
+    }
+    _datasets[dataset_id] = run_id
+    _stats["runs_started"] += 1
+    return _run_view(_runs[run_id])
+
+
+@app.get("/v2/actor-runs/{run_id}")
+def get_run(run_id: str):
+    run = _runs.get(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="run not found")
+    return _run_view(_refresh(run))
+
+
+@app.post("/v2/actor-runs/{run_id}/abort")
+def abort_run(run_id: str):
+    run = _runs.get(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="run not found")
+    _refresh(run)
+    if run["status"] == "RUNNING":
+        run["status"] = "ABORTED"
+        run["finished_at"] = time.time()
+    return _run_view(run)
+
+
+@app.get("/v2/datasets/{dataset_id}/items")
+def dataset_items(dataset_id: str, offset: int = 0, limit: int = 1000):
+    run_id = _datasets.get(dataset_id)
+    if not run_id:
+        raise HTTPException(status_code=404, detail="dataset not found")
+    run = _refresh(_runs[run_id])
+    page = run["items"][offset:min(offset + limit, run["visible"])]
+    _stats["item_pages"] += 1
+    _stats["items_served"] += len(page)
+    return page
+
+
+@app.get("/stub/config")
+def get_config():
+    return {"config": _config, "stats": _stats, "runs": len(_runs)}
+
+
+@app.post("/stub/config")
+def update_config(body: Dict[str, Any]):
+    for key, value in body.items():
+        if key in _config:
+            _config[key] = type(_config[key])(value)
+    return get_config()
@@ -0,0 +1,365 @@
+# app/stubs/openai_server.py
+"""
+Local OpenAI-compatible stub server for offline runs and load tests.
+
+Implements just enough of:
+  - POST /v1/chat/completions       (templated JSON for drafting/discovery)
+  - POST /v1/embeddings             (deterministic hashed vectors)
+  - POST /v1/files                  (upload a batch input file)
+  - GET  /v1/files/{id}/content     (download batch output)
+  - POST /v1/batches                (create a batch)
+  - GET  /v1/batches/{id}           (poll a batch)
+  - POST /v1/batches/{id}/cancel
+
+Chat and embeddings calls can be slowed down and made to fail on purpose:
+  STUB_LATENCY_MS=800          mean added latency per call
+  STUB_LATENCY_JITTER_MS=200   +/- uniform jitter around the mean
+  STUB_ERROR_RATE=0.05         fraction of calls that fail
+  STUB_ERROR_STATUS=429        status for injected failures (429 adds Retry-After)
+
+The same knobs can be changed at runtime (mid load test) with
+  GET/POST /stub/config   {"latency_ms": 800, "error_rate": 0.05, ...}
+
+Batches "complete" after STUB_BATCH_DELAY_SECONDS (default 2s) with
+templated JSON answers that match the drafting schema. Everything lives in
+memory, so restarting the server forgets all files and batches.
+
+Run it with:
+  uvicorn app.stubs.openai_server:app --port 8100
+
+and point the app at it:
+  OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=stub
+"""
+
+from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+app = FastAPI(title="FuelAI OpenAI stub", version="1.0.0")
+
+EMBEDDING_DIM = 1536
+
+_files: Dict[str, Dict[str, Any]] = {}
+_file_contents: Dict[str, str] = {}
+_batches: Dict[str, Dict[str, Any]] = {}
+
+# Keep references to background batch tasks so they aren't garbage collected
+_batch_tasks: set = set()
+
+# Latency / error injection knobs, seeded from env and tweakable at runtime
+_config: Dict[str, Any] = {
+    "latency_ms": float(os.getenv("STUB_LATENCY_MS", "0")),
+    "latency_jitter_ms": float(os.getenv("STUB_LATENCY_JITTER_MS", "0")),
+    "error_rate": float(os.getenv("STUB_ERROR_RATE", "0")),
+    "error_status": int(os.getenv("STUB_ERROR_STATUS", "500")),
+}
+
+_stats: Dict[str, int] = {"chat": 0, "embeddings": 0, "injected_errors": 0}
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:24]}"
+
+
+def _store_file(content: str, filename: str, purpose: str) -> Dict[str, Any]:
+    file_id = _new_id("file")
+    obj = {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(content.encode("utf-8")),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed",
+    }
+    _files[file_id] = obj
+    _file_contents[file_id] = content
+    return obj
+
+
+def hashed_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """
+    Deterministic unit vector for `text`: the same input always maps to the
+    same vector, so semantic search results are stable across runs.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+def _draft_package_content(topic: str) -> str:
+    def section(platform: str, hashtags: List[str]) -> Dict[str, Any]:
+        return {
+            "hook": f"[stub] {platform} hook about {topic}",
+            "caption": f"[stub] {platform} caption about {topic}.",
+            "hashtags": hashtags,
+            "image_prompts": [f"[stub] image for {topic}"],
+            "style": "educational",
+        }
+
+    return json.dumps({
+        "core_theme": topic,
+        "core": {
+            "angle": f"[stub] angle on {topic}",
+            "summary": f"[stub] summary of {topic}",
+            "style": "educational",
+            "reasoning": "stub response",
+        },
+        "instagram": section("instagram", ["sales", "outbound"]),
+        "facebook": section("facebook", []),
+        "linkedin": section("linkedin", ["sales"]),
+    })
+
+
+STUB_ACCOUNT_TYPES = ("competitor", "inspiration", "adjacent", "meme", "viral")
+
+
+def _discovery_content(payload: Dict[str, Any]) -> str:
+    """
+    Accounts in the discovery agent's schema. Handles are derived from the
+    request so repeated calls return the same suggestions.
+    """
+    platforms = [payload["platform"]] if payload.get("platform") else ["instagram", "linkedin", "facebook"]
+    types = [payload["account_type"]] if payload.get("account_type") else list(STUB_ACCOUNT_TYPES)
+    count = int(payload.get("max_suggestions") or 15)
+
+    accounts = []
+    for i in range(count):
+        platform = platforms[i % len(platforms)]
+        acc_type = types[i % len(types)]
+        accounts.append({
+            "platform": platform,
+            "handle": f"stub_{platform}_{acc_type}_{i}",
+            "display_name": f"Stub {acc_type.title()} {i}",
+            "type": acc_type,
+            "reason": "[stub] talks about outbound and SDR life",
+            "voice_notes": "[stub] short punchy hooks",
+            "fit_score": 95 - (i % 30),
+        })
+    return json.dumps({"accounts": accounts})
+
+
+def _chat_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a chat.completion object for a request body.
+
+    The discovery agent's system prompt asks for an "accounts" list and
+    sends the brand payload as the user message; the drafting agent sends
+    {"topic": ...}. Anything else gets a drafting package.
+    """
+    messages = body.get("messages") or []
+    system_msg = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    user_msg = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "")
+    try:
+        payload = json.loads(user_msg)
+        if not isinstance(payload, dict):
+            payload = {}
+    except (json.JSONDecodeError, TypeError):
+        payload = {}
+
+    if '"accounts"' in system_msg:
+        content = _discovery_content(payload)
+    else:
+        content = _draft_package_content(payload.get("topic") or "stub topic")
+    return {
+        "id": _new_id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+async def _inject_latency_and_errors() -> Optional[JSONResponse]:
+    """
+    Sleep for the configured latency, then fail a configured fraction of
+    calls the way OpenAI does (JSON error body, Retry-After on 429).
+    Returns the error response to send, or None to carry on.
+    """
+    delay_ms = _config["latency_ms"]
+    jitter = _config["latency_jitter_ms"]
+    if jitter:
+        delay_ms += random.uniform(-jitter, jitter)
+    if delay_ms > 0:
+        await asyncio.sleep(delay_ms / 1000.0)
+
+    if _config["error_rate"] > 0 and random.random() < _config["error_rate"]:
+        _stats["injected_errors"] += 1
+        status = _config["error_status"]
+        headers = {"Retry-After": "1"} if status == 429 else None
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": "[stub] injected error", "type": "stub_error", "code": status}},
+            headers=headers,
+        )
+    return None
+
+
+async def _process_batch(batch_id: str) -> None:
+    batch = _batches[batch_id]
+    delay = float(os.getenv("STUB_BATCH_DELAY_SECONDS", "2"))
+
+    batch["status"] = "in_progress"
+    batch["in_progress_at"] = int(time.time())
+    await asyncio.sleep(delay)
+
+    if batch["status"] == "cancelling":
+        batch["status"] = "cancelled"
+        batch["cancelled_at"] = int(time.time())
+        return
+
+    output_lines = []
+    failed = 0
+    for raw in _file_contents.get(batch["input_file_id"], "").splitlines():
+        if not raw.strip():
+            continue
+        try:
+            req = json.loads(raw)
+            response = {
+                "status_code": 200,
+                "request_id": _new_id("req"),
+                "body": _chat_completion(req.get("body") or {}),
+            }
+            output_lines.append({
+                "id": _new_id("batch_req"),
+                "custom_id": req.get("custom_id"),
+                "response": response,
+                "error": None,
+            })
+        except json.JSONDecodeError:
+            failed += 1
+
+    output = _store_file(
+        "".join(json.dumps(line) + "\n" for line in output_lines),
+        f"{batch_id}_output.jsonl",
+        "batch_output",
+    )
+    batch["status"] = "completed"
+    batch["completed_at"] = int(time.time())
+    batch["output_file_id"] = output["id"]
+    batch["request_counts"] = {
+        "total": len(output_lines) + failed,
+        "completed": len(output_lines),
+        "failed": failed,
+    }
+
+
+@app.post("/v1/files")
+async def upload_file(file: UploadFile = File(...), purpose: str = Form(...)):
+    content = (await file.read()).decode("utf-8")
+    return _store_file(content, file.filename or "upload.jsonl", purpose)
+
+
+@app.get("/v1/files/{file_id}/content", response_class=PlainTextResponse)
+def file_content(file_id: str):
+    if file_id not in _file_contents:
+        raise HTTPException(status_code=404, detail="No such file")
+    return PlainTextResponse(_file_contents[file_id])
+
+
+@app.post("/v1/batches")
+async def create_batch(body: Dict[str, Any]):
+    input_file_id = body.get("input_file_id")
+    if input_file_id not in _files:
+        raise HTTPException(status_code=400, detail="Unknown input_file_id")
+
+    batch_id = _new_id("batch")
+    _batches[batch_id] = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": body.get("endpoint", "/v1/chat/completions"),
+        "errors": None,
+        "input_file_id": input_file_id,
+        "completion_window": body.get("completion_window", "24h"),
+        "status": "validating",
+        "output_file_id": None,
+        "error_file_id": None,
+        "created_at": int(time.time()),
+        "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        "metadata": body.get("metadata"),
+    }
+    task = asyncio.create_task(_process_batch(batch_id))
+    _batch_tasks.add(task)
+    task.add_done_callback(_batch_tasks.discard)
+    return _batches[batch_id]
+
+
+@app.get("/v1/batches/{batch_id}")
+def get_batch(batch_id: str):
+    if batch_id not in _batches:
+        raise HTTPException(status_code=404, detail="No such batch")
+    return _batches[batch_id]
+
+
+@app.post("/v1/batches/{batch_id}/cancel")
+def cancel_batch(batch_id: str):
+    if batch_id not in _batches:
+        raise HTTPException(status_code=404, detail="No such batch")
+    batch = _batches[batch_id]
+    if batch["status"] in ("validating", "in_progress"):
+        batch["status"] = "cancelling"
+    return batch
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    _stats["chat"] += 1
+    error = await _inject_latency_and_errors()
+    if error is not None:
+        return error
+    return _chat_completion(body)
+
+
+@app.post("/v1/embeddings")
+async def create_embeddings(body: Dict[str, Any]):
+    _stats["embeddings"] += 1
+    error = await _inject_latency_and_errors()
+    if error is not None:
+        return error
+    inputs = body.get("input")
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    data = [
+        {"object": "embedding", "index": i, "embedding": hashed_embedding(str(text))}
+        for i, text in enumerate(inputs or [])
+    ]
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.get("/stub/config")
+def get_config():
+    return {"config": _config, "stats": _stats}
+
+
+@app.post("/stub/config")
+def update_config(body: Dict[str, Any]):
+    """Change latency/error knobs without restarting (unknown keys are rejected)."""
+    unknown = set(body) - set(_config)
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"unknown keys: {sorted(unknown)}"})
+    for key, value in body.items():
+        _config[key] = type(_config[key])(value)
+    return {"config": _config}
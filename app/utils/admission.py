@@ -0,0 +1,201 @@
+# app/utils/admission.py
+"""
+Admission control for slow, LLM/scraper-backed routes.
+
+Each gated route gets a concurrency limit and a bounded wait queue:
+
+  - a free slot        -> the request runs
+  - all slots busy     -> it waits in the queue (FIFO)
+  - queue full         -> 429 right away
+  - waited too long    -> 503
+
+Both rejections carry Retry-After, so a burst on /discovery/suggestions
+can't tie up every threadpool worker and starve /health or the dashboard.
+
+Gates live in-process (per uvicorn worker). Their counters are exposed at
+/health/admission.
+"""
+
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import collections
+import math
+import re
+
+from starlette.responses import JSONResponse
+
+from app.config import get_admission_limits, get_admission_queue_timeout
+
+# name -> gate, for metrics
+_registry: Dict[str, "AdmissionGate"] = {}
+
+
+class AdmissionGate:
+    def __init__(
+        self,
+        name: str,
+        pattern: str,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        methods: Tuple[str, ...] = ("GET", "POST"),
+    ) -> None:
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.methods = methods
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+        _registry[name] = self
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and self.pattern.fullmatch(path) is not None
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for w in self._waiters if not w.done())
+
+    def retry_after(self) -> int:
+        """Rough guess: one queue timeout per 'round' of work ahead of us."""
+        rounds = (self.active + self.queued) / self.max_concurrent
+        return max(1, math.ceil(rounds * self.queue_timeout / 2))
+
+    async def acquire(self) -> Optional[int]:
+        """
+        Wait for a slot. Returns None when admitted, otherwise the HTTP
+        status to reject with (429 or 503).
+        """
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            return None
+
+        if self.queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            return 429
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # Handed a slot just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+            self.rejected_timeout += 1
+            return 503
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+        self.admitted += 1
+        return None
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the oldest live waiter."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+def default_gates() -> List[AdmissionGate]:
+    """Gates for the routes that hold a worker for seconds at a time."""
+    queue_timeout = get_admission_queue_timeout()
+
+    discovery_concurrency, discovery_queue = get_admission_limits("discovery", 4, 16)
+    fetch_concurrency, fetch_queue = get_admission_limits("fetch", 2, 4)
+
+    return [
+        AdmissionGate(
+            "discovery_suggestions",
+            r"/discovery/suggestions",
+            discovery_concurrency,
+            discovery_queue,
+            queue_timeout,
+            methods=("GET",),
+        ),
+        AdmissionGate(
+            "dashboard_fetch",
+            r"/dashboard/fetch/[^/]+",
+            fetch_concurrency,
+            fetch_queue,
+            queue_timeout,
+            methods=("POST",),
+        ),
+    ]
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware (no response buffering, works with streaming).
+
+        app.add_middleware(AdmissionControlMiddleware, gates=default_gates())
+    """
+
+    def __init__(self, app: Callable, gates: List[AdmissionGate]) -> None:
+        self.app = app
+        self.gates = gates
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        gate = next((g for g in self.gates if g.matches(scope["method"], scope["path"])), None)
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = await gate.acquire()
+        if status is not None:
+            detail = "Too many queued requests" if status == 429 else "Timed out waiting for capacity"
+            print(f"[admission] {gate.name}: {status} {detail} (active={gate.active} queued={gate.queued})")
+            response = JSONResponse(
+                {"detail": detail},
+                status_code=status,
+                headers={"Retry-After": str(gate.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+def admission_metrics() -> Dict[str, Dict[str, Any]]:
+    """Per-route queue depth, in-flight count and rejection counters."""
+    return {name: gate.metrics() for name, gate in _registry.items()}
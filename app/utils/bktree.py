@@ -0,0 +1,82 @@
+# app/utils/bktree.py
+"""
+BK-tree: nearest-neighbour lookups under an integer metric, here Hamming
+distance between 64-bit perceptual hashes.
+
+  tree = BKTree()
+  for h in hashes:
+      tree.add(h)
+  tree.search(h, 6)  # [(distance, hash), ...] within 6 bits, closest first
+
+A search only descends into children whose edge distance d satisfies
+|d - distance(query, node)| <= max_distance (triangle inequality), so a
+small radius visits a small fraction of the tree instead of every hash.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two non-negative ints."""
+    return bin(a ^ b).count("1")
+
+
+class _Node:
+    __slots__ = ("key", "children")
+
+    def __init__(self, key: Any):
+        self.key = key
+        self.children: Dict[int, "_Node"] = {}
+
+
+class BKTree:
+    """A BK-tree of distinct keys. Not thread-safe for concurrent add()."""
+
+    def __init__(self, keys: Iterable[Any] = (), distance: Callable[[Any, Any], int] = hamming):
+        self._distance = distance
+        self._root = None
+        self._size = 0
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, key: Any) -> bool:
+        """Insert `key`. Returns False if it was already in the tree."""
+        if self._root is None:
+            self._root = _Node(key)
+            self._size = 1
+            return True
+
+        node = self._root
+        while True:
+            d = self._distance(key, node.key)
+            if d == 0:
+                return False
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = _Node(key)
+                self._size += 1
+                return True
+            node = child
+
+    def search(self, key: Any, max_distance: int) -> List[Tuple[int, Any]]:
+        """All keys within `max_distance` of `key`, as (distance, key), closest first."""
+        found: List[Tuple[int, Any]] = []
+        if self._root is None:
+            return found
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = self._distance(key, node.key)
+            if d <= max_distance:
+                found.append((d, node.key))
+            lo, hi = d - max_distance, d + max_distance
+            for edge, child in node.children.items():
+                if lo <= edge <= hi:
+                    stack.append(child)
+
+        found.sort(key=lambda pair: pair[0])
+        return found
@@ -0,0 +1,181 @@
+# app/utils/cassette.py
+"""
+Record/replay harness for external calls (Apify, OpenAI).
+
+Wrap a function with @cassette("name") and control it with env vars:
+
+  CASSETTE_MODE=record   call through for real and append every
+                         request/response pair to <CASSETTE_DIR>/<name>.jsonl
+  CASSETTE_MODE=replay   never touch the network; answer from the cassette
+                         (raises CassetteMiss for unrecorded requests)
+  CASSETTE_MODE=off      default, no-op
+
+  CASSETTE_LATENCY_MS=250        sleep 250ms per replayed call
+  CASSETTE_LATENCY_MS=recorded   sleep as long as the real call took
+
+The request key is a hash of the function's bound arguments, so the same
+call (same handle/limit, same query text, same brand payload...) always
+maps to the same recorded response. Works on sync and async functions.
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.config import get_cassette_dir, get_cassette_latency, get_cassette_mode
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+_write_lock = threading.Lock()
+
+# path -> (mtime, {key: entry})
+_loaded: Dict[str, Any] = {}
+
+
+def cassette_path(name: str) -> str:
+    return os.path.join(get_cassette_dir(), f"{name}.jsonl")
+
+
+def _bound_request(fn: Callable, args: tuple, kwargs: dict, ignore: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    Normalize a call to {param_name: value}, defaults included, so
+    f("nasa") and f(handle="nasa", limit=20) share a key. Parameters in
+    `ignore` (HTTP clients, timeouts...) don't change the answer and are left out.
+    """
+    bound = inspect.signature(fn).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {k: v for k, v in bound.arguments.items() if k not in ignore}
+    return json.loads(json.dumps(arguments, sort_keys=True, default=str))
+
+
+def request_key(name: str, request: Dict[str, Any]) -> str:
+    payload = json.dumps({"name": name, "request": request}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_cassette(name: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Return {key: entry} for a cassette, re-reading the file only if it
+    changed on disk. Later recordings of the same key win.
+    """
+    path = cassette_path(name)
+    if not os.path.exists(path):
+        return {}
+
+    mtime = os.path.getmtime(path)
+    cached = _loaded.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["key"]] = entry
+
+    _loaded[path] = (mtime, entries)
+    return entries
+
+
+def _record(name: str, key: str, request: Dict[str, Any], response: Any, elapsed_ms: float) -> None:
+    entry = {
+        "key": key,
+        "name": name,
+        "request": request,
+        "response": response,
+        "elapsed_ms": round(elapsed_ms, 1),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+    }
+    line = json.dumps(entry, default=str)
+
+    path = cassette_path(name)
+    with _write_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _lookup(name: str, key: str) -> Dict[str, Any]:
+    entry = load_cassette(name).get(key)
+    if entry is None:
+        raise CassetteMiss(f"No recording for {name} (key {key[:12]}) in {cassette_path(name)}")
+    return entry
+
+
+def _replay_delay(entry: Dict[str, Any]) -> float:
+    """Seconds to sleep before returning a replayed response."""
+    setting = get_cassette_latency()
+    if setting == "recorded":
+        return float(entry.get("elapsed_ms") or 0) / 1000.0
+    try:
+        return max(0.0, float(setting)) / 1000.0
+    except ValueError:
+        return 0.0
+
+
+def cassette(name: Optional[str] = None, ignore: Tuple[str, ...] = ()):
+    """
+    Decorator that records/replays calls to the wrapped function.
+    Responses must be JSON-serializable (they are for everything we wrap).
+    Arguments named in `ignore` are not part of the request key.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        cassette_name = name or fn.__name__
+
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                mode = get_cassette_mode()
+                if mode == "off":
+                    return await fn(*args, **kwargs)
+
+                request = _bound_request(fn, args, kwargs, ignore)
+                key = request_key(cassette_name, request)
+
+                if mode == "replay":
+                    entry = _lookup(cassette_name, key)
+                    await asyncio.sleep(_replay_delay(entry))
+                    return entry["response"]
+
+                started = time.monotonic()
+                result = await fn(*args, **kwargs)
+                _record(cassette_name, key, request, result, (time.monotonic() - started) * 1000)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            mode = get_cassette_mode()
+            if mode == "off":
+                return fn(*args, **kwargs)
+
+            request = _bound_request(fn, args, kwargs, ignore)
+            key = request_key(cassette_name, request)
+
+            if mode == "replay":
+                entry = _lookup(cassette_name, key)
+                time.sleep(_replay_delay(entry))
+                return entry["response"]
+
+            started = time.monotonic()
+            result = fn(*args, **kwargs)
+            _record(cassette_name, key, request, result, (time.monotonic() - started) * 1000)
+            return result
+
+        return wrapper
+
+    return decorator
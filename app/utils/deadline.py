@@ -0,0 +1,154 @@
+# app/utils/deadline.py
+"""
+Request-scoped deadlines and cancellation.
+
+A deadline is set once per request (run_cancellable) and lives in a
+contextvar, so it follows the work into tasks and threads started from that
+request. Code that calls out to OpenAI/Apify asks `timeout(cap)` for its
+HTTP timeout instead of hard-coding one, so nothing outlives the request.
+
+If the client disconnects, run_cancellable cancels the request's task.
+Async work (httpx/AsyncOpenAI calls) stops right away. Sync work running in
+a thread via `to_thread` can't be interrupted, but its scope is marked
+cancelled, and `check()` between steps (and `timeout()` before each call)
+raises DeadlineExceeded, so it stops at the next step.
+"""
+
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+from contextlib import contextmanager
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+
+from fastapi import HTTPException, Request
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed, or its client went away."""
+
+
+class Deadline:
+    def __init__(self, expires_at: Optional[float], parent: Optional["Deadline"] = None) -> None:
+        if parent is not None and parent.expires_at is not None:
+            expires_at = parent.expires_at if expires_at is None else min(expires_at, parent.expires_at)
+        self.expires_at = expires_at
+        self.parent = parent
+        self.cancelled = threading.Event()
+
+    def is_cancelled(self) -> bool:
+        scope: Optional[Deadline] = self
+        while scope is not None:
+            if scope.cancelled.is_set():
+                return True
+            scope = scope.parent
+        return False
+
+    def remaining(self) -> Optional[float]:
+        if self.is_cancelled():
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Deadline]:
+    """
+    Run a block under a deadline `seconds` from now. Nested scopes can only
+    tighten the outer deadline, never extend it.
+    """
+    expires_at = None if seconds is None else time.monotonic() + seconds
+    scope = Deadline(expires_at, parent=_current.get())
+    token = _current.set(scope)
+    try:
+        yield scope
+    finally:
+        _current.reset(token)
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the current deadline, or `default` if none is set."""
+    scope = _current.get()
+    left = scope.remaining() if scope is not None else None
+    return default if left is None else left
+
+
+def check() -> None:
+    """Raise DeadlineExceeded if the deadline passed or the request was cancelled."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("request deadline exceeded or cancelled")
+
+
+def timeout(cap: float) -> float:
+    """
+    HTTP timeout for an outbound call: `cap`, or less if the request's
+    deadline is closer. Raises DeadlineExceeded if there's no time left.
+    """
+    check()
+    left = remaining()
+    return cap if left is None else min(cap, left)
+
+
+async def to_thread(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    asyncio.to_thread, but cancelling the awaiting task also marks the
+    thread's deadline scope cancelled, so the sync work bails out at its
+    next check()/timeout() instead of running to completion.
+    """
+    scope = Deadline(None, parent=_current.get())
+    ctx = contextvars.copy_context()
+    ctx.run(_current.set, scope)
+    try:
+        return await asyncio.to_thread(ctx.run, functools.partial(fn, *args, **kwargs))
+    except asyncio.CancelledError:
+        scope.cancelled.set()
+        raise
+
+
+async def run_cancellable(
+    request: Request,
+    fn: Callable[[], Awaitable[T]],
+    seconds: Optional[float] = None,
+    poll_interval: float = 0.25,
+) -> T:
+    """
+    Run `fn()` as its own task under a `seconds` deadline, watching the
+    client connection. If the client disconnects the task is cancelled and
+    we answer 499; if the deadline passes first, 504.
+    """
+    with deadline_scope(seconds) as scope:
+        task = asyncio.ensure_future(fn())
+
+    async def _stop(status: int, detail: str):
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        raise HTTPException(status_code=status, detail=detail)
+
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                try:
+                    return task.result()
+                except DeadlineExceeded:
+                    raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
+            if await request.is_disconnected():
+                print(f"[deadline] Client disconnected from {request.url.path}, cancelling work")
+                await _stop(499, "Client closed request")
+
+            left = scope.remaining()
+            if left is not None and left <= 0:
+                print(f"[deadline] Deadline exceeded for {request.url.path}, cancelling work")
+                await _stop(504, "Request deadline exceeded")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
@@ -0,0 +1,118 @@
+# app/utils/json_stream.py
+"""
+Incremental parsing of a top-level JSON array from a byte stream.
+
+  for item in iter_json_array(resp.iter_bytes()):
+      ...
+
+Only the current element (plus one network chunk) is held in memory, so
+a 100 MB dataset response costs about as much as its largest item instead
+of the raw body + the decoded list. Each element is decoded with the
+stdlib decoder (JSONDecoder.raw_decode), so values are exactly what
+json.loads would give.
+"""
+
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List
+import codecs
+import json
+
+_WHITESPACE = " \t\n\r"
+
+
+class _ArrayParser:
+    """
+    Push-style parser: feed() text, then take complete elements with
+    next_items(). Raises ValueError if the document isn't a JSON array.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+
+    def feed(self, chunk: bytes, final: bool = False) -> None:
+        text = self._utf8.decode(chunk, final=final)
+        if self._pos:
+            # drop what's been parsed so the buffer stays ~one element long
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        self._buf += text
+
+    def _skip(self, chars: str) -> None:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in chars:
+            pos += 1
+        self._pos = pos
+
+    def next_items(self, eof: bool = False) -> List[Any]:
+        items: List[Any] = []
+        while not self._done:
+            self._skip(_WHITESPACE)
+            if self._pos >= len(self._buf):
+                break
+
+            if not self._started:
+                if self._buf[self._pos] != "[":
+                    raise ValueError(f"expected a JSON array, got {self._buf[self._pos:self._pos + 40]!r}")
+                self._started = True
+                self._pos += 1
+                continue
+
+            self._skip(_WHITESPACE + ",")
+            if self._pos >= len(self._buf):
+                break
+            if self._buf[self._pos] == "]":
+                self._pos += 1
+                self._done = True
+                break
+
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                break  # element continues in the next chunk
+
+            if not eof and not isinstance(value, (dict, list, str)):
+                # a number/literal is only complete once a delimiter follows
+                # ("-3" may still become "-3e4")
+                if end >= len(self._buf) or self._buf[end] not in _WHITESPACE + ",]":
+                    break
+
+            items.append(value)
+            self._pos = end
+
+        if eof and not self._done:
+            if not self._started:
+                raise ValueError("empty response, expected a JSON array")
+            raise ValueError("JSON array not terminated")
+        return items
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Yield the elements of a JSON array read from an iterable of byte chunks."""
+    parser = _ArrayParser()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        yield from parser.next_items()
+    parser.feed(b"", final=True)
+    yield from parser.next_items(eof=True)
+
+
+async def aiter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """Async version of iter_json_array, e.g. over httpx's resp.aiter_bytes()."""
+    parser = _ArrayParser()
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        for item in parser.next_items():
+            yield item
+    parser.feed(b"", final=True)
+    for item in parser.next_items(eof=True):
+        yield item
@@ -0,0 +1,424 @@
+# app/utils/singleflight.py
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same expensive thing at the same time
+(teammates opening the discovery page together, browser retries...), only
+one of them does the work and everyone gets the same result.
+
+Two layers:
+  - in-process: callers in the same worker share one asyncio future (async
+    code) or one concurrent.futures.Future (sync code running in threads)
+  - cross-worker: the in-process leader takes a Redis lock
+    (sf:lock:<key>); leaders in other workers see the lock and wait for the
+    result key (sf:result:<key>) instead of redoing the work
+
+If Redis is unavailable the cross-worker layer is skipped (and not retried
+for REDIS_RETRY_SECONDS, so callers don't each wait on a connect timeout).
+If a remote leader dies or fails, its lock disappears and a waiter runs
+the work itself.
+
+Cheap, hot work (semantic search) uses coalesce(local=True): in-process
+only, no Redis round trips at all.
+
+For long work (crawls), SingleFlight(heartbeat=True) keeps the lock short
+and renews it every lock_seconds / 3 while the leader is alive: a dead
+leader's lease expires within lock_seconds, a live one never does, and
+waiters wait for as long as the lease is held. try_lease() takes such a
+lease directly, for callers that do the work themselves (the batch
+crawler) and publish a result per key.
+
+Results must be JSON-serializable to be shared across workers.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+import uuid
+
+import redis
+
+from app.config import get_singleflight_lock_seconds, get_singleflight_result_seconds
+from app.db.redis_client import get_redis_client
+
+LOCK_PREFIX = "sf:lock:"
+RESULT_PREFIX = "sf:result:"
+
+# After a Redis error, coalesce in-process only for this long
+REDIS_RETRY_SECONDS = 5.0
+_redis_down_until = 0.0
+
+# Take the lock and drop the previous flight's result in one step, so a
+# follower of this flight can never pick up that stale result
+_ACQUIRE_SCRIPT = """
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+  redis.call('del', KEYS[2])
+  return 1
+end
+return 0
+"""
+
+# Delete the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Extend the lock only if we still own it
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_MISSING = object()
+
+
+def fingerprint(name: str, *parts: Any) -> str:
+    """Stable key for a request: name + hash of its JSON-able inputs."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return f"{name}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+# --- cross-worker (Redis) helpers; all sync, async code calls them in a thread ---
+
+def _try_lock(key: str, token: str, seconds: Optional[int] = None) -> Optional[bool]:
+    """True = we lead, False = someone else leads, None = Redis unavailable."""
+    global _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return None
+    try:
+        return bool(get_redis_client().eval(
+            _ACQUIRE_SCRIPT, 2, LOCK_PREFIX + key, RESULT_PREFIX + key,
+            token, seconds or get_singleflight_lock_seconds(),
+        ))
+    except redis.RedisError as e:
+        _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        print(f"[singleflight] Redis unavailable, coalescing in-process only: {e}")
+        return None
+
+
+def _publish(key: str, token: str, result: Any) -> None:
+    try:
+        r = get_redis_client()
+        r.set(RESULT_PREFIX + key, json.dumps(result, default=str), ex=get_singleflight_result_seconds())
+        r.eval(_RELEASE_SCRIPT, 1, LOCK_PREFIX + key, token)
+    except (redis.RedisError, TypeError, ValueError) as e:
+        print(f"[singleflight] Could not publish result for {key}: {e}")
+
+
+def _release(key: str, token: str) -> None:
+    try:
+        get_redis_client().eval(_RELEASE_SCRIPT, 1, LOCK_PREFIX + key, token)
+    except redis.RedisError:
+        pass
+
+
+def _poll_remote(key: str) -> Tuple[Any, bool]:
+    """
+    One poll of a remote leader. Returns (result, leader_alive): result is
+    _MISSING until published; leader_alive is False once the lock is gone.
+    """
+    try:
+        r = get_redis_client()
+        pipe = r.pipeline(transaction=False)
+        pipe.get(RESULT_PREFIX + key)
+        pipe.exists(LOCK_PREFIX + key)
+        raw, alive = pipe.execute()
+    except redis.RedisError:
+        return _MISSING, False
+    if raw is not None:
+        return json.loads(raw), True
+    return _MISSING, bool(alive)
+
+
+def _renew(key: str, token: str, seconds: int) -> bool:
+    """Push the lock's expiry out to `seconds`. False if it's no longer ours."""
+    try:
+        return bool(get_redis_client().eval(_RENEW_SCRIPT, 1, LOCK_PREFIX + key, token, seconds))
+    except redis.RedisError as e:
+        print(f"[singleflight] Could not renew lease {key}: {e}")
+        return True  # keep trying; the lease only lapses if Redis stays away
+
+
+def _poll_delays():
+    delay = 0.05
+    while True:
+        yield delay
+        delay = min(delay * 1.5, 0.5)
+
+
+class _Heartbeat:
+    """One daemon thread renewing every held lease every `seconds / 3`."""
+
+    def __init__(self) -> None:
+        self._leases: Dict[str, Tuple[str, int, float]] = {}  # token -> (key, seconds, next renewal)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, key: str, token: str, seconds: int) -> None:
+        with self._lock:
+            self._leases[token] = (key, seconds, time.monotonic() + seconds / 3)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="singleflight-heartbeat", daemon=True)
+                self._thread.start()
+
+    def remove(self, token: str) -> None:
+        with self._lock:
+            self._leases.pop(token, None)
+
+    def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                due = [(t, k, s) for t, (k, s, at) in self._leases.items() if at <= now]
+            for token, key, seconds in due:
+                alive = _renew(key, token, seconds)
+                with self._lock:
+                    if token not in self._leases:
+                        continue
+                    if alive:
+                        self._leases[token] = (key, seconds, time.monotonic() + seconds / 3)
+                    else:
+                        print(f"[singleflight] Lost lease {key} (expired before renewal)")
+                        del self._leases[token]
+            time.sleep(0.5)
+
+
+_heartbeat = _Heartbeat()
+
+
+class Lease:
+    """
+    A cross-worker lock this process holds (from try_lease). Finish it with
+    publish(result), which hands the result to waiters, or release().
+    Without Redis, a lease is purely local and both calls are no-ops.
+    """
+
+    def __init__(self, key: str, token: str, seconds: int, remote: bool) -> None:
+        self.key = key
+        self.token = token
+        self.seconds = seconds
+        self.remote = remote
+        self._done = False
+
+    def publish(self, result: Any) -> None:
+        if self._done:
+            return
+        self._done = True
+        _heartbeat.remove(self.token)
+        if self.remote:
+            _publish(self.key, self.token, result)
+
+    def release(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        _heartbeat.remove(self.token)
+        if self.remote:
+            _release(self.key, self.token)
+
+
+def try_lease(key: str, seconds: Optional[int] = None, heartbeat: bool = True) -> Optional[Lease]:
+    """
+    Take the cross-worker lock for `key` (sync; call via to_thread from
+    async code). Returns None if another worker holds it. With heartbeat,
+    the lock is renewed in the background until the lease is finished.
+    """
+    seconds = seconds or get_singleflight_lock_seconds()
+    token = uuid.uuid4().hex
+    locked = _try_lock(key, token, seconds)
+    if locked is False:
+        return None
+    lease = Lease(key, token, seconds, remote=locked is True)
+    if lease.remote and heartbeat:
+        _heartbeat.add(key, token, seconds)
+    return lease
+
+
+# --- public API ---
+
+class SingleFlight:
+    def __init__(
+        self,
+        lock_seconds: Callable[[], int] = get_singleflight_lock_seconds,
+        heartbeat: bool = False,
+        remote: bool = True,
+    ) -> None:
+        self.lock_seconds = lock_seconds
+        self.heartbeat = heartbeat
+        self.remote = remote  # False: in-process coalescing only
+        self._async_inflight: Dict[str, asyncio.Future] = {}
+        self._async_waiters: Dict[asyncio.Future, int] = {}
+        self._sync_inflight: Dict[str, concurrent.futures.Future] = {}
+        self._sync_lock = threading.Lock()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `fn()` once per key across all concurrent callers.
+        The shared work runs as its own task, so one caller being
+        cancelled doesn't cancel it for everyone else; it is cancelled
+        only once every caller waiting on it has been.
+        """
+        task = self._async_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run_async(key, fn))
+            self._async_inflight[key] = task
+
+            def _forget(t, key=key):
+                if self._async_inflight.get(key) is t:
+                    del self._async_inflight[key]
+
+            task.add_done_callback(_forget)
+
+        self._async_waiters[task] = self._async_waiters.get(task, 0) + 1
+        cancelled = False
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            self._async_waiters[task] -= 1
+            if not self._async_waiters[task]:
+                del self._async_waiters[task]
+                # Last interested caller went away: stop the shared work
+                if cancelled and not task.done():
+                    print(f"[singleflight] All callers gone, cancelling {key}")
+                    task.cancel()
+
+    def _wait_deadline(self, seconds: int) -> float:
+        # a heartbeat lease stays held exactly as long as its leader lives,
+        # so there's no point giving up on it early
+        return float("inf") if self.heartbeat else time.monotonic() + seconds
+
+    async def _run_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.remote:
+            return await fn()
+        seconds = self.lock_seconds()
+        deadline = self._wait_deadline(seconds)
+
+        while True:
+            lease = await asyncio.to_thread(try_lease, key, seconds, self.heartbeat)
+            if lease is not None:
+                try:
+                    result = await fn()
+                except BaseException:
+                    await asyncio.to_thread(lease.release)
+                    raise
+                await asyncio.to_thread(lease.publish, result)
+                return result
+
+            # Another worker is leading: wait for its result
+            for delay in _poll_delays():
+                result, alive = await asyncio.to_thread(_poll_remote, key)
+                if result is not _MISSING:
+                    return result
+                if not alive or time.monotonic() > deadline:
+                    break
+                await asyncio.sleep(delay)
+
+            if time.monotonic() > deadline:
+                return await fn()
+            # Remote leader gone without a result: try to lead ourselves
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Sync version of do_async, for work that runs in threads."""
+        with self._sync_lock:
+            future = self._sync_inflight.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._sync_inflight[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._run_sync(key, fn)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._sync_lock:
+                if self._sync_inflight.get(key) is future:
+                    del self._sync_inflight[key]
+
+    def _run_sync(self, key: str, fn: Callable[[], Any]) -> Any:
+        if not self.remote:
+            return fn()
+        seconds = self.lock_seconds()
+        deadline = self._wait_deadline(seconds)
+
+        while True:
+            lease = try_lease(key, seconds, self.heartbeat)
+            if lease is not None:
+                try:
+                    result = fn()
+                except BaseException:
+                    lease.release()
+                    raise
+                lease.publish(result)
+                return result
+
+            for delay in _poll_delays():
+                result, alive = _poll_remote(key)
+                if result is not _MISSING:
+                    return result
+                if not alive or time.monotonic() > deadline:
+                    break
+                time.sleep(delay)
+
+            if time.monotonic() > deadline:
+                return fn()
+
+
+# Process-wide instances
+single_flight = SingleFlight()
+local_flight = SingleFlight(remote=False)
+
+
+def coalesce(name: Optional[str] = None, local: bool = False):
+    """
+    Decorator: concurrent calls with the same arguments run once.
+    Works on sync and async functions. local=True coalesces within this
+    process only, for work too cheap to pay Redis round trips on.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        flight_name = name or fn.__name__
+        flight = local_flight if local else single_flight
+        signature = inspect.signature(fn)
+
+        def _key(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return fingerprint(flight_name, dict(bound.arguments))
+
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                return await flight.do_async(_key(args, kwargs), lambda: fn(*args, **kwargs))
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return flight.do(_key(args, kwargs), lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
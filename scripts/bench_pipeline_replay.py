@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for ingestion, discovery and drafting.
+
+Replays every request recorded in the cassettes (see app/utils/cassette.py)
+through the real functions, N times over, from a thread pool. No Apify or
+OpenAI calls are made, so results are deterministic and free.
+
+Record cassettes once (real network, real credits):
+    CASSETTE_MODE=record python3 scripts/test_scraper_service.py
+    CASSETTE_MODE=record python3 -m app.cli.discover_accounts
+    ...
+
+Then benchmark as often as you like:
+    python3 scripts/bench_pipeline_replay.py --latency-ms recorded --concurrency 16
+    python3 scripts/bench_pipeline_replay.py --latency-ms 50 --iterations 20 --with-db
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Replay mode must be set before the app reads its settings
+os.environ["CASSETTE_MODE"] = "replay"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.utils.cassette import load_cassette
+from app.services.instagram_scraper import fetch_instagram_posts
+from app.agents.discovery_agent import suggest_accounts_for_brand
+from app.agents.drafting_agent import generate_post_package
+
+
+def _ingest(request, with_db):
+    posts = fetch_instagram_posts(**request)
+    if with_db and posts:
+        from app.services.ingestion_service import upsert_posts
+        from app.services.sources_service import create_source
+
+        source_id = create_source("instagram", request["handle"].lstrip("@"))
+        upsert_posts(platform="instagram", source_id=source_id, posts=posts)
+    return posts
+
+
+STAGES = {
+    "ingestion": ("fetch_instagram_posts", _ingest),
+    "discovery": ("suggest_accounts_for_brand", lambda req, _db: suggest_accounts_for_brand(**req)),
+    "drafting": ("generate_post_package", lambda req, _db: generate_post_package(**req)),
+}
+
+
+def bench_stage(stage, iterations, concurrency, with_db):
+    cassette_name, call = STAGES[stage]
+    requests = [e["request"] for e in load_cassette(cassette_name).values()]
+    if not requests:
+        print(f"  {stage:<10} no recordings in cassette '{cassette_name}', skipping")
+        return
+
+    jobs = requests * iterations
+    latencies = []
+    errors = 0
+
+    def run(req):
+        started = time.perf_counter()
+        call(req, with_db)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run, req) for req in jobs]
+        for f in futures:
+            try:
+                latencies.append(f.result())
+            except Exception as e:
+                errors += 1
+                print(f"  {stage}: error: {e}")
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+    print(
+        f"  {stage:<10} {len(jobs):>6} calls in {wall:7.2f}s  "
+        f"{len(jobs) / wall:8.1f} calls/s  "
+        f"p50 {statistics.median(latencies) * 1000 if latencies else 0:7.1f}ms  "
+        f"p95 {p95 * 1000:7.1f}ms  errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay-based pipeline throughput benchmark")
+    parser.add_argument("--stages", default="ingestion,discovery,drafting")
+    parser.add_argument("--iterations", type=int, default=10, help="times to replay each recorded request")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", default=None, help="synthetic latency per call, or 'recorded'")
+    parser.add_argument("--with-db", action="store_true", help="also upsert fetched posts into Postgres")
+    args = parser.parse_args()
+
+    if args.latency_ms is not None:
+        os.environ["CASSETTE_LATENCY_MS"] = args.latency_ms
+
+    print("=" * 60)
+    print("  Pipeline replay benchmark")
+    print(f"  concurrency={args.concurrency} iterations={args.iterations} "
+          f"latency={os.environ.get('CASSETTE_LATENCY_MS', '0')}")
+    print("=" * 60)
+
+    for stage in [s.strip() for s in args.stages.split(",") if s.strip()]:
+        if stage not in STAGES:
+            print(f"  unknown stage: {stage}")
+            continue
+        bench_stage(stage, args.iterations, args.concurrency, args.with_db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-package save_draft() against bulk save_drafts().
+
+Creates a throwaway brand, writes N synthetic packages both ways, prints
+timings, then deletes the brand (drafts cascade).
+
+    python3 scripts/bench_save_drafts.py --packages 10 100 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db.connection import get_db_cursor
+from app.services.drafts_service import save_draft, save_drafts
+
+
+def _package(i):
+    def section(platform):
+        return {
+            "hook": f"bench hook {i}",
+            "caption": f"bench {platform} caption {i} " + "lorem ipsum " * 20,
+            "hashtags": ["sales", "outbound", f"bench{i}"],
+            "image_prompts": [],
+            "style": "educational",
+        }
+
+    return {
+        "core": {"style": "educational"},
+        "instagram": section("instagram"),
+        "facebook": section("facebook"),
+        "linkedin": section("linkedin"),
+    }
+
+
+def _create_brand():
+    with get_db_cursor() as cur:
+        cur.execute("insert into brands (name) values ('bench-save-drafts') returning id")
+        return str(cur.fetchone()[0])
+
+
+def _delete_brand(brand_id):
+    with get_db_cursor() as cur:
+        cur.execute("delete from brands where id = %s", (brand_id,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="save_draft vs save_drafts benchmark")
+    parser.add_argument("--packages", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    brand_id = _create_brand()
+    try:
+        print("=" * 60)
+        print(f"  {'packages':>8}  {'per-row':>10}  {'bulk':>10}  {'speedup':>8}")
+        print("=" * 60)
+        for n in args.packages:
+            packages = [_package(i) for i in range(n)]
+
+            started = time.perf_counter()
+            for p in packages:
+                save_draft(brand_id, p)
+            per_row = time.perf_counter() - started
+
+            started = time.perf_counter()
+            ids = save_drafts(brand_id, packages)
+            bulk = time.perf_counter() - started
+
+            assert len(ids) == n and all(len(x) == 3 for x in ids)
+            print(f"  {n:>8}  {per_row:>9.3f}s  {bulk:>9.3f}s  {per_row / bulk:>7.1f}x")
+    finally:
+        _delete_brand(brand_id)
+
+
+if __name__ == "__main__":
+    main()
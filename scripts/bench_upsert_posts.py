@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark the old per-row posts_raw insert against bulk upsert_posts().
+
+Creates a throwaway source, writes N synthetic posts both ways (each into
+an empty source, then once more to time the all-duplicates case), prints
+timings, then deletes the sources (posts cascade).
+
+    python3 scripts/bench_upsert_posts.py --posts 100 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db.connection import get_db_cursor
+from app.services.ingestion_service import _normalize_post, upsert_posts
+
+
+def _posts(n):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "post_id": f"bench-{i}",
+            "caption": f"bench caption {i} #sales #outbound " + "lorem ipsum " * 15,
+            "hashtags": ["sales", "outbound"],
+            "media_urls": [f"https://example.com/media/{i}.jpg"],
+            "posted_at": (start + timedelta(minutes=i)).isoformat(),
+            "engagement": {"likes": i % 997, "comments": i % 31},
+        }
+        for i in range(n)
+    ]
+
+
+def _per_row_upsert(platform, source_id, posts):
+    """The pre-bulk implementation: one INSERT ... ON CONFLICT per post."""
+    with get_db_cursor() as cur:
+        for post in posts:
+            row = _normalize_post(post)
+            if row is None:
+                continue
+            post_id, caption, hashtags, media_urls, posted_at, engagement = row
+            cur.execute(
+                """
+                INSERT INTO posts_raw (
+                    source_id, platform, post_id, caption,
+                    hashtags, media_urls, posted_at, engagement
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (source_id, platform, post_id) DO NOTHING
+                """,
+                (source_id, platform, post_id, caption, hashtags, media_urls, posted_at, engagement),
+            )
+
+
+def _create_source():
+    with get_db_cursor() as cur:
+        cur.execute(
+            "insert into sources (platform, handle) values ('instagram', %s) returning id",
+            (f"bench-upsert-{uuid.uuid4().hex[:8]}",),
+        )
+        return str(cur.fetchone()[0])
+
+
+def _delete_sources(source_ids):
+    with get_db_cursor() as cur:
+        cur.execute("delete from sources where id = any(%s::uuid[])", (source_ids,))
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per-row vs bulk upsert_posts benchmark")
+    parser.add_argument("--posts", type=int, nargs="+", default=[100, 10000, 100000])
+    args = parser.parse_args()
+
+    created = []
+    try:
+        print("=" * 60)
+        print(f"  {'posts':>7}  {'per-row':>9}  {'bulk':>9}  {'speedup':>7}  {'bulk (dupes)':>12}")
+        print("=" * 60)
+        for n in args.posts:
+            posts = _posts(n)
+            row_source, bulk_source = _create_source(), _create_source()
+            created += [row_source, bulk_source]
+
+            per_row, _ = _timed(_per_row_upsert, "instagram", row_source, posts)
+            bulk, counts = _timed(upsert_posts, "instagram", bulk_source, posts)
+            assert counts == {"inserted": n, "engagement_updated": 0, "skipped": 0}, counts
+
+            dupes, counts = _timed(upsert_posts, "instagram", bulk_source, posts)
+            assert counts == {"inserted": 0, "engagement_updated": 0, "skipped": n}, counts
+
+            print(f"  {n:>7}  {per_row:>8.2f}s  {bulk:>8.2f}s  {per_row / bulk:>6.1f}x  {dupes:>11.2f}s")
+    finally:
+        if created:
+            _delete_sources(created)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Drive lots of concurrent agent calls against the local OpenAI stub server
+to find where our own code bottlenecks (client setup, DB, thread pools...).
+
+Start the stub with some latency, then run the load test:
+    STUB_LATENCY_MS=800 STUB_LATENCY_JITTER_MS=300 STUB_ERROR_RATE=0.02 \\
+        uvicorn app.stubs.openai_server:app --port 8100 --workers 4
+    python3 scripts/load_test_agents.py --calls 2000 --concurrency 500
+
+Stages: embed (semantic_agent._embed_query), discovery
+(suggest_accounts_for_brand) and drafting (generate_post_package; needs
+Postgres for semantic search).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _stage_calls():
+    from app.agents.semantic_agent import _embed_query
+    from app.agents.discovery_agent import suggest_accounts_for_brand
+    from app.agents.drafting_agent import generate_post_package
+
+    existing = {"instagram": ["getfuelai"], "facebook": ["Fuel AI"], "linkedin": ["fuelAI"]}
+    return {
+        "embed": lambda i: _embed_query(f"outbound follow-up idea #{i}"),
+        "discovery": lambda i: suggest_accounts_for_brand(
+            brand_name="FuelAI",
+            brand_description="AI-powered lead engagement and follow-ups",
+            target_audience="SDR/BDR managers and sales leaders",
+            existing_handles=existing,
+            max_suggestions=15,
+        ),
+        "drafting": lambda i: generate_post_package(f"cold outbound tip #{i}"),
+    }
+
+
+def run_stage(name, call, calls, concurrency):
+    latencies = []
+    errors = Counter()
+
+    def one(i):
+        started = time.perf_counter()
+        call(i)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(one, i) for i in range(calls)]
+        for f in futures:
+            try:
+                latencies.append(f.result())
+            except Exception as e:
+                errors[type(e).__name__] += 1
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    print(
+        f"  {name:<10} {calls:>6} calls  {wall:7.2f}s  {calls / wall:8.1f} calls/s  "
+        f"p50 {statistics.median(latencies) * 1000 if latencies else 0:7.1f}ms  "
+        f"p95 {pct(0.95):7.1f}ms  p99 {pct(0.99):7.1f}ms"
+    )
+    if errors:
+        print(f"  {'':<10} errors: {dict(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test agents against the OpenAI stub")
+    parser.add_argument("--base-url", default="http://localhost:8100/v1")
+    parser.add_argument("--stages", default="embed,discovery")
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    # Settings are read at call time, so set them before the first client is built
+    os.environ["OPENAI_BASE_URL"] = args.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    calls = _stage_calls()
+
+    print("=" * 60)
+    print(f"  Agent load test against {args.base_url}")
+    print(f"  calls={args.calls} concurrency={args.concurrency}")
+    print("=" * 60)
+
+    for stage in [s.strip() for s in args.stages.split(",") if s.strip()]:
+        if stage not in calls:
+            print(f"  unknown stage: {stage}")
+            continue
+        run_stage(stage, calls[stage], args.calls, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Check that `replay_raw_archive --overwrite` fixes post content without
+touching engagement (needs Postgres).
+
+Creates a throwaway source, crawls one post into it with current
+engagement, replays an older archive of the same post (corrected caption,
+stale likes/comments) with overwrite=True, and checks that only the
+content changed. Deletes the source afterwards (posts cascade).
+
+    python3 scripts/test_replay_overwrite.py
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.cli.replay_raw_archive import replay
+from app.db.connection import get_db_cursor
+from app.services.ingestion_service import upsert_posts
+from app.services.raw_archive import encode_archive
+
+POSTED_AT = "2025-01-01T12:00:00+00:00"
+MEDIA_URL = "https://example.com/media/replay.jpg"
+
+
+def _create_source(handle):
+    with get_db_cursor() as cur:
+        cur.execute(
+            "insert into sources (platform, handle) values ('instagram', %s) returning id",
+            (handle,),
+        )
+        return str(cur.fetchone()[0])
+
+
+def _delete_source(source_id):
+    with get_db_cursor() as cur:
+        cur.execute("delete from sources where id = %s", (source_id,))
+
+
+def _stored(source_id, post_id):
+    with get_db_cursor() as cur:
+        cur.execute(
+            "select caption, engagement from posts_raw where source_id = %s and post_id = %s",
+            (source_id, post_id),
+        )
+        return cur.fetchone()
+
+
+def _write_archive(handle, item):
+    header = {"platform": "instagram", "usernames": [handle], "mode": "sync", "request": {}}
+    f = tempfile.NamedTemporaryFile(suffix=".jsonl.gz", delete=False)
+    with f:
+        f.write(encode_archive(header, [item]))
+    return f.name
+
+
+def main():
+    handle = f"replay-test-{uuid.uuid4().hex[:8]}"
+    post_id = f"replay-{uuid.uuid4().hex[:8]}"
+    source_id = _create_source(handle)
+    path = None
+    try:
+        # the crawl: current engagement, caption from a buggy normalizer
+        upsert_posts("instagram", source_id, [{
+            "post_id": post_id,
+            "caption": "broken caption",
+            "media_urls": [MEDIA_URL],
+            "posted_at": POSTED_AT,
+            "engagement": {"likes": 500, "comments": 40},
+        }])
+
+        # an archive from weeks ago: right caption, stale engagement
+        path = _write_archive(handle, {
+            "id": post_id,
+            "caption": "fixed caption #replay",
+            "displayUrl": MEDIA_URL,
+            "timestamp": POSTED_AT,
+            "likesCount": 10,
+            "commentsCount": 1,
+        })
+
+        stats = replay(files=[path], overwrite=True)
+        assert stats["updated"] == 1, stats
+        caption, engagement = _stored(source_id, post_id)
+        assert caption == "fixed caption #replay", caption
+        assert engagement == {"likes": 500, "comments": 40}, engagement
+        print("✓ overwrite updated the caption and kept the crawled engagement")
+
+        stats = replay(files=[path], overwrite=True)
+        assert stats["updated"] == 0 and stats["skipped"] == 1, stats
+        print("✓ replaying again changes nothing (engagement difference ignored)")
+    finally:
+        if path:
+            os.unlink(path)
+        _delete_source(source_id)
+
+
+if __name__ == "__main__":
+    main()